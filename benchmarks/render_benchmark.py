@@ -0,0 +1,90 @@
+"""
+Response rendering benchmark.
+
+Builds a synthetic iterator response of fenced JSON, markdown and plain text
+items (plus a few very large documents) and renders it in every output mode
+to an in-memory stream, reporting items per second and output size:
+
+    python benchmarks/render_benchmark.py --items 5000
+    python benchmarks/render_benchmark.py --items 500 --large-bytes 2000000 --max-bytes 0
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / 'src'))
+
+from flow_render import DEFAULT_MAX_BYTES, RENDER_MODES, ResponseRenderer  # noqa: E402
+
+
+def synthetic_response(items: int, item_bytes: int, large_every: int, large_bytes: int) -> list:
+    response = []
+    for i in range(items):
+        if large_every and i % large_every == large_every - 1:
+            response.append('word ' * (large_bytes // 5))
+        elif i % 3 == 0:
+            record = {'id': i, 'summary': 'x' * item_bytes, 'tags': ['alpha', 'beta'], 'score': i / 7}
+            response.append(f"```json\n{json.dumps(record)}\n```")
+        elif i % 3 == 1:
+            response.append(f"## Item {i}\n\n**Summary:** {'y' * item_bytes}\n\n> quoted")
+        else:
+            response.append(f"Plain answer {i}: {'z' * item_bytes}")
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark flow response rendering')
+    parser.add_argument('--items', type=int, default=2000, help='Items in the response (default: 2000)')
+    parser.add_argument('--item-bytes', type=int, default=400, help='Approximate bytes per item (default: 400)')
+    parser.add_argument('--large-every', type=int, default=250,
+                        help='Make every Nth item a large document, 0 for none (default: 250)')
+    parser.add_argument('--large-bytes', type=int, default=1_000_000,
+                        help='Bytes per large document (default: 1000000)')
+    parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES,
+                        help=f'Per-item truncation budget, 0 for none (default: {DEFAULT_MAX_BYTES})')
+    parser.add_argument('--modes', nargs='+', choices=RENDER_MODES, default=list(RENDER_MODES))
+    args = parser.parse_args()
+
+    response = synthetic_response(args.items, args.item_bytes, args.large_every, args.large_bytes)
+    size = sum(len(item) for item in response)
+    print(f"{args.items} items, {size / 1e6:.1f} MB of documents, budget {args.max_bytes or 'unlimited'} bytes")
+
+    for mode in args.modes:
+        out = io.StringIO()
+        console = None
+        if mode == 'rich':
+            from rich.console import Console
+            console = Console(file=out, width=120, force_terminal=True)
+        renderer = ResponseRenderer(mode, args.max_bytes, out=out, console=console)
+
+        started = time.perf_counter()
+        renderer.render(response)
+        elapsed = time.perf_counter() - started
+
+        print(f"{mode:<8} {args.items / elapsed:>10,.0f} items/s  {elapsed * 1000:9.1f} ms  "
+              f"{len(out.getvalue()) / 1e6:8.2f} MB written")
+
+        # Lazily rendering a generator stops producing items once the reader stops
+        if mode == 'rich':
+            produced = 0
+
+            def items():
+                nonlocal produced
+                for item in response:
+                    produced += 1
+                    yield item
+
+            paged = ResponseRenderer(mode, args.max_bytes, page_size=50, out=out, console=console,
+                                     more=lambda shown: False)
+            started = time.perf_counter()
+            paged.render(items())
+            print(f"{'paged':<8} first page of 50 in {(time.perf_counter() - started) * 1000:.1f} ms, "
+                  f"{produced} of {args.items} items produced")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Startup benchmark for the flow manager CLI.
+
+Measures the wall time of importing bedrock_flow_manager, `--help` and the
+`templates` listing command, relative to a bare interpreter start, and fails
+when any of them exceeds the budget or when heavy modules are imported
+eagerly. Intended to run in CI:
+
+    python benchmarks/startup_benchmark.py --budget-ms 100
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = REPO_ROOT / 'src'
+SCRIPT = SRC_DIR / 'bedrock_flow_manager.py'
+
+# Modules that must not be loaded just by importing the CLI: the third-party
+# libraries, and the flow modules only some commands use
+HEAVY_MODULES = ['boto3', 'botocore', 'rich', 'termcolor',
+                 'flow_batch', 'flow_bench', 'flow_cache', 'flow_catalog', 'flow_chunking', 'flow_events',
+                 'flow_export', 'flow_fleet', 'flow_pipeline', 'flow_render', 'flow_scripts', 'flow_sessions',
+                 'flow_templates', 'flow_validation']
+
+COMMANDS = {
+    'import': ['-c', 'import bedrock_flow_manager'],
+    'help': [str(SCRIPT), '--help'],
+    'templates': [str(SCRIPT), '--templates-dir', str(REPO_ROOT / 'templates'), 'templates'],
+}
+
+
+def time_command(args, runs: int) -> float:
+    """Median wall time in milliseconds over the given number of runs"""
+    env = {**os.environ, 'PYTHONPATH': str(SRC_DIR)}
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def eagerly_imported() -> list:
+    env = {**os.environ, 'PYTHONPATH': str(SRC_DIR)}
+    code = ("import sys, json, bedrock_flow_manager; "
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    output = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CLI startup time')
+    parser.add_argument('--runs', type=int, default=10, help='Runs per command (default: 10)')
+    parser.add_argument('--budget-ms', type=float, default=100.0,
+                        help='Allowed time over a bare interpreter start, per command (default: 100)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    baseline = time_command(['-c', 'pass'], args.runs)
+    report = {'baseline_ms': round(baseline, 1), 'budget_ms': args.budget_ms, 'commands': {}}
+    failed = False
+
+    for name, command in COMMANDS.items():
+        elapsed = time_command(command, args.runs)
+        overhead = elapsed - baseline
+        within_budget = overhead <= args.budget_ms
+        failed |= not within_budget
+        report['commands'][name] = {
+            'median_ms': round(elapsed, 1),
+            'overhead_ms': round(overhead, 1),
+            'within_budget': within_budget
+        }
+
+    report['eager_heavy_imports'] = eagerly_imported()
+    failed |= bool(report['eager_heavy_imports'])
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Interpreter baseline: {report['baseline_ms']} ms")
+        for name, result in report['commands'].items():
+            status = 'ok' if result['within_budget'] else 'OVER BUDGET'
+            print(f"{name:<10} {result['median_ms']:>8} ms  (+{result['overhead_ms']} ms)  {status}")
+        if report['eager_heavy_imports']:
+            print(f"Heavy modules imported eagerly: {', '.join(report['eager_heavy_imports'])}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Template rendering benchmark.
+
+Compiles every template in ./templates once and renders it repeatedly with
+distinct variable bindings, reporting renders per second:
+
+    python benchmarks/template_benchmark.py --renders 20000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / 'src'))
+
+from flow_templates import TemplateCompiler  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark compiled template rendering')
+    parser.add_argument('--templates-dir', default=str(REPO_ROOT / 'templates'))
+    parser.add_argument('--renders', type=int, default=20000, help='Renders per template (default: 20000)')
+    args = parser.parse_args()
+
+    compiler = TemplateCompiler(cache_dir=tempfile.mkdtemp())
+    for template_path in sorted(Path(args.templates_dir).glob('*.json')):
+        started = time.perf_counter()
+        compiled = compiler.load(template_path)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for i in range(args.renders):
+            compiled.render({var: f"{var[2:].lower()}-{i}" for var in compiled.variables})
+        elapsed = time.perf_counter() - started
+
+        print(f"{template_path.name:<32} compile {compile_ms:6.2f} ms  "
+              f"{args.renders / elapsed:>10,.0f} renders/s  ({len(compiled.slots)} slots)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,36 @@
-import boto3
 import json
 from pathlib import Path
-from botocore.exceptions import ClientError
 import logging
 from typing import Tuple, Optional, Dict, List
 import argparse
 import sys
-from termcolor import colored
 import time
 import os
-from rich.console import Console
-from rich.markdown import Markdown
-from rich.panel import Panel
-from rich.json import JSON
-from rich.syntax import Syntax
+import threading
 from contextlib import contextmanager
-from typing import Optional, Generator
+from typing import TYPE_CHECKING, Callable, Optional, Generator, Iterator
+from flow_clients import ClientPool, PooledClient, default_pool
+from flow_instrumentation import NOOP, Instrumentation, instrumented
+from flow_throttle import shared_registry
+from flow_runtime import (
+    FlowConversation,
+    FlowEvent,
+    FlowOutputEvent,
+    apply_stream_event,
+    iter_flow_events,
+    new_stream_result,
+    payload_hash,
+    prepare_input_payload,
+)
+
+# Per-command modules are imported where they are used, so --help and light
+# commands only pay for what they run (see benchmarks/startup_benchmark.py)
+if TYPE_CHECKING:
+    from flow_chunking import ChunkLimits
+    from flow_events import EventLog
+    from flow_pipeline import Stage
+    from flow_render import ResponseRenderer
+    from flow_sessions import ConversationStore
 
 # Configure logging
 logging.basicConfig(
@@ -24,70 +39,120 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Color scheme for better visibility in both dark and light modes
-# Using high contrast colors that are also colorblind-friendly
-COLORS = {
-    'header': {'color': 'white', 'attrs': ['bold']},
-    'step': {'color': 'cyan', 'attrs': ['bold']},
-    'info': {'color': 'blue', 'attrs': ['bold']},
-    'success': {'color': 'green', 'attrs': ['bold']},
-    'warning': {'color': 'yellow', 'attrs': ['bold']},
-    'error': {'color': 'red', 'attrs': ['bold']},
-    'input': {'color': 'magenta', 'attrs': ['bold']},
-}
-
-
-def print_colored(message: str, style: str = 'info', prefix: str = ''):
-    """Print colored message with consistent styling"""
-    color = COLORS.get(style, COLORS['info'])
-    print(colored(f"{prefix}{message}", color['color'], attrs=color.get('attrs', [])))
-
-
-class FlowConversation:
-    """Handles multi-turn conversations with Bedrock Flow"""
-
-    def __init__(self, flow_id: str, alias_id: str, execution_id: str = None):
-        self.flow_id = flow_id
-        self.alias_id = alias_id
-        self.execution_id = execution_id
-        self.conversation_history = []
-
-    def add_to_history(self, role: str, content: str):
-        """Add message to conversation history"""
-        self.conversation_history.append({
-            "role": role,
-            "content": content,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-        })
-
-    def get_formatted_history(self) -> str:
-        """Get formatted conversation history"""
-        formatted = "\nConversation History:\n" + "-" * 30 + "\n"
-        for msg in self.conversation_history:
-            formatted += f"[{msg['timestamp']}] {msg['role']}: {msg['content']}\n"
-        return formatted
 
+# boto3, botocore and rich take most of the startup time, so they are only
+# imported by the code paths that need them. termcolor is cheap but follows suit.
+def colored(text: str, color: str, attrs: Optional[List[str]] = None) -> str:
+    from termcolor import colored as termcolor_colored
+    return termcolor_colored(text, color, attrs=attrs)
 
-class BedrockFlowManager:
-    def __init__(self, region: str, profile_name: str, existing_role_name: Optional[str] = None):
-        """Initialize the BedrockFlowManager"""
-        print_colored("\n=== Amazon Bedrock Flow Manager ===", 'header')
-        print_colored(f"Region: {region}", 'info')
-        print_colored(f"Profile: {profile_name}", 'info')
 
-        self.region = region
-        self.profile_name = profile_name
-        self.session = boto3.Session(profile_name=profile_name)
+def print_colored(message: str, style: str = 'info', prefix: str = '', **fields):
+    """Report a message with consistent styling, plus optional structured fields, through the event log"""
+    from flow_events import event_log
+    event_log().emit(style, f"{prefix}{message}" if prefix else message, **fields)
+
+
+def prompt_input(message: str) -> str:
+    """Ask the user for input once every reported message has been written"""
+    from flow_events import COLORS, event_log
+    event_log().flush()
+    return input(colored(message, COLORS['input']['color']))
+
+
+# Methods that can run quietly (e.g. from worker threads) rebind print_colored locally
+_print_colored = print_colored
+
 
-        # Initialize AWS clients
-        self.bedrock_client = self.session.client('bedrock-agent', region_name=region)
-        self.bedrock_runtime = self.session.client('bedrock-agent-runtime', region_name=region)
-        self.iam = self.session.client('iam')
+def _quiet(message: str, style: str = 'info', prefix: str = '', **fields):
+    pass
+
+
+# Role ARNs resolved per (profile, role name), shared by every manager in the process
+_role_arn_cache: Dict[Tuple[str, Optional[str]], str] = {}
+_role_arn_lock = threading.Lock()
+
+
+def _client_token() -> str:
+    """Idempotency token for create calls, reused across retries of the same call"""
+    import uuid
+    return str(uuid.uuid4())
+
+
+class BedrockFlowManager:
+    # AWS clients are taken from the shared pool the first time they are used
+    bedrock_client = PooledClient('bedrock-agent')
+    bedrock_runtime = PooledClient('bedrock-agent-runtime')
+    iam = PooledClient('iam', regional=False)
+
+    def __init__(self, region: str, profile_name: str, existing_role_name: Optional[str] = None,
+                 client_pool: Optional[ClientPool] = None, verbose: bool = True,
+                 conversations: Optional['ConversationStore'] = None,
+                 instrumentation: Optional[Instrumentation] = None, invocation_cache=None,
+                 chunk_limits: Optional['ChunkLimits'] = None, renderer: Optional['ResponseRenderer'] = None):
+        """
+        Initialize the BedrockFlowManager
+
+        Clients come from a process-wide pool on first use and the IAM role is
+        only resolved the first time it is needed, so constructing a manager
+        imports no AWS SDK modules, makes no AWS calls and opens no connections.
+        Managers are safe to share across threads. Multi-turn conversations are
+        kept in ``conversations`` when a store is given, so they can be resumed
+        by execution ID. Each stage runs in a span of ``instrumentation``,
+        which records nothing unless a recorder is given. Single-turn results
+        are served from ``invocation_cache`` (see enable_invocation_cache) when set.
+        Iterator inputs larger than ``chunk_limits`` are split into chunks that
+        run in parallel (see invoke_iterator). Responses are printed through
+        ``renderer``, rich panels by default.
+        """
+        from flow_pipeline import StatusPoller
+        from flow_render import ResponseRenderer
 
-        # Store role_arn after creation
-        self.role_arn = self.create_iam_role(existing_role_name)
+        if verbose:
+            print_colored("\n=== Amazon Bedrock Flow Manager ===", 'header')
+            print_colored(f"Region: {region}", 'info')
+            print_colored(f"Profile: {profile_name}", 'info')
 
-        self.console = Console()
+        self.region = region
+        self.profile_name = profile_name
+        self.existing_role_name = existing_role_name
+        self.client_pool = client_pool or default_pool
+
+        # Rate limiters are shared by every manager in the process for the same region
+        self.throttle = shared_registry(region)
+        self.poller = StatusPoller()
+        self.conversations = conversations
+        self.instrumentation = instrumentation or NOOP
+        self.invocation_cache = invocation_cache
+        self.single_flight = None
+        self.chunk_limits = chunk_limits
+        self.renderer = renderer or ResponseRenderer()
+
+        self._role_arn = None
+
+    @property
+    def session(self):
+        return self.client_pool.session(self.profile_name)
+
+    @property
+    def console(self):
+        from flow_render import shared_console
+        return shared_console()
+
+    @property
+    def role_arn(self) -> str:
+        """Execution role ARN, resolved (or created) on first access"""
+        if self._role_arn is None:
+            key = (self.profile_name, self.existing_role_name)
+            with _role_arn_lock:
+                if key not in _role_arn_cache:
+                    _role_arn_cache[key] = self.create_iam_role(self.existing_role_name)
+                self._role_arn = _role_arn_cache[key]
+        return self._role_arn
+
+    @role_arn.setter
+    def role_arn(self, value: str):
+        self._role_arn = value
 
     @contextmanager
     def flow_lifecycle(self, flow_id: Optional[str] = None, alias_id: Optional[str] = None,
@@ -111,8 +176,10 @@ class BedrockFlowManager:
                 )
             raise e
 
-    def cleanup_flow(self, flow_id: Optional[str], alias_id: Optional[str] = None, version: Optional[str] = None):
+    def cleanup_flow(self, flow_id: Optional[str], alias_id: Optional[str] = None, version: Optional[str] = None,
+                     verbose: bool = True):
         """Clean up created flow resources"""
+        print_colored = _print_colored if verbose else _quiet
         print_colored("\n🧹 Cleaning Up Resources", 'step')
         print_colored("-" * 30, 'info')
 
@@ -120,7 +187,9 @@ class BedrockFlowManager:
             if alias_id:
                 print_colored("1. Deleting flow alias...", 'info')
                 try:
-                    self.bedrock_client.delete_flow_alias(
+                    self.throttle.call(
+                        'delete_flow_alias',
+                        self.bedrock_client.delete_flow_alias,
                         flowIdentifier=flow_id,
                         aliasIdentifier=alias_id
                     )
@@ -131,7 +200,9 @@ class BedrockFlowManager:
             if version:
                 print_colored("2. Deleting flow version...", 'info')
                 try:
-                    self.bedrock_client.delete_flow_version(
+                    self.throttle.call(
+                        'delete_flow_version',
+                        self.bedrock_client.delete_flow_version,
                         flowIdentifier=flow_id,
                         flowVersion=version
                     )
@@ -142,7 +213,7 @@ class BedrockFlowManager:
             if flow_id:
                 print_colored("3. Deleting flow...", 'info')
                 try:
-                    self.bedrock_client.delete_flow(flowIdentifier=flow_id)
+                    self.throttle.call('delete_flow', self.bedrock_client.delete_flow, flowIdentifier=flow_id)
                     print_colored("   ✅ Flow deleted", 'success')
                 except Exception as e:
                     print_colored(f"   ⚠️  Error deleting flow: {str(e)}", 'warning')
@@ -160,8 +231,11 @@ class BedrockFlowManager:
                 print_colored(f"  • Version: {version}", 'warning')
 
     @staticmethod
-    def list_templates(templates_dir: str = './templates') -> List[Path]:
-        """List all available templates in the templates directory"""
+    def list_templates(templates_dir: str = './templates', tag: Optional[str] = None,
+                       node_type: Optional[str] = None, search: Optional[str] = None) -> List[Path]:
+        """List the templates in the templates directory, optionally filtered by tag, node type or text"""
+        from flow_catalog import TemplateCatalog
+
         print_colored("\n📂 Available Templates:", 'step')
         print_colored("-" * 50, 'info')
 
@@ -171,23 +245,23 @@ class BedrockFlowManager:
             templates_path.mkdir(parents=True)
             return []
 
-        templates = list(templates_path.glob('*.json'))
+        catalog = TemplateCatalog(templates_dir)
+        catalog.refresh()
+        templates = catalog.search(tag=tag, node_type=node_type, text=search)
 
         if not templates:
-            print_colored("No templates found! Please add JSON templates to the templates directory.", 'warning')
+            if catalog.entries:
+                print_colored("No templates match the given filters.", 'warning')
+            else:
+                print_colored("No templates found! Please add JSON templates to the templates directory.", 'warning')
             return []
 
         for idx, template in enumerate(templates, 1):
-            # Try to get description from template
-            try:
-                with open(template, 'r') as f:
-                    content = json.load(f)
-                    description = content.get('description', 'No description available')
-            except:
-                description = 'Unable to read template description'
-
+            entry = catalog.entry(template)
             print_colored(f"{idx}. {template.name}", 'info')
-            print_colored(f"   Description: {description}", 'info', prefix='   ')
+            print_colored(f"   Description: {entry.get('description', 'No description available')}", 'info', prefix='   ')
+            if entry.get('node_types'):
+                print_colored(f"   Nodes: {', '.join(entry['node_types'])}", 'info', prefix='   ')
             print_colored("-" * 50, 'info')
 
         return templates
@@ -201,7 +275,7 @@ class BedrockFlowManager:
         while True:
             try:
                 print_colored("\nSelect a template number:", 'input')
-                choice = input(colored("Enter number (or 'q' to quit): ", COLORS['input']['color']))
+                choice = prompt_input("Enter number (or 'q' to quit): ")
 
                 if choice.lower() == 'q':
                     sys.exit(0)
@@ -216,7 +290,8 @@ class BedrockFlowManager:
 
     def create_iam_role(self, existing_role_name: Optional[str] = None) -> str:
         """Create IAM role for Bedrock Flows or use existing role"""
-        
+        from botocore.exceptions import ClientError
+
         # If existing role name is provided, use it without printing step message
         if existing_role_name:
             try:
@@ -449,8 +524,11 @@ class BedrockFlowManager:
     #             return self.iam.get_role(RoleName='BedrockFlowsRole')['Role']['Arn']
     #         raise e
 
+    @instrumented('process_template', lambda template_path: {'template': Path(template_path).name})
     def process_template(self, template_path: Path) -> Tuple[dict, bool, dict]:
         """Process template and replace variables"""
+        from flow_templates import compile_template
+
         print_colored("\n📝 Step 2: Processing Template", 'step')
         print_colored("-" * 30, 'info')
 
@@ -458,57 +536,20 @@ class BedrockFlowManager:
             raise FileNotFoundError(f"Template not found: {template_path}")
 
         print_colored(f"Loading template: {template_path.name}", 'info')
-        with open(template_path, 'r') as f:
-            template = json.load(f)
-
-        # Validate template structure
-        required_fields = ['definition', 'description', 'name']
-        missing_fields = [field for field in required_fields if field not in template]
-        if missing_fields:
-            raise ValueError(f"Template missing required fields: {', '.join(missing_fields)}")
-
-        # Extract metadata
-        template_metadata = {
-            'description': template.get('description', ''),
-            'name': template.get('name', ''),
-            'tags': template.get('tags', {}),
-            'executionRoleArn': template.get('executionRoleArn', None)
-        }
-
-        # Convert template to string for variable replacement
-        template_str = json.dumps(template['definition'])
-        metadata_str = json.dumps(template_metadata)
+        compiled = compile_template(template_path)
 
         # Check if this is an iterator template
         is_iterator = 'iterator' in template_path.stem.lower()
 
-        # Find variables using updated regex pattern
-        # This will match $$VARIABLE, $$VARIABLE_NAME, $$VARIABLE_1, etc.
-        import re
-        variables = set()
-
-        # Different patterns to match
-        patterns = [
-            r'\$\$[A-Z][A-Z0-9_]*',  # Matches $$VARIABLE, $$VARIABLE_1, $$VARIABLE_NAME
-            r'\$\$[A-Z][a-zA-Z0-9_]*',  # Matches $$Variable, $$VariableName
-            r'\$\$[a-z][a-zA-Z0-9_]*'  # Matches $$variable, $$variableName
-        ]
-
-        # Search in both template and metadata
-        for pattern in patterns:
-            variables.update(re.findall(pattern, template_str))
-            variables.update(re.findall(pattern, metadata_str))
-
-        if not variables:
+        if not compiled.variables:
             print_colored("No variables found in template", 'info')
-            return template['definition'], is_iterator, template_metadata
+            return compiled.definition, is_iterator, compiled.metadata
 
         print_colored("\nTemplate Variables Found:", 'warning')
         print_colored("-" * 30, 'info')
 
-        # Sort variables for consistent display
-        sorted_variables = sorted(variables, key=lambda x: (x.lower(), x))
-        for var in sorted_variables:
+        # Variables are already sorted for consistent display
+        for var in compiled.variables:
             print_colored(f"• {var}", 'info')
 
         # Interactive replacement
@@ -516,23 +557,16 @@ class BedrockFlowManager:
         print_colored("\n🔄 Variable Replacement", 'step')
         print_colored("Enter values for each variable:", 'info')
 
-        for var in sorted_variables:
+        for var in compiled.variables:
             while True:
-                value = input(colored(f"Enter value for {var}: ", COLORS['input']['color'])).strip()
+                value = prompt_input(f"Enter value for {var}: ").strip()
                 if value:
                     replacements[var] = value
                     break
                 print_colored("Value cannot be empty! Please try again.", 'error')
 
-        # Replace variables in definition
-        processed_definition = template_str
-        for var, value in replacements.items():
-            processed_definition = processed_definition.replace(var, value)
-
-        # Replace variables in metadata
-        for var, value in replacements.items():
-            metadata_str = metadata_str.replace(var, value)
-        template_metadata = json.loads(metadata_str)
+        # Substitute every variable slot in a single pass
+        processed_definition, template_metadata = compiled.render(replacements)
 
         print_colored("\n✅ Template processing complete", 'success')
         print_colored("\nTemplate Metadata:", 'info')
@@ -543,10 +577,16 @@ class BedrockFlowManager:
             for key, value in template_metadata['tags'].items():
                 print_colored(f"    - {key}: {value}", 'info')
 
-        return json.loads(processed_definition), is_iterator, template_metadata
+        return processed_definition, is_iterator, template_metadata
 
-    def create_flow(self, flow_definition: dict, template_metadata: dict, flow_name: str = None) -> str:
-        """Create a Bedrock Flow from definition"""
+    @instrumented('create_flow', lambda flow_definition, template_metadata, flow_name=None, **_: _definition_attributes(
+        flow_definition, flow_name or template_metadata.get('name')))
+    def create_flow(self, flow_definition: dict, template_metadata: dict, flow_name: str = None,
+                    verbose: bool = True, validate: bool = True) -> str:
+        """Create a Bedrock Flow from definition, validating it locally first unless ``validate`` is False"""
+        from flow_validation import FlowValidationError, validate_definition
+
+        print_colored = _print_colored if verbose else _quiet
         print_colored("\n🚀 Step 3: Creating Flow", 'step')
         print_colored("-" * 30, 'info')
 
@@ -558,6 +598,10 @@ class BedrockFlowManager:
                 print_colored("Using flow name from template", 'info')
 
             print_colored("Processing flow definition...", 'info')
+            if validate:
+                issues = validate_definition(flow_definition)
+                if issues:
+                    raise FlowValidationError(issues)
 
             # Prepare create_flow arguments
             create_args = {
@@ -572,10 +616,16 @@ class BedrockFlowManager:
                 create_args['tags'] = template_metadata['tags']
 
             # Create flow
-            response = self.bedrock_client.create_flow(**create_args)
+            # The client token makes retries of a create that may have succeeded safe
+            response = self.throttle.call(
+                'create_flow',
+                self.bedrock_client.create_flow,
+                clientToken=_client_token(),
+                **create_args
+            )
 
             flow_id = response['id']
-            print_colored(f"✅ Flow created successfully!", 'success')
+            print_colored(f"✅ Flow created successfully!", 'success', event='flow_created', flow_id=flow_id)
             print_colored(f"Flow ID: {flow_id}", 'info')
             print_colored(f"Flow Name: {final_flow_name}", 'info')
 
@@ -585,32 +635,60 @@ class BedrockFlowManager:
             print_colored(f"❌ Error creating flow: {str(e)}", 'error')
             raise e
 
-    def prepare_flow(self, flow_id: str) -> Tuple[str, str]:
-        """Prepare flow for execution"""
+    @instrumented('update_flow', lambda flow_id, flow_definition, template_metadata, flow_name, **_: {
+        'flow.id': flow_id, **_definition_attributes(flow_definition, flow_name)})
+    def update_flow(self, flow_id: str, flow_definition: dict, template_metadata: dict, flow_name: str,
+                    validate: bool = True) -> str:
+        """Replace an existing flow's working draft; it must be prepared again before versioning"""
+        from flow_validation import FlowValidationError, validate_definition
+
+        if validate:
+            issues = validate_definition(flow_definition)
+            if issues:
+                raise FlowValidationError(issues)
+
+        self.throttle.call(
+            'update_flow',
+            self.bedrock_client.update_flow,
+            flowIdentifier=flow_id,
+            name=flow_name,
+            description=template_metadata['description'],
+            executionRoleArn=template_metadata.get('executionRoleArn') or self.role_arn,
+            definition=flow_definition
+        )
+        return flow_id
+
+    def _paginate(self, api: str, result_key: str, **kwargs) -> Iterator[dict]:
+        """Yield every item of a paginated bedrock-agent list call, each page through the rate limiter"""
+        return self.throttle.paginate(api, getattr(self.bedrock_client, api), result_key, **kwargs)
+
+    def find_flows_by_name(self) -> Dict[str, dict]:
+        """Index the account's flow summaries by name"""
+        return {summary['name']: summary for summary in self._paginate('list_flows', 'flowSummaries', maxResults=100)}
+
+    @instrumented('prepare_flow', lambda flow_id, **_: {'flow.id': flow_id})
+    def prepare_flow(self, flow_id: str, verbose: bool = True) -> Tuple[str, str]:
+        """Prepare flow for execution, wait until it is Prepared, then version and alias it"""
+        print_colored = _print_colored if verbose else _quiet
         print_colored("\n⚙️ Step 4: Preparing Flow", 'step')
         print_colored("-" * 30, 'info')
 
         try:
             # Prepare flow
             print_colored("Preparing flow...", 'info')
-            self.bedrock_client.prepare_flow(flowIdentifier=flow_id)
+            self.throttle.call('prepare_flow', self.bedrock_client.prepare_flow, flowIdentifier=flow_id)
+
+            print_colored("Waiting for flow to be prepared...", 'info')
+            self.wait_for_flow_prepared(flow_id)
 
             # Create version
             print_colored("Creating flow version...", 'info')
-            version_response = self.bedrock_client.create_flow_version(flowIdentifier=flow_id)
-            flow_version = version_response['version']
+            flow_version = self.create_flow_version(flow_id)
             print_colored(f"Created version: {flow_version}", 'success')
 
             # Create alias
             print_colored("Creating flow alias...", 'info')
-            alias_response = self.bedrock_client.create_flow_alias(
-                flowIdentifier=flow_id,
-                name='latest',
-                description=f"Alias for version {flow_version}",
-                routingConfiguration=[{'flowVersion': flow_version}]
-            )
-
-            alias_id = alias_response['id']
+            alias_id = self.create_flow_alias(flow_id, flow_version)
 
             print_colored("\n✅ Flow preparation complete!", 'success')
             print_colored("Flow Details:", 'info')
@@ -623,8 +701,399 @@ class BedrockFlowManager:
             print_colored(f"❌ Error preparing flow: {str(e)}", 'error')
             raise e
 
+    @instrumented('wait_prepared', lambda flow_id, **_: {'flow.id': flow_id})
+    def wait_for_flow_prepared(self, flow_id: str, timeout: Optional[float] = None) -> dict:
+        """Poll get_flow until preparation finishes, raising if the flow did not reach Prepared"""
+        response = self.poller.wait(
+            lambda: self.throttle.call('get_flow', self.bedrock_client.get_flow, flowIdentifier=flow_id),
+            pending=('Preparing', 'NotPrepared'),
+            timeout=timeout
+        )
+        if response['status'] != 'Prepared':
+            details = '; '.join(v.get('message', '') for v in response.get('validations', []))
+            raise RuntimeError(f"Flow {flow_id} failed to prepare (status {response['status']})"
+                               + (f": {details}" if details else ''))
+        return response
+
+    @instrumented('create_flow_version', lambda flow_id: {'flow.id': flow_id})
+    def create_flow_version(self, flow_id: str) -> str:
+        """Snapshot the prepared working draft as a new version"""
+        response = self.throttle.call(
+            'create_flow_version',
+            self.bedrock_client.create_flow_version,
+            flowIdentifier=flow_id,
+            clientToken=_client_token()
+        )
+        return response['version']
+
+    @instrumented('create_flow_alias', lambda flow_id, *_, **__: {'flow.id': flow_id})
+    def create_flow_alias(self, flow_id: str, flow_version: str, name: str = 'latest') -> str:
+        """Create an alias routing to the given version and return its ID"""
+        response = self.throttle.call(
+            'create_flow_alias',
+            self.bedrock_client.create_flow_alias,
+            flowIdentifier=flow_id,
+            clientToken=_client_token(),
+            name=name,
+            description=f"Alias for version {flow_version}",
+            routingConfiguration=[{'flowVersion': flow_version}]
+        )
+        return response['id']
+
+    def deploy_stages(self, incremental: bool = True, wait_concurrency: int = 64) -> List['Stage']:
+        """
+        Pipeline stages that deploy a rendered flow: create, prepare, wait, version, alias
+
+        Jobs carry the rendered ``_definition`` and ``_metadata`` and a
+        ``flow_name``. Waiting mostly sleeps, so it gets its own larger pool
+        and never holds up API calls for other flows.
+
+        With ``incremental``, a lookup stage first compares the rendered
+        content hash with the tag on an existing flow of the same name. An
+        unchanged flow completes as UNCHANGED after that one call; a changed
+        one is updated in place, gets a new version and has its ``latest``
+        alias moved. Only flows carrying the content hash tag, i.e. deployed
+        by this tool, are ever updated: a job whose name is taken by any other
+        flow fails in the lookup stage without touching it. The hash, version and alias are tagged on the flow last,
+        together with the template's own tags, which the template owns: user
+        tags it no longer lists are removed from an updated flow.
+        """
+        from flow_pipeline import Stage
+        from flow_templates import (
+            CONTENT_HASH_TAG,
+            DEPLOYED_ALIAS_TAG,
+            DEPLOYED_VERSION_TAG,
+            DEPLOYMENT_TAGS,
+            content_hash,
+        )
+
+        flows_by_name = {}
+        index_lock = threading.Lock()
+
+        def existing_flow(flow_name: str) -> Optional[dict]:
+            # One list_flows pass serves every job in the deployment
+            with index_lock:
+                if 'index' not in flows_by_name:
+                    flows_by_name['index'] = self.find_flows_by_name()
+            return flows_by_name['index'].get(flow_name)
+
+        def lookup(job: dict) -> dict:
+            digest = content_hash(job['_definition'], job['_metadata'])
+            updates = {'_hash': digest, 'action': 'created'}
+            existing = existing_flow(job['flow_name'])
+            if not existing:
+                return updates
+
+            tags = self.throttle.call(
+                'list_tags_for_resource',
+                self.bedrock_client.list_tags_for_resource,
+                resourceArn=existing['arn']
+            ).get('tags', {})
+            if CONTENT_HASH_TAG not in tags:
+                raise ValueError(
+                    f"Flow name '{job['flow_name']}' is already used by flow {existing['id']}, which was not "
+                    f"deployed by this tool (no {CONTENT_HASH_TAG} tag); choose another name or use --always-create")
+
+            updates.update({'flow_id': existing['id'], 'action': 'updated', '_arn': existing['arn'], '_tags': tags})
+            if tags.get(CONTENT_HASH_TAG) == digest and tags.get(DEPLOYED_ALIAS_TAG):
+                updates.update({
+                    'action': 'unchanged',
+                    'version': tags.get(DEPLOYED_VERSION_TAG),
+                    'alias_id': tags[DEPLOYED_ALIAS_TAG],
+                    '_complete': 'UNCHANGED'
+                })
+                return updates
+
+            aliases = self._paginate('list_flow_aliases', 'flowAliasSummaries', flowIdentifier=existing['id'])
+            latest = next((alias for alias in aliases if alias['name'] == 'latest'), None)
+            updates['_alias_id'] = latest['id'] if latest else None
+            return updates
+
+        def create(job: dict) -> dict:
+            if job.get('action') == 'updated':
+                self.update_flow(job['flow_id'], job['_definition'], job['_metadata'], job['flow_name'])
+                return {}
+            return {'flow_id': self.create_flow(job['_definition'], job['_metadata'], job['flow_name'], verbose=False)}
+
+        def prepare(job: dict):
+            self.throttle.call('prepare_flow', self.bedrock_client.prepare_flow, flowIdentifier=job['flow_id'])
+
+        def wait(job: dict) -> dict:
+            response = self.wait_for_flow_prepared(job['flow_id'])
+            return {'_arn': response.get('arn', job.get('_arn'))}
+
+        def version(job: dict) -> dict:
+            return {'version': self.create_flow_version(job['flow_id'])}
+
+        def alias(job: dict) -> dict:
+            if job.get('_alias_id'):
+                self.throttle.call(
+                    'update_flow_alias',
+                    self.bedrock_client.update_flow_alias,
+                    flowIdentifier=job['flow_id'],
+                    aliasIdentifier=job['_alias_id'],
+                    name='latest',
+                    description=f"Alias for version {job['version']}",
+                    routingConfiguration=[{'flowVersion': job['version']}]
+                )
+                return {'alias_id': job['_alias_id']}
+            return {'alias_id': self.create_flow_alias(job['flow_id'], job['version'])}
+
+        def tag(job: dict):
+            # The content hash covers the user tags, so they are brought in line before it is written
+            user_tags = {key: value for key, value in (job['_metadata'].get('tags') or {}).items()
+                         if key not in DEPLOYMENT_TAGS}
+            stale = [key for key in job.get('_tags', {}) if key not in user_tags and key not in DEPLOYMENT_TAGS]
+            if stale:
+                self.throttle.call(
+                    'untag_resource',
+                    self.bedrock_client.untag_resource,
+                    resourceArn=job['_arn'],
+                    tagKeys=stale
+                )
+            # Written last, so a flow whose update failed part way is retried next run
+            self.throttle.call(
+                'tag_resource',
+                self.bedrock_client.tag_resource,
+                resourceArn=job['_arn'],
+                tags={
+                    **user_tags,
+                    CONTENT_HASH_TAG: job['_hash'],
+                    DEPLOYED_VERSION_TAG: job['version'],
+                    DEPLOYED_ALIAS_TAG: job['alias_id']
+                }
+            )
+
+        stages = [
+            Stage('create', create),
+            Stage('prepare', prepare),
+            Stage('wait', wait, concurrency=wait_concurrency),
+            Stage('version', version),
+            Stage('alias', alias),
+        ]
+        if incremental:
+            stages = [Stage('lookup', lookup)] + stages + [Stage('tag', tag)]
+        return stages
+
+    def cleanup_job(self, job: dict):
+        """Delete whatever a failed pipeline job had created; flows that already existed are left alone"""
+        if job.get('flow_id') and job.get('action', 'created') == 'created':
+            self.cleanup_flow(job['flow_id'], job.get('alias_id'), job.get('version'), verbose=False)
+
+    @instrumented('deploy_flow', lambda flow_definition, template_metadata, flow_name=None, **_: _definition_attributes(
+        flow_definition, flow_name or template_metadata.get('name')))
+    def deploy_flow(self, flow_definition: dict, template_metadata: dict, flow_name: Optional[str] = None,
+                    incremental: bool = True) -> dict:
+        """
+        Deploy one rendered flow through the deployment stages in order
+
+        Returns the job summary: ``flow_id``, ``version``, ``alias_id``,
+        ``action`` (created, updated or unchanged) and per-stage ``timings``.
+        A flow created by this call is deleted again if a later stage fails.
+        """
+        print_colored("\n🚀 Step 3: Deploying Flow", 'step')
+        print_colored("-" * 30, 'info')
+
+        job = {
+            'flow_name': flow_name or template_metadata['name'],
+            'timings': {},
+            '_definition': flow_definition,
+            '_metadata': template_metadata
+        }
+        print_colored(f"Flow name: {job['flow_name']}", 'info')
+
+        try:
+            for stage in self.deploy_stages(incremental=incremental):
+                started = time.perf_counter()
+                job.update(stage.run(job) or {})
+                job['timings'][stage.name] = round(time.perf_counter() - started, 3)
+                print_colored(f"  • {stage.name} ({job['timings'][stage.name]:.2f}s)", 'info')
+                if job.pop('_complete', None):
+                    break
+        except Exception as e:
+            print_colored(f"❌ Error deploying flow: {str(e)}", 'error')
+            self.cleanup_job(job)
+            raise e
+
+        action = job.get('action', 'created')
+        messages = {
+            'created': "✅ Flow created and prepared!",
+            'updated': "✅ Existing flow updated with a new version!",
+            'unchanged': "✅ Flow unchanged, reusing the deployed version"
+        }
+        print_colored(f"\n{messages[action]}", 'success', event='flow_deployed', action=action,
+                      flow_id=job['flow_id'], version=job['version'], alias_id=job['alias_id'])
+        print_colored("Flow Details:", 'info')
+        print_colored(f"  • Flow ID: {job['flow_id']}", 'info')
+        print_colored(f"  • Version: {job['version']}", 'info')
+        print_colored(f"  • Alias ID: {job['alias_id']}", 'info')
+
+        job['action'] = action
+        return {key: value for key, value in job.items() if not key.startswith('_')}
+
+    def deploy_fleet(self, template_path: Path, bindings_path: str, concurrency: int = 8,
+                     summary_path: Optional[str] = None, incremental: bool = True) -> dict:
+        """
+        Render one flow per row of variable bindings and deploy them concurrently
+
+        Args:
+            template_path (Path): Template to render
+            bindings_path (str): CSV or JSONL file of variable bindings, one flow per row.
+                An optional flow_name column overrides the generated flow name.
+            concurrency (int): Maximum number of flows deployed at once
+            summary_path (str, optional): Write the deployment summary as JSON
+            incremental (bool): Skip unchanged flows and update changed ones in place
+
+        Returns:
+            dict: Summary with per-flow ids, aliases and timings
+        """
+        from flow_fleet import deploy_fleet, load_bindings
+        from flow_templates import compile_template
+
+        print_colored("\n🚢 Deploying Flow Fleet", 'step')
+        print_colored("-" * 30, 'info')
+
+        try:
+            compiled = compile_template(template_path)
+            rows = load_bindings(bindings_path)
+            print_colored(f"Template: {template_path.name}", 'info')
+            print_colored(f"Flows to deploy: {len(rows)}", 'info')
+            print_colored(f"Concurrency: {concurrency}", 'info')
+
+            def report(flow: dict):
+                if flow['status'] == 'DEPLOYED':
+                    print_colored(f"  ✅ {flow['flow_name']}: {flow['flow_id']} {flow.get('action', 'created')} "
+                                  f"(alias {flow['alias_id']}, {flow['elapsed']:.2f}s)", 'success',
+                                  event='fleet_flow', status=flow['status'], flow_name=flow['flow_name'],
+                                  flow_id=flow['flow_id'], alias_id=flow['alias_id'], elapsed=flow['elapsed'])
+                elif flow['status'] == 'UNCHANGED':
+                    print_colored(f"  ⏭️  {flow['flow_name']}: {flow['flow_id']} unchanged "
+                                  f"(version {flow['version']})", 'info')
+                else:
+                    print_colored(f"  ❌ {flow['flow_name']} ({flow['failed_stage']}): {flow['error']}", 'error',
+                                  event='fleet_flow', status=flow['status'], flow_name=flow['flow_name'],
+                                  failed_stage=flow['failed_stage'], error=flow['error'])
+
+            summary = deploy_fleet(
+                compiled,
+                rows,
+                self.deploy_stages(incremental=incremental),
+                concurrency=concurrency,
+                cleanup=self.cleanup_job,
+                on_result=report
+            )
+        except Exception as e:
+            print_colored(f"❌ Error deploying fleet: {str(e)}", 'error')
+            raise e
+
+        style = 'success' if not summary['failed'] else 'warning'
+        print_colored(f"\n✅ Fleet deployment complete ({summary['elapsed']:.2f}s)", style, event='fleet_complete',
+                      deployed=summary['deployed'], unchanged=summary['unchanged'], failed=summary['failed'],
+                      elapsed=summary['elapsed'])
+        print_colored(f"  • Deployed: {summary['deployed']}", 'info')
+        print_colored(f"  • Unchanged: {summary['unchanged']}", 'info')
+        print_colored(f"  • Failed: {summary['failed']}", 'info')
+        for stage, stats in summary['stages'].items():
+            if stats['mean'] is not None:
+                print_colored(f"  • {stage}: mean {stats['mean']:.2f}s, max {stats['max']:.2f}s"
+                              + (f", {stats['failed']} failed" if stats['failed'] else ''), 'info')
+
+        if summary_path:
+            with open(summary_path, 'w') as f:
+                json.dump(summary, f, indent=2)
+            print_colored(f"  • Summary written to: {summary_path}", 'info')
+
+        return summary
+
+    def collect_garbage(self, name_pattern: Optional[str] = None, tags: Optional[List[str]] = None,
+                        older_than: Optional[str] = None, dry_run: bool = False, concurrency: int = 16,
+                        assume_yes: bool = False, summary_path: Optional[str] = None) -> dict:
+        """
+        Delete flows left behind by earlier runs, with their aliases and versions
+
+        Args:
+            name_pattern (str, optional): Glob matched against flow names, e.g. 'tenant-*'
+            tags (list, optional): key or key=value filters that must all match the flow's tags
+            older_than (str, optional): Minimum time since the flow was last updated, e.g. 12h or 7d
+            dry_run (bool): Only print the deletion plan
+            concurrency (int): Flows processed at once per stage; API rates are set by the limiter
+            assume_yes (bool): Delete without asking for confirmation
+            summary_path (str, optional): Write the plan or deletion results as JSON
+
+        Returns:
+            dict: The plan, plus deletion counts and throughput when not a dry run
+        """
+        from flow_gc import FlowReaper, parse_age, parse_tag_filters
+
+        print_colored("\n🧹 Collecting Orphaned Flows", 'step')
+        print_colored("-" * 30, 'info')
+
+        try:
+            reaper = FlowReaper(self.bedrock_client, self.throttle, concurrency=concurrency)
+            plan = reaper.plan(
+                name_pattern=name_pattern,
+                tags=parse_tag_filters(tags),
+                older_than=parse_age(older_than) if older_than else None
+            )
+        except Exception as e:
+            print_colored(f"❌ Error planning cleanup: {str(e)}", 'error')
+            raise e
+
+        for flow in plan['flows'][:20]:
+            print_colored(f"  • {flow['name']} ({flow['flow_id']}, updated {flow['updated_at']}): "
+                          f"{len(flow['aliases'])} aliases, {len(flow['versions'])} versions", 'info')
+        if len(plan['flows']) > 20:
+            print_colored(f"  ... and {len(plan['flows']) - 20} more", 'info')
+        for flow in plan['failed']:
+            print_colored(f"  ⚠️  Could not inspect {flow['name']}: {flow['error']}", 'warning')
+        print_colored(f"\nPlan: {len(plan['flows'])} flows, {plan['aliases']} aliases, {plan['versions']} versions "
+                      f"({plan['skipped']} skipped by tag, {plan['elapsed']:.2f}s)", 'info')
+
+        result = {'plan': plan}
+        if not dry_run and plan['flows']:
+            if not assume_yes:
+                answer = prompt_input(f"\nDelete {len(plan['flows'])} flows? [y/N]: ")
+                if answer.strip().lower() not in ('y', 'yes'):
+                    print_colored("Nothing deleted.", 'warning')
+                    return result
+
+            def report(flow: dict):
+                if flow['status'] == 'FAILED':
+                    print_colored(f"  ❌ {flow['name']} ({flow['failed_stage']}): {flow['error']}", 'error',
+                                  event='cleanup_failed', flow_name=flow['name'], failed_stage=flow['failed_stage'],
+                                  error=flow['error'])
+
+            stats = reaper.execute(plan, on_result=report)
+            result.update(stats)
+            style = 'success' if not stats['failed'] else 'warning'
+            print_colored(f"\n✅ Cleanup complete ({stats['elapsed']:.2f}s)", style, event='cleanup_complete',
+                          deleted_flows=stats['deleted_flows'], deleted_aliases=stats['deleted_aliases'],
+                          deleted_versions=stats['deleted_versions'], failed=stats['failed'], elapsed=stats['elapsed'])
+            print_colored(f"  • Flows deleted: {stats['deleted_flows']}", 'info')
+            print_colored(f"  • Aliases deleted: {stats['deleted_aliases']}", 'info')
+            print_colored(f"  • Versions deleted: {stats['deleted_versions']}", 'info')
+            print_colored(f"  • Failed: {stats['failed']}", 'info')
+            print_colored(f"  • Throughput: {stats['deletes_per_second']} deletes/s", 'info')
+
+        if summary_path:
+            with open(summary_path, 'w') as f:
+                json.dump(result, f, indent=2, default=str)
+            print_colored(f"  • Summary written to: {summary_path}", 'info')
+
+        return result
+
+    @instrumented('format_response', lambda response: {
+        'response.type': type(response).__name__, 'response.items': len(response) if isinstance(response, (list, dict)) else 1})
     def format_flow_response(self, response):
         """Format flow response for better display"""
+        from flow_events import event_log
+
+        renderer = self.renderer
+        if renderer.headless:
+            event_log().flush()
+            renderer.render(response)
+            return
+
         try:
             if not response:
                 print_colored("\n⚠️  No response received", 'warning')
@@ -633,137 +1102,86 @@ class BedrockFlowManager:
             print_colored("\n📊 Flow Response:", 'step')
             print_colored("-" * 30, 'info')
 
-            # Handle list responses (from iterator templates)
+            # Iterator templates return a list; its items are formatted as they are printed
             if isinstance(response, list):
-                print_colored("Iterator Response:", 'info')
-                for i, item in enumerate(response, 1):
-                    # Try to detect and format each item
-                    print_colored(f"\n[Response {i}]", 'step')
-                    print_colored("-" * 20, 'info')
-
-                    # Remove markdown code block indicators if present
-                    if isinstance(item, str):
-                        item = item.replace('```json', '').replace('```', '').strip()
-
-                    try:
-                        # Try to parse as JSON
-                        json_data = json.loads(item) if isinstance(item, str) else item
-                        self.console.print(Panel(
-                            JSON(json.dumps(json_data, indent=2)),
-                            title=f"JSON Response {i}",
-                            border_style="cyan"
-                        ))
-                    except (json.JSONDecodeError, TypeError):
-                        # If not JSON, check for markdown
-                        if isinstance(item, str) and any(md_char in item for md_char in ['#', '```', '**', '_', '>']):
-                            try:
-                                self.console.print(Panel(
-                                    Markdown(item),
-                                    title=f"Markdown Response {i}",
-                                    border_style="cyan"
-                                ))
-                            except Exception:
-                                # If markdown parsing fails, display as text
-                                self.console.print(Panel(
-                                    item,
-                                    title=f"Text Response {i}",
-                                    border_style="cyan"
-                                ))
-                        else:
-                            # Display as plain text
-                            self.console.print(Panel(
-                                str(item),
-                                title=f"Text Response {i}",
-                                border_style="cyan"
-                            ))
-                return
-
-            # Handle single response
-            # Remove markdown code block indicators if present
-            if isinstance(response, str):
-                response = response.replace('```json', '').replace('```', '').strip()
-
-            try:
-                # Try to parse as JSON
-                json_data = json.loads(response) if isinstance(response, str) else response
-                self.console.print(Panel(
-                    JSON(json.dumps(json_data, indent=2)),
-                    title="JSON Response",
-                    border_style="cyan"
-                ))
-                return
-            except (json.JSONDecodeError, TypeError):
-                # If not JSON, check for markdown
-                if isinstance(response, str) and any(md_char in response for md_char in ['#', '```', '**', '_', '>']):
-                    try:
-                        self.console.print(Panel(
-                            Markdown(response),
-                            title="Markdown Response",
-                            border_style="cyan"
-                        ))
-                        return
-                    except Exception:
-                        print_colored(f"\n⚠️  Error formatting response: {str(e)}", 'error')
-
-
-                # If it's a multi-line response
-                if isinstance(response, str) and '\n' in response:
-                    self.console.print(Panel(
-                        response,
-                        title="Multi-line Response",
-                        border_style="cyan"
-                    ))
-                    return
-
-                # For simple text responses
-                self.console.print(Panel(
-                    str(response),
-                    title="Text Response",
-                    border_style="cyan"
-                ))
+                print_colored(f"Iterator Response ({len(response)} items):", 'info')
+            # Reported messages go first so they are not interleaved with the rendered response
+            event_log().flush()
+            renderer.render(response)
 
         except Exception as e:
             # Fallback for any unexpected errors
             print_colored(f"\n⚠️  Error formatting response: {str(e)}", 'error')
             print_colored("Displaying raw response:", 'info')
+            event_log().flush()
             print(response)
 
-    def test_flow(self, flow_id: str, alias_id: str, input_text: str | list, is_iterator: bool = False) -> str:
-        """Test the created flow with multi-turn support"""
+    def new_conversation(self, flow_id: str, alias_id: str) -> FlowConversation:
+        """A conversation recorded in the manager's store, if it has one"""
+        if self.conversations is not None:
+            return self.conversations.create(flow_id, alias_id)
+        return FlowConversation(flow_id, alias_id)
+
+    @instrumented('test_flow', lambda flow_id, alias_id, *_, **__: {'flow.id': flow_id, 'flow.alias': alias_id})
+    def test_flow(self, flow_id: str, alias_id: str, input_text: str | list, is_iterator: bool = False,
+                  execution_id: Optional[str] = None, reply: Optional[Callable] = None) -> str:
+        """
+        Test the created flow with multi-turn support, optionally resuming a stored conversation
+
+        When the flow asks for more input, ``reply(prompt, node_name)`` supplies
+        the answer if given; otherwise the user is prompted.
+        """
         print_colored("\n🧪 Step 5: Testing Flow", 'step')
         print_colored("-" * 30, 'info')
 
+        if (is_iterator and not execution_id and self.chunk_limits is not None
+                and isinstance(input_text, list) and self.chunk_limits.exceeded_by(input_text)):
+            print_colored(f"\nInvoking flow in chunks of up to {self.chunk_limits.max_items or 'any number of'} "
+                          f"items...", 'warning')
+            result = self.invoke_iterator(flow_id, alias_id, input_text)
+            if result['status'] != 'SUCCESS':
+                for chunk in result['failed_chunks']:
+                    print_colored(f"❌ Chunk {chunk['index']} ({chunk['items']} items, {chunk['attempts']} attempts): "
+                                  f"{chunk['error']}", 'error', event='chunk_failed', **chunk)
+                raise Exception(f"{len(result['failed_chunks'])} of {result['chunks']} chunks failed")
+            self.format_flow_response(result['output'])
+            print_colored(f"\n✅ Flow execution successful! ({result['elapsed']:.2f}s, {result['chunks']} chunks)",
+                          'success', event='flow_completed', elapsed=result['elapsed'], chunks=result['chunks'])
+            return result['output']
+
         # Initialize conversation
-        conversation = FlowConversation(flow_id, alias_id)
+        conversation = None
+        if execution_id:
+            if self.conversations is None:
+                raise ValueError("Resuming a conversation requires a session store (--session-db)")
+            conversation = self.conversations.get(execution_id)
+            if conversation is None:
+                raise ValueError(f"No stored conversation with execution ID {execution_id}")
+            print_colored(f"Resuming conversation {execution_id} ({len(conversation.messages)} messages)", 'info')
+            if conversation.pending_node:
+                conversation.add_to_history('user', input_text)
+                input_text = {'text': input_text, 'node_name': conversation.pending_node, 'is_initial': False}
+        conversation = conversation or self.new_conversation(flow_id, alias_id)
 
         try:
             while True:
-                # Prepare input payload
-                input_payload = self._prepare_input_payload(
-                    input_text,
-                    is_iterator,
-                    conversation.execution_id
-                )
-
                 print_colored("\nInvoking flow...", 'warning')
-                start_time = time.time()
-
-                # Invoke flow
-                response = self.bedrock_runtime.invoke_flow(
-                    flowIdentifier=flow_id,
-                    flowAliasIdentifier=alias_id,
-                    **({"executionId": conversation.execution_id} if conversation.execution_id else {}),
-                    inputs=[input_payload]
-                )
+                result = new_stream_result()
 
-                # Process response stream
-                result = self._process_response_stream(response, conversation)
-                execution_time = time.time() - start_time
+                # Render each output as soon as its Output node fires
+                for event in self.stream_flow(flow_id, alias_id, input_text, is_iterator, conversation):
+                    apply_stream_event(result, event)
+                    if isinstance(event, FlowOutputEvent):
+                        print_colored(f"\n📨 Output from {event.node_name} ({event.elapsed:.2f}s)", 'info')
+                        self.format_flow_response(event.document)
 
                 # Handle completion
                 if result['status'] == 'SUCCESS':
-                    print_colored(f"\n✅ Flow execution successful! ({execution_time:.2f}s)", 'success')
-                    self.format_flow_response(result['output'])
+                    print_colored(f"\n✅ Flow execution successful! ({result['elapsed']:.2f}s)", 'success',
+                                  event='flow_completed', execution_id=conversation.execution_id,
+                                  elapsed=result['elapsed'], time_to_first_output=result['time_to_first_output'])
+                    if result['time_to_first_output'] is not None:
+                        print_colored(f"Time to first output: {result['time_to_first_output']:.2f}s", 'info')
                     return result['output']
 
                 # Handle multi-turn request
@@ -772,7 +1190,11 @@ class BedrockFlowManager:
                     self.format_flow_response(result['prompt'])
 
                     # Get user input
-                    input_text = input(colored("\nYour response: ", COLORS['input']['color']))
+                    if reply is not None:
+                        input_text = reply(result['prompt'], result['node_name'])
+                        print_colored(f"\nScripted response: {input_text}", 'input')
+                    else:
+                        input_text = prompt_input("\nYour response: ")
                     conversation.add_to_history('user', input_text)
 
                     # Update node information for next turn
@@ -787,7 +1209,351 @@ class BedrockFlowManager:
         except Exception as e:
             print_colored(f"❌ Error testing flow: {str(e)}", 'error')
             raise e
-        
+
+    def stream_flow(self, flow_id: str, alias_id: str, input_data: str | list | dict,
+                    is_iterator: bool = False,
+                    conversation: Optional[FlowConversation] = None) -> Iterator[FlowEvent]:
+        """
+        Invoke the flow and yield typed events as they arrive
+
+        Unlike _process_response_stream this does not wait for flowCompletionEvent,
+        so callers can act on each FlowOutputEvent as soon as its Output node fires.
+        Every event carries the seconds elapsed since invoke_flow was called.
+        With coalescing enabled, identical new conversations in flight at the
+        same time share one execution and all receive its events; as without
+        coalescing, invoke_flow is only called once the iterator is first advanced.
+        """
+        if self.single_flight is not None and conversation is None:
+            key = ('stream', flow_id, alias_id, payload_hash(self._prepare_input_payload(input_data, is_iterator)))
+            return self.single_flight.stream(
+                key, lambda: self._stream_flow(flow_id, alias_id, input_data, is_iterator, None))
+        return self._stream_flow(flow_id, alias_id, input_data, is_iterator, conversation)
+
+    def _stream_flow(self, flow_id: str, alias_id: str, input_data: str | list | dict,
+                     is_iterator: bool, conversation: Optional[FlowConversation]) -> Iterator[FlowEvent]:
+        conversation = conversation or self.new_conversation(flow_id, alias_id)
+        input_payload = self._prepare_input_payload(input_data, is_iterator, conversation.execution_id)
+
+        instrumentation = self.instrumentation
+        attributes = {}
+        if instrumentation.enabled:
+            attributes = {'flow.id': flow_id, 'flow.alias': alias_id,
+                          'payload.bytes': len(json.dumps(input_payload, default=str))}
+
+        started = time.perf_counter()
+        with instrumentation.span('invoke_flow', **attributes):
+            # invoke_flow is not idempotent, so only throttled requests are retried. The execution
+            # runs while its events stream, so the stream keeps the limiter slot until it ends
+            response = self.throttle.call(
+                'invoke_flow',
+                self.bedrock_runtime.invoke_flow,
+                idempotent=False,
+                stream_key='responseStream',
+                flowIdentifier=flow_id,
+                flowAliasIdentifier=alias_id,
+                **({"executionId": conversation.execution_id} if conversation.execution_id else {}),
+                inputs=[input_payload]
+            )
+
+        # Not made current: the consumer's own spans run between yields
+        stream_span = instrumentation.start_span('stream_events', **attributes)
+        events = 0
+        try:
+            for event in iter_flow_events(response, conversation, started):
+                events += 1
+                yield event
+        except Exception as e:
+            stream_span.end(e)
+            raise
+        finally:
+            stream_span.set_attribute('events', events)
+            stream_span.end()
+
+    def resolve_alias_version(self, flow_id: str, alias_id: str) -> str:
+        """Version an alias currently routes to"""
+        response = self.throttle.call('get_flow_alias', self.bedrock_client.get_flow_alias,
+                                      flowIdentifier=flow_id, aliasIdentifier=alias_id)
+        return response['routingConfiguration'][0]['flowVersion']
+
+    def enable_invocation_cache(self, **kwargs):
+        """Serve repeated single-turn inputs from a cache; kwargs are passed to InvocationCache"""
+        from flow_cache import InvocationCache
+
+        self.invocation_cache = InvocationCache(self.resolve_alias_version, **kwargs)
+        return self.invocation_cache
+
+    def invoke_flow_once(self, flow_id: str, alias_id: str, input_data: str | list | dict,
+                         is_iterator: bool = False, conversation: Optional[FlowConversation] = None) -> dict:
+        """
+        Invoke the flow for a single turn without any console output
+
+        New conversations go through the invocation cache, if enabled: a hit
+        returns the stored result with ``cached`` set, and successful results
+        are stored. With coalescing enabled, identical new conversations in
+        flight at the same time share one invocation; callers that joined an
+        existing one get its result with ``coalesced`` set. Later turns of a
+        conversation always call the flow. Iterator inputs beyond
+        ``chunk_limits`` are run as chunks and merged into one result.
+        """
+        if (is_iterator and conversation is None and self.chunk_limits is not None
+                and isinstance(input_data, list) and self.chunk_limits.exceeded_by(input_data)):
+            return self.invoke_iterator(flow_id, alias_id, input_data)
+
+        cache = self.invocation_cache
+        cache_key = None
+        if cache is not None and conversation is None:
+            if cache.is_enabled(flow_id):
+                cache_key = cache.key(flow_id, alias_id, self._prepare_input_payload(input_data, is_iterator))
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return {**cached, 'outputs': list(cached['outputs']), 'execution_id': None, 'cached': True}
+            else:
+                cache.record_bypass()
+
+        def invoke() -> dict:
+            turn = conversation or self.new_conversation(flow_id, alias_id)
+            result = new_stream_result()
+            for event in self._stream_flow(flow_id, alias_id, input_data, is_iterator, turn):
+                apply_stream_event(result, event)
+
+            if cache_key is not None and result['status'] == 'SUCCESS':
+                cache.put(cache_key, {**result, 'outputs': list(result['outputs'])})
+            result['execution_id'] = turn.execution_id
+            return result
+
+        if self.single_flight is None or conversation is not None:
+            return invoke()
+
+        digest = cache_key[2] if cache_key else payload_hash(self._prepare_input_payload(input_data, is_iterator))
+        result, shared = self.single_flight.do(('invoke', flow_id, alias_id, digest), invoke)
+        # Callers that joined get their own outputs list, so none can change another's result
+        return {**result, 'outputs': list(result['outputs']), 'coalesced': True} if shared else result
+
+    def invoke_iterator(self, flow_id: str, alias_id: str, items: List, limits: Optional['ChunkLimits'] = None) -> dict:
+        """
+        Run a large iterator input as parallel chunks and return one merged result
+
+        Items are split by ``limits`` (the manager's ``chunk_limits`` by default),
+        each chunk is one invocation, retried on failure, and the collector
+        outputs are concatenated in input order. ``chunks``, ``attempts`` and
+        ``failed_chunks`` describe how the input was run.
+        """
+        from flow_chunking import ChunkLimits, invoke_chunked
+
+        limits = limits or self.chunk_limits or ChunkLimits()
+        return invoke_chunked(
+            lambda chunk: self.invoke_flow_once(flow_id, alias_id, chunk, is_iterator=True,
+                                                conversation=self.new_conversation(flow_id, alias_id)),
+            items,
+            limits,
+            self.throttle.retry_policy
+        )
+
+    def enable_coalescing(self):
+        """Share one invocation between identical concurrent single-turn requests"""
+        from flow_singleflight import SingleFlight
+
+        self.single_flight = SingleFlight()
+        return self.single_flight
+
+    def invoke_batch(self, flow_id: str, alias_id: str, input_path: str, output_path: str,
+                     is_iterator: bool = False, concurrency: int = 8, keep_order: bool = False,
+                     checkpoint_path: Optional[str] = None, resume: bool = False) -> dict:
+        """
+        Run every input of a JSONL file through the flow concurrently
+
+        Args:
+            flow_id (str): The ID of the flow to invoke
+            alias_id (str): The alias to invoke
+            input_path (str): JSONL file with one input per line
+            output_path (str): JSONL file the results are written to as they finish
+            is_iterator (bool): Wrap each input for an iterator flow
+            concurrency (int): Maximum number of in-flight invoke_flow calls
+            keep_order (bool): Write results in input order instead of completion order
+            checkpoint_path (str, optional): File recording the last completed offset
+            resume (bool): Continue from the checkpoint instead of starting over
+
+        Returns:
+            dict: Batch statistics (submitted, succeeded, failed, elapsed, throughput)
+        """
+        from flow_batch import run_batch
+
+        print_colored("\n📦 Running Batch Invocation", 'step')
+        print_colored("-" * 30, 'info')
+        print_colored(f"Input: {input_path}", 'info')
+        print_colored(f"Output: {output_path}", 'info')
+        print_colored(f"Concurrency: {concurrency}", 'info')
+
+        try:
+            stats = run_batch(
+                lambda item: self.invoke_flow_once(flow_id, alias_id, item, is_iterator),
+                input_path,
+                output_path,
+                concurrency=concurrency,
+                keep_order=keep_order,
+                checkpoint_path=checkpoint_path,
+                resume=resume
+            )
+        except Exception as e:
+            print_colored(f"❌ Error running batch: {str(e)}", 'error')
+            raise e
+
+        style = 'success' if not stats['failed'] else 'warning'
+        print_colored(f"\n✅ Batch complete ({stats['elapsed']:.2f}s)", style, event='batch_complete',
+                      submitted=stats['submitted'], succeeded=stats['succeeded'], failed=stats['failed'],
+                      elapsed=stats['elapsed'], throughput=stats['throughput'])
+        print_colored(f"  • Submitted: {stats['submitted']}", 'info')
+        print_colored(f"  • Succeeded: {stats['succeeded']}", 'info')
+        failures = ', '.join(f"{count} {status}" for status, count in sorted(stats['statuses'].items())
+                             if status != 'SUCCESS')
+        print_colored(f"  • Failed: {stats['failed']}" + (f" ({failures})" if failures else ''), 'info')
+        if stats['skipped']:
+            print_colored(f"  • Skipped (already written): {stats['skipped']}", 'info')
+        print_colored(f"  • Throughput: {stats['throughput']} inputs/s", 'info')
+
+        if self.single_flight is not None:
+            stats['coalescing'] = self.single_flight.metrics()
+            print_colored(f"  • Coalesced: {stats['coalescing']['coalesced']} of {stats['coalescing']['calls']} "
+                          f"invocations shared an in-flight call", 'info')
+        if self.invocation_cache is not None:
+            stats['cache'] = self.invocation_cache.metrics()
+            print_colored(f"  • Cache: {stats['cache']['memory_hits'] + stats['cache']['disk_hits']} hits, "
+                          f"{stats['cache']['misses']} misses ({stats['cache']['hit_rate']:.0%})", 'info')
+
+        stats['limiter'] = self.throttle.metrics().get('invoke_flow', {})
+        if stats['limiter'].get('throttles'):
+            print_colored(f"  • Throttled: {stats['limiter']['throttles']} "
+                          f"(retries: {stats['limiter']['retries']}, "
+                          f"settled at {stats['limiter']['rate']} req/s)", 'warning')
+
+        return stats
+
+    def run_scripts(self, flow_id: str, alias_id: str, script_path: str, is_iterator: bool = False,
+                    concurrency: int = 8, repeat: int = 1, output_path: Optional[str] = None) -> dict:
+        """
+        Replay scripted multi-turn conversations concurrently and report their latencies
+
+        Args:
+            script_path (str): JSON or JSONL file of conversation scripts (see flow_scripts.load_scripts)
+            concurrency (int): Maximum number of conversations in progress at once
+            repeat (int): Number of times each script is run
+            output_path (str, optional): JSONL file receiving one record per conversation
+        """
+        from flow_scripts import ConversationDriver, load_scripts
+
+        print_colored("\n🎭 Replaying Scripted Conversations", 'step')
+        print_colored("-" * 30, 'info')
+        scripts = load_scripts(script_path)
+        print_colored(f"Scripts: {len(scripts)} × {repeat}", 'info')
+        print_colored(f"Concurrency: {concurrency}", 'info')
+
+        driver = ConversationDriver(
+            lambda input_data, conversation: self.invoke_flow_once(
+                flow_id, alias_id, input_data, is_iterator, conversation),
+            lambda: self.new_conversation(flow_id, alias_id),
+            concurrency=concurrency
+        )
+
+        out = open(output_path, 'w') if output_path else None
+        write_lock = threading.Lock()
+
+        def on_result(record: dict):
+            if record['status'] != 'SUCCESS':
+                error = record.get('error') or f"Conversation ended with status {record['status']}"
+                print_colored(f"❌ {record['name']}: {error}", 'error', event='conversation_failed',
+                              name=record['name'], status=record['status'], error=error)
+            if out:
+                with write_lock:
+                    out.write(json.dumps(record, default=str) + '\n')
+
+        try:
+            report = driver.run(scripts, repeat=repeat, on_result=on_result)
+        finally:
+            if out:
+                out.close()
+
+        style = 'success' if not report['failed'] else 'warning'
+        print_colored(f"\n✅ Conversations complete ({report['elapsed']:.2f}s)", style, event='conversations_complete',
+                      conversations=report['conversations'], failed=report['failed'], turns=report['turns'],
+                      elapsed=report['elapsed'])
+        print_colored(f"  • Conversations: {report['conversations']} ({report['failed']} failed)", 'info')
+        print_colored(f"  • Turns: {report['turns']}", 'info')
+        print_colored(f"  • Throughput: {report['conversations_per_second']} conversations/s", 'info')
+        for label, key in (("Turn latency", 'turn_latency'), ("Conversation latency", 'conversation_latency')):
+            stats = report[key]
+            if stats['count']:
+                print_colored(f"  • {label}: p50 {stats['p50']:.3f}s, p95 {stats['p95']:.3f}s, "
+                              f"max {stats['max']:.3f}s", 'info')
+        return report
+
+    def bench(self, flow_id: str, alias_id: str, input_data: str | list, is_iterator: bool = False,
+              duration: float = 10.0, concurrency: Optional[int] = None, rate: Optional[float] = None,
+              warmup: float = 1.0, report_path: Optional[str] = None, baseline_path: Optional[str] = None,
+              threshold: float = 0.1) -> dict:
+        """
+        Drive the flow at a target rate or concurrency for a fixed duration and report latencies
+
+        Each request goes through stream_flow, so the report covers the client
+        hot path: rate limiting, invoke_flow and stream parsing. With a
+        ``baseline_path`` the headline metrics are compared against an earlier
+        report and regressions beyond ``threshold`` are flagged in ``regressions``.
+        """
+        from flow_bench import compare_reports, run_benchmark, write_report
+
+        print_colored("\n⏱️  Benchmarking Flow", 'step')
+        print_colored("-" * 30, 'info')
+        load = f"{rate} req/s" if rate else f"concurrency {concurrency}"
+        print_colored(f"Load: {load} for {duration}s (warmup {warmup}s)", 'info')
+
+        def invoke_once() -> Optional[float]:
+            first_event = None
+            result = new_stream_result()
+            for event in self.stream_flow(flow_id, alias_id, input_data, is_iterator):
+                if first_event is None:
+                    first_event = event.elapsed
+                apply_stream_event(result, event)
+            if result['status'] not in ('SUCCESS', 'INPUT_REQUIRED'):
+                raise RuntimeError(f"Flow ended with status {result['status']}")
+            return first_event
+
+        limiter_before = self.throttle.metrics().get('invoke_flow', {})
+        report = run_benchmark(invoke_once, duration=duration, concurrency=concurrency, rate=rate, warmup=warmup)
+        limiter = self.throttle.metrics().get('invoke_flow', {})
+        report['throttles_retried'] = limiter.get('throttles', 0) - limiter_before.get('throttles', 0)
+        report['limiter'] = limiter
+
+        latency, first_event = report['latency'], report['first_event']
+        style = 'success' if not report['failed'] else 'warning'
+        print_colored(f"\n✅ Benchmark complete ({report['elapsed']:.2f}s measured)", style, event='bench_complete',
+                      requests=report['requests'], failed=report['failed'], throughput=report['throughput'],
+                      latency_p50=latency['p50'], latency_p99=latency['p99'])
+        print_colored(f"  • Requests: {report['requests']} ({report['failed']} failed, "
+                      f"{report['throttled']} throttled, {report['throttles_retried']} throttles retried)", 'info')
+        print_colored(f"  • Throughput: {report['throughput']} req/s", 'info')
+        if latency['count']:
+            print_colored(f"  • Latency: p50 {latency['p50'] * 1000:.1f} ms, p95 {latency['p95'] * 1000:.1f} ms, "
+                          f"p99 {latency['p99'] * 1000:.1f} ms, max {latency['max'] * 1000:.1f} ms", 'info')
+        if first_event['count']:
+            print_colored(f"  • First event: p50 {first_event['p50'] * 1000:.1f} ms, "
+                          f"p99 {first_event['p99'] * 1000:.1f} ms", 'info')
+        for code, count in sorted(report['errors'].items()):
+            print_colored(f"  • {code}: {count}", 'warning')
+
+        if baseline_path:
+            with open(baseline_path, 'r') as f:
+                changes = compare_reports(json.load(f), report, threshold)
+            report['regressions'] = [change['metric'] for change in changes if change['regression']]
+            print_colored(f"\nCompared with {baseline_path}:", 'info')
+            for change in changes:
+                marker = "❌" if change['regression'] else "•"
+                print_colored(f"  {marker} {change['metric']}: {change['baseline']} → {change['current']} "
+                              f"({change['change']:+.1%})", 'error' if change['regression'] else 'info')
+
+        if report_path:
+            write_report(report, report_path)
+            print_colored(f"Report written to {report_path}", 'info')
+        return report
+
     def export_flow_definition(self, flow_id: str, output_path: str = None) -> dict:
         """
         Export flow definition to a JSON file
@@ -799,21 +1565,17 @@ class BedrockFlowManager:
         Returns:
             dict: The flow definition
         """
+        from flow_export import flow_export_data
+
         print_colored("\n📤 Exporting Flow Definition", 'step')
         print_colored("-" * 30, 'info')
         
         try:
             # Get flow details
-            flow_details = self.bedrock_client.get_flow(flowIdentifier=flow_id)
+            flow_details = self.throttle.call('get_flow', self.bedrock_client.get_flow, flowIdentifier=flow_id)
             
             # Extract relevant information
-            flow_data = {
-                "name": flow_details['name'],
-                "description": flow_details.get('description', ''),
-                "definition": flow_details['definition'],
-                "tags": flow_details.get('tags', {}),
-                "executionRoleArn": flow_details.get('executionRoleArn')
-            }
+            flow_data = flow_export_data(flow_details)
             
             # Generate output path if not provided
             if not output_path:
@@ -842,65 +1604,80 @@ class BedrockFlowManager:
             print_colored(f"❌ Error exporting flow definition: {str(e)}", 'error')
             raise e
 
-    def _prepare_input_payload(self, input_data: str | dict, is_iterator: bool, execution_id: str = None) -> dict:
-        """Prepare input payload for flow invocation"""
+    def export_flows(self, archive_dir: str, name_pattern: Optional[str] = None, concurrency: int = 8,
+                     verify: bool = False, summary_path: Optional[str] = None) -> dict:
+        """
+        Snapshot every flow in the account into an incremental, content-addressed archive
 
-        # Handle dictionary input for multi-turn
-        if isinstance(input_data, dict):
-            node_name = input_data['node_name']
-            is_initial = input_data['is_initial']
-            content = input_data['text']
-        else:
-            node_name = "FlowInputNode"
-            is_initial = True
-            content = input_data
-
-        # Prepare content based on iterator status
-        if is_iterator:
-            if isinstance(content, str):
-                content = [content]
-            elif not isinstance(content, list):
-                raise ValueError(f"Unsupported input type: {type(content)}")
-
-        payload = {
-            "content": {"document": content},
-            "nodeName": node_name
-        }
+        Args:
+            archive_dir (str): Archive directory; created on the first run and updated in place after that
+            name_pattern (str, optional): Glob matched against flow names, e.g. 'tenant-*'
+            concurrency (int): Definitions fetched at once; API rates are set by the limiter
+            verify (bool): Fetch and hash every flow instead of trusting unchanged updatedAt times
+            summary_path (str, optional): Write the export results as JSON
 
-        # Add appropriate node name based on turn
-        if is_initial:
-            payload["nodeOutputName"] = "document"
-        else:
-            payload["nodeInputName"] = "agentInputText"
+        Returns:
+            dict: Counts of exported, unchanged, skipped, removed and failed flows, and bytes written
+        """
+        from flow_export import FlowExporter
 
-        return payload
+        print_colored("\n🗄️  Exporting Flows", 'step')
+        print_colored("-" * 30, 'info')
+        print_colored(f"Archive: {archive_dir}", 'info')
+        print_colored(f"Concurrency: {concurrency}", 'info')
+
+        def report(flow: dict):
+            if flow['status'] == 'EXPORTED':
+                print_colored(f"  📦 {flow['name']} ({flow['flow_id']}): {flow['hash'][:12]}", 'info',
+                              event='flow_exported', flow_id=flow['flow_id'], flow_name=flow['name'],
+                              hash=flow['hash'])
+            elif flow['status'] == 'FAILED':
+                print_colored(f"  ❌ {flow['name']} ({flow['failed_stage']}): {flow['error']}", 'error',
+                              event='export_failed', flow_id=flow['flow_id'], flow_name=flow['name'],
+                              failed_stage=flow['failed_stage'], error=flow['error'])
 
-    def _process_response_stream(self, response: dict, conversation: FlowConversation) -> dict:
-        """Process response stream from flow invocation"""
+        try:
+            exporter = FlowExporter(self.bedrock_client, self.throttle, archive_dir, concurrency=concurrency)
+            result = exporter.export(name_pattern=name_pattern, verify=verify, on_result=report)
+        except Exception as e:
+            print_colored(f"❌ Error exporting flows: {str(e)}", 'error')
+            raise e
 
-        result = {
-            'status': None,
-            'output': None,
-            'prompt': None,
-            'node_name': None
-        }
+        style = 'success' if not result['failed'] else 'warning'
+        print_colored(f"\n✅ Export complete ({result['elapsed']:.2f}s)", style, event='export_complete',
+                      listed=result['listed'], exported=result['exported'], unchanged=result['unchanged'],
+                      skipped=result['skipped'], removed=len(result['removed']), failed=result['failed'],
+                      bytes_written=result['bytes_written'], elapsed=result['elapsed'])
+        print_colored(f"  • Flows listed: {result['listed']}", 'info')
+        print_colored(f"  • Exported: {result['exported']} ({result['objects_written']} new objects, "
+                      f"{result['bytes_written'] / 1024:.1f} KiB)", 'info')
+        print_colored(f"  • Unchanged content: {result['unchanged']}", 'info')
+        print_colored(f"  • Skipped (updatedAt unchanged): {result['skipped']}", 'info')
+        print_colored(f"  • Removed from manifest: {len(result['removed'])}", 'info')
+        print_colored(f"  • Failed: {result['failed']}", 'info')
+        if result['snapshot']:
+            print_colored(f"  • Snapshot: {result['snapshot']}", 'info')
+
+        if summary_path:
+            with open(summary_path, 'w') as f:
+                json.dump(result, f, indent=2, default=str)
+            print_colored(f"  • Summary written to: {summary_path}", 'info')
 
-        # Update execution ID
-        conversation.execution_id = response.get('executionId', conversation.execution_id)
+        return result
 
-        # Process stream events
-        for event in response.get("responseStream", []):
-            if 'flowCompletionEvent' in event:
-                result['status'] = event['flowCompletionEvent']['completionReason']
+    def _prepare_input_payload(self, input_data: str | dict, is_iterator: bool, execution_id: str = None) -> dict:
+        """Prepare input payload for flow invocation"""
+        return prepare_input_payload(input_data, is_iterator)
 
-            elif 'flowMultiTurnInputRequestEvent' in event:
-                result['prompt'] = event['flowMultiTurnInputRequestEvent']['content']['document']
-                result['node_name'] = event['flowMultiTurnInputRequestEvent']['nodeName']
-                conversation.add_to_history('assistant', result['prompt'])
+    def _process_response_stream(self, response: dict, conversation: FlowConversation,
+                                 started: Optional[float] = None) -> dict:
+        """Process response stream from flow invocation"""
 
-            elif 'flowOutputEvent' in event:
-                result['output'] = event['flowOutputEvent']['content']['document']
-                conversation.add_to_history('assistant', result['output'])
+        result = new_stream_result()
+
+        # Process stream events
+        for event in iter_flow_events(response, conversation, started):
+            apply_stream_event(result, event)
 
         return result
 
@@ -921,10 +1698,11 @@ def get_default_region_and_profile() -> Tuple[str, str]:
 
     if not region:
         try:
-            # Try to get region from default session
-            session = boto3.Session()
-            region = session.region_name
-        except:
+            # Try to get region from the AWS config via the shared session
+            region = default_pool.session(profile).region_name
+        except Exception:
+            region = None
+        if not region:
             region = FALLBACK_REGION
             print_colored(f"No region found in environment or config, using fallback: {region}", 'warning')
 
@@ -936,23 +1714,21 @@ def get_default_region_and_profile() -> Tuple[str, str]:
 
 
 def parse_args():
+    from flow_render import DEFAULT_MAX_BYTES, RENDER_MODES
+
     parser = argparse.ArgumentParser(
         description='Create and run Amazon Bedrock Flow from template',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
 
-    # Get defaults
-    default_region, default_profile = get_default_region_and_profile()
-
+    # Defaults are resolved after parsing, so --help never touches the AWS config
     parser.add_argument(
         '--region',
-        default=default_region,
-        help=f'AWS region (default: {default_region})'
+        help='AWS region (default: AWS_REGION, AWS_DEFAULT_REGION, AWS config or us-west-2)'
     )
     parser.add_argument(
         '--profile',
-        default=default_profile,
-        help=f'AWS profile name (default: {default_profile})'
+        help='AWS profile name (default: AWS_PROFILE, AWS_DEFAULT_PROFILE or default)'
     )
     parser.add_argument(
         '--flow-name',
@@ -966,7 +1742,7 @@ def parse_args():
     parser.add_argument(
         '--cleanup',
         action='store_true',
-        help='Clean up resources after testing'
+        help='Delete the flow after testing; only a flow created by this run is deleted (see --always-create)'
     )
     parser.add_argument(
         '--templates-dir',
@@ -979,8 +1755,337 @@ def parse_args():
         help='Name of existing IAM role to use instead of creating a new one'
     )
 
+    parser.add_argument(
+        '--always-create',
+        action='store_true',
+        help='Always create a new flow instead of reusing or updating a deployed flow with the same name'
+    )
+
+    parser.add_argument(
+        '--session-db',
+        help='SQLite file that multi-turn conversations are recorded in so they can be resumed'
+    )
+
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        help='Split iterator inputs into chunks of at most this many items, invoked in parallel'
+    )
+    parser.add_argument(
+        '--chunk-bytes',
+        type=int,
+        help='Split iterator inputs into chunks of at most this many bytes of JSON, invoked in parallel'
+    )
+    parser.add_argument(
+        '--chunk-concurrency',
+        type=int,
+        default=8,
+        help='Maximum number of iterator chunks in flight at once (default: 8)'
+    )
+
+    parser.add_argument(
+        '--output-format',
+        choices=RENDER_MODES,
+        default='rich',
+        help='How flow responses are printed: rich panels, raw text or one JSON object per line (default: rich)'
+    )
+    parser.add_argument(
+        '--max-output-bytes',
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help=f'Truncate each printed document to this many bytes, 0 for no limit (default: {DEFAULT_MAX_BYTES})'
+    )
+    parser.add_argument(
+        '--page-size',
+        type=int,
+        help='Pause after this many response items and ask before printing more (rich output only)'
+    )
+
+    parser.add_argument(
+        '--quiet',
+        action='store_true',
+        help='Only report results, warnings and errors on the console, not progress'
+    )
+    parser.add_argument(
+        '--events-file',
+        help='Also append every reported event to this file as NDJSON'
+    )
+
+    parser.add_argument(
+        '--trace-file',
+        help='Write a span per stage (template, create, prepare, invoke, stream, render) to this OTLP/JSON file'
+    )
+    parser.add_argument(
+        '--metrics-file',
+        help='Write per-stage counters and duration histograms to this file in Prometheus text format'
+    )
+    parser.add_argument('--cprofile', help='Save a cProfile capture of the run to this file')
+    parser.add_argument('--trace-memory', help='Write the top tracemalloc allocation sites to this file')
+
+    subparsers = parser.add_subparsers(dest='command')
+
+    templates_parser = subparsers.add_parser(
+        'templates',
+        help='List the available templates and exit without calling AWS'
+    )
+    templates_parser.add_argument('--tag', help='Only templates carrying this tag key (or key=value)')
+    templates_parser.add_argument('--node-type', help='Only templates containing this node type, e.g. Iterator')
+    templates_parser.add_argument('--search', help='Only templates whose name or description contains this text')
+
+    validate_parser = subparsers.add_parser(
+        'validate',
+        help='Check templates for graph and type errors locally without calling AWS'
+    )
+    validate_parser.add_argument(
+        'paths',
+        nargs='*',
+        help='Template files or directories to validate (default: the templates directory)'
+    )
+
+    batch_parser = subparsers.add_parser(
+        'batch',
+        help='Run a JSONL file of inputs through an existing flow concurrently'
+    )
+    batch_parser.add_argument('--flow-id', required=True, help='ID of the flow to invoke')
+    batch_parser.add_argument('--alias-id', required=True, help='Alias of the flow to invoke')
+    batch_parser.add_argument('--input', required=True, help='JSONL file with one input per line')
+    batch_parser.add_argument('--output', required=True, help='JSONL file to write results to')
+    batch_parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=8,
+        help='Maximum number of concurrent flow invocations (default: 8)'
+    )
+    batch_parser.add_argument(
+        '--keep-order',
+        action='store_true',
+        help='Write results in input order instead of completion order'
+    )
+    batch_parser.add_argument(
+        '--iterator',
+        action='store_true',
+        help='Wrap each input as an array for iterator flows'
+    )
+    batch_parser.add_argument(
+        '--checkpoint',
+        help='Checkpoint file (default: <output>.checkpoint)'
+    )
+    batch_parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Resume from the checkpoint instead of starting over'
+    )
+    batch_parser.add_argument(
+        '--coalesce',
+        action='store_true',
+        help='Share one invocation between identical inputs that are in flight at the same time'
+    )
+    batch_parser.add_argument(
+        '--cache',
+        action='store_true',
+        help='Reuse results of identical inputs to the same flow version, in memory and on disk'
+    )
+    batch_parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=3600.0,
+        help='Seconds a cached result stays valid (default: 3600)'
+    )
+    batch_parser.add_argument(
+        '--cache-max-mb',
+        type=float,
+        default=256.0,
+        help='Largest size of the on-disk cache before the oldest results are evicted (default: 256)'
+    )
+
+    converse_parser = subparsers.add_parser(
+        'converse',
+        help='Replay scripted multi-turn conversations against a deployed flow'
+    )
+    converse_parser.add_argument('--flow-id', required=True, help='ID of the flow to invoke')
+    converse_parser.add_argument('--alias-id', required=True, help='Alias of the flow to invoke')
+    converse_parser.add_argument('--script', required=True, help='JSON or JSONL file of conversation scripts')
+    converse_parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=8,
+        help='Maximum number of conversations in progress at once (default: 8)'
+    )
+    converse_parser.add_argument('--repeat', type=int, default=1, help='Number of times each script is run')
+    converse_parser.add_argument('--output', help='JSONL file to write one record per conversation to')
+    converse_parser.add_argument('--iterator', action='store_true', help='Wrap each input for an iterator flow')
+
+    bench_parser = subparsers.add_parser(
+        'bench',
+        help='Load-test a flow at a target rate or concurrency and report latency percentiles'
+    )
+    bench_parser.add_argument('--flow-id', help='ID of the flow to invoke (not needed with --fake)')
+    bench_parser.add_argument('--alias-id', help='Alias of the flow to invoke (not needed with --fake)')
+    bench_parser.add_argument('--input', default='What is Amazon Bedrock?', help='Input sent with every request')
+    bench_parser.add_argument('--iterator', action='store_true', help='Wrap the input for an iterator flow')
+    load_group = bench_parser.add_mutually_exclusive_group()
+    load_group.add_argument('--concurrency', type=int, help='Number of requests kept in flight (default: 8)')
+    load_group.add_argument('--rate', type=float, help='Target requests per second, started on a fixed schedule')
+    bench_parser.add_argument('--duration', type=float, default=10.0, help='Seconds to measure (default: 10)')
+    bench_parser.add_argument('--warmup', type=float, default=1.0, help='Seconds to run before measuring (default: 1)')
+    bench_parser.add_argument('--report', help='Write the JSON report to this file')
+    bench_parser.add_argument('--baseline', help='Compare against an earlier JSON report')
+    bench_parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='Relative change that counts as a regression against the baseline (default: 0.1)'
+    )
+    bench_parser.add_argument('--fake', action='store_true',
+                              help='Benchmark against a local fake bedrock-agent-runtime instead of AWS')
+    bench_parser.add_argument('--fake-latency', type=float, default=0.05, help='Fake execution time in seconds')
+    bench_parser.add_argument('--fake-outputs', type=int, default=1, help='Output events per fake execution')
+    bench_parser.add_argument('--fake-error-rate', type=float, default=0.0, help='Fraction of fake calls that fail')
+    bench_parser.add_argument('--fake-throttle-rate', type=float, default=0.0,
+                              help='Fraction of fake calls that are throttled')
+
+    sessions_parser = subparsers.add_parser(
+        'sessions',
+        help='List or resume multi-turn conversations recorded with --session-db'
+    )
+    sessions_parser.add_argument('--execution-id', help='Print the history of this conversation')
+    sessions_parser.add_argument('--reply', help='Resume the conversation by sending this reply to the flow')
+    sessions_parser.add_argument('--limit', type=int, default=20, help='Number of recent conversations to list')
+
+    gc_parser = subparsers.add_parser(
+        'gc',
+        help='Delete orphaned flows (aliases, then versions, then the flow) selected by name, tag or age'
+    )
+    gc_parser.add_argument('--name-pattern', help="Glob matched against flow names, e.g. 'tenant-*'")
+    gc_parser.add_argument(
+        '--tag',
+        action='append',
+        help='Only flows with this tag key (or key=value); repeat to require several'
+    )
+    gc_parser.add_argument('--older-than', help='Only flows last updated longer ago than this, e.g. 12h or 7d')
+    gc_parser.add_argument('--dry-run', action='store_true', help='Print the deletion plan without deleting')
+    gc_parser.add_argument('--yes', action='store_true', help='Delete without asking for confirmation')
+    gc_parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=16,
+        help='Flows processed at once per stage (default: 16)'
+    )
+    gc_parser.add_argument('--summary', help='Write the plan and results to this JSON file')
+
+    export_parser = subparsers.add_parser(
+        'export',
+        help='Incrementally snapshot every flow definition into a compressed, content-addressed archive'
+    )
+    export_parser.add_argument(
+        '--archive',
+        default='./flow-archive',
+        help='Archive directory holding manifest.json, objects/ and snapshots/ (default: ./flow-archive)'
+    )
+    export_parser.add_argument('--name-pattern', help="Only flows whose name matches this glob, e.g. 'tenant-*'")
+    export_parser.add_argument(
+        '--verify',
+        action='store_true',
+        help='Fetch and hash every flow, even those whose updatedAt is unchanged'
+    )
+    export_parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=8,
+        help='Flow definitions fetched at once (default: 8)'
+    )
+    export_parser.add_argument('--summary', help='Write the export results to this JSON file')
+
+    route_parser = subparsers.add_parser(
+        'route',
+        help='Replay historical inputs through a template\'s Condition nodes and report the branch distribution'
+    )
+    route_parser.add_argument(
+        '--template',
+        required=True,
+        help='Template file name in the templates directory, or a path to a template'
+    )
+    route_parser.add_argument(
+        '--input',
+        required=True,
+        help='JSONL file of Condition node inputs, one object (or single value) per line'
+    )
+    route_parser.add_argument('--node', help='Only report this Condition node')
+
+    local_parser = subparsers.add_parser(
+        'local',
+        help='Run a template in-process with stub Prompt/KnowledgeBase/Agent nodes, without calling AWS'
+    )
+    local_parser.add_argument(
+        '--template',
+        required=True,
+        help='Template file name in the templates directory, or a path to a template'
+    )
+    local_parser.add_argument(
+        '--input',
+        dest='test_input',
+        nargs='+',
+        default=argparse.SUPPRESS,
+        help='Input to run through the flow (same as --test-input)'
+    )
+    local_parser.add_argument('--script', help='Replay the conversation scripts in this JSON or JSONL file instead')
+
+    fleet_parser = subparsers.add_parser(
+        'fleet',
+        help='Render a template once per row of variable bindings and deploy the flows concurrently'
+    )
+    fleet_parser.add_argument(
+        '--template',
+        required=True,
+        help='Template file name in the templates directory, or a path to a template'
+    )
+    fleet_parser.add_argument(
+        '--bindings',
+        required=True,
+        help='CSV or JSONL file of variable bindings, one flow per row (optional flow_name column)'
+    )
+    fleet_parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=8,
+        help='Maximum number of flows deployed at once (default: 8)'
+    )
+    fleet_parser.add_argument(
+        '--summary',
+        help='Write the deployment summary to this JSON file'
+    )
+
     args = parser.parse_args()
 
+    # Reporting is set up first so every message below honours --quiet and --events-file
+    configure_events(args)
+
+    if args.command in ('templates', 'validate', 'route'):
+        return args
+
+    if args.command == 'sessions':
+        if not args.session_db:
+            parser.error("sessions requires --session-db")
+        if not args.reply:
+            return args
+        if not args.execution_id:
+            parser.error("--reply requires --execution-id")
+
+    if args.command == 'bench':
+        if not args.fake and not (args.flow_id and args.alias_id):
+            parser.error("bench requires --flow-id and --alias-id, or --fake")
+        if not args.rate and not args.concurrency:
+            args.concurrency = 8
+
+    is_offline = args.command == 'local' or (args.command == 'bench' and args.fake)
+    if not is_offline and (not args.region or not args.profile):
+        default_region, default_profile = get_default_region_and_profile()
+        args.region = args.region or default_region
+        args.profile = args.profile or default_profile
+
+    if args.command == 'batch' and not args.checkpoint:
+        args.checkpoint = f"{args.output}.checkpoint"
+
     # Convert test_input to appropriate format if provided
     if args.test_input:
         if len(args.test_input) == 1:
@@ -1004,15 +2109,329 @@ def parse_args():
     return args
 
 
+def _definition_attributes(flow_definition: dict, flow_name: Optional[str]) -> dict:
+    """Span attributes describing a flow definition's size"""
+    return {
+        'flow.name': flow_name or '',
+        'flow.nodes': len(flow_definition.get('nodes', [])),
+        'flow.connections': len(flow_definition.get('connections', []))
+    }
+
+
+def resolve_template_path(template: str, templates_dir: str) -> Path:
+    """Accept either a path to a template or a file name in the templates directory"""
+    template_path = Path(template)
+    if not template_path.exists():
+        template_path = Path(templates_dir) / template
+    return template_path
+
+
+def report_validation(paths: List[str]) -> bool:
+    """Validate templates and print the issues found, returning True when all are valid"""
+    from flow_validation import validate_templates
+
+    print_colored("\n🔎 Validating Templates:", 'step')
+    print_colored("-" * 50, 'info')
+
+    results = validate_templates(paths)
+    for path, issues in results.items():
+        if not issues:
+            print_colored(f"✅ {path}", 'success')
+            continue
+        print_colored(f"❌ {path}", 'error')
+        for issue in issues:
+            print_colored(f"   {issue}", 'error', prefix='   ')
+
+    invalid = sum(1 for issues in results.values() if issues)
+    print_colored("-" * 50, 'info')
+    print_colored(f"{len(results) - invalid} valid, {invalid} invalid", 'warning' if invalid else 'success')
+    return invalid == 0 and bool(results)
+
+
+def report_routing(template_path: Path, input_path: str, node_name: Optional[str] = None) -> bool:
+    """Evaluate a template's Condition nodes over a JSONL file of inputs and print how rows are routed"""
+    from flow_conditions import DEFAULT_CONDITION, compile_conditions, load_columns
+    from flow_templates import compile_template
+
+    print_colored("\n🔀 Condition Routing:", 'step')
+    print_colored("-" * 50, 'info')
+
+    try:
+        evaluators = compile_conditions(compile_template(template_path).definition)
+        if node_name:
+            evaluators = {node_name: evaluators[node_name]} if node_name in evaluators else {}
+        if not evaluators:
+            print_colored(f"No matching Condition nodes in {template_path}", 'warning')
+            return False
+
+        for name, evaluator in evaluators.items():
+            columns = load_columns(input_path, evaluator.inputs)
+            rows = len(next(iter(columns.values()), []))
+            started = time.perf_counter()
+            distribution = evaluator.distribution(columns)
+            elapsed = time.perf_counter() - started
+
+            print_colored(f"{name} ({rows} rows, {elapsed * 1000:.1f} ms)", 'info')
+            for branch, count in sorted(distribution.items(), key=lambda item: -item[1]):
+                share = count / rows * 100 if rows else 0.0
+                print_colored(f"  • {branch}: {count} ({share:.1f}%)", 'info')
+            if evaluator.errors:
+                print_colored(f"  ⚠️  {evaluator.errors} rows could not be compared (null or mismatched values) "
+                              f"and took the {DEFAULT_CONDITION} branch", 'warning')
+            print_colored("-" * 50, 'info')
+    except Exception as e:
+        print_colored(f"❌ Error evaluating conditions: {str(e)}", 'error')
+        return False
+
+    return True
+
+
+def report_sessions(conversations: 'ConversationStore', execution_id: Optional[str] = None, limit: int = 20) -> bool:
+    """Print one stored conversation's history, or the most recent conversations"""
+    from flow_events import event_log
+
+    if execution_id:
+        conversation = conversations.get(execution_id)
+        if conversation is None:
+            print_colored(f"No stored conversation with execution ID {execution_id}", 'error')
+            return False
+        print_colored(f"\n💬 Conversation {execution_id}", 'step')
+        print_colored(f"Flow: {conversation.flow_id}  Alias: {conversation.alias_id}", 'info')
+        event_log().flush()
+        print(conversation.get_formatted_history())
+        if conversation.pending_node:
+            print_colored(f"Waiting for input to {conversation.pending_node}", 'warning')
+        return True
+
+    sessions = conversations.sessions(limit)
+    print_colored("\n💬 Recent Conversations:", 'step')
+    print_colored("-" * 50, 'info')
+    for session in sessions:
+        waiting = f", waiting on {session['pending_node']}" if session['pending_node'] else ""
+        print_colored(f"{session['execution_id']} — {session['flow_id']}/{session['alias_id']}, "
+                      f"{session['messages']} messages{waiting}", 'info')
+    if not sessions:
+        print_colored("No conversations recorded", 'warning')
+    return True
+
+
+def configure_events(args) -> 'EventLog':
+    """
+    Event log for a command line run, written from a background thread
+
+    Events go to the console, on stderr when the response itself is printed
+    headless to stdout, and with --events-file to an NDJSON file as well.
+    Library log records are routed into the same log.
+    """
+    from flow_events import EventLog, EventLogHandler, NDJSONSink, TTYSink, set_event_log
+
+    sinks = [TTYSink(sys.stderr if args.output_format != 'rich' else None, quiet=args.quiet)]
+    if args.events_file:
+        sinks.append(NDJSONSink(args.events_file))
+    log = EventLog(sinks, background=True)
+    set_event_log(log)
+    logging.getLogger().handlers = [EventLogHandler(log)]
+    return log
+
+
 def main():
+    from flow_events import event_log
+    from flow_instrumentation import SpanRecorder, capture_profile
+
     args = parse_args()
 
+    events = event_log()
+    instrumentation = SpanRecorder() if args.trace_file or args.metrics_file else None
     try:
-        # Initialize flow manager
-        flow_manager = BedrockFlowManager(args.region, args.profile, args.existing_role)
+        with capture_profile(args.cprofile, args.trace_memory):
+            run_command(args, instrumentation)
+    finally:
+        events.close()
+        if args.trace_file:
+            instrumentation.write_otlp(args.trace_file)
+        if args.metrics_file:
+            instrumentation.write_prometheus(args.metrics_file)
+
+
+def run_command(args, instrumentation: Optional[Instrumentation] = None):
+    from flow_chunking import ChunkLimits
+    from flow_render import ResponseRenderer
+    from flow_sessions import ConversationStore
+
+    if args.command == 'templates':
+        templates = BedrockFlowManager.list_templates(
+            args.templates_dir,
+            tag=args.tag,
+            node_type=args.node_type,
+            search=args.search
+        )
+        sys.exit(0 if templates else 1)
+
+    if args.command == 'validate':
+        sys.exit(0 if report_validation(args.paths or [args.templates_dir]) else 1)
+
+    if args.command == 'route':
+        template_path = resolve_template_path(args.template, args.templates_dir)
+        sys.exit(0 if report_routing(template_path, args.input, args.node) else 1)
+
+    conversations = ConversationStore(args.session_db) if args.session_db else None
+    if args.command == 'sessions' and not args.reply:
+        with conversations:
+            sys.exit(0 if report_sessions(conversations, args.execution_id, args.limit) else 1)
 
-        # Pass existing role name to create_iam_role
-        flow_manager.role_arn = flow_manager.create_iam_role(args.existing_role)
+    try:
+        # Initialize flow manager
+        chunk_limits = None
+        if args.chunk_size or args.chunk_bytes:
+            chunk_limits = ChunkLimits(args.chunk_size, args.chunk_bytes, args.chunk_concurrency)
+        flow_manager = BedrockFlowManager(args.region, args.profile, args.existing_role,
+                                          conversations=conversations, instrumentation=instrumentation,
+                                          chunk_limits=chunk_limits,
+                                          renderer=ResponseRenderer(args.output_format, args.max_output_bytes,
+                                                                    args.page_size))
+
+        if args.command == 'sessions':
+            conversation = conversations.get(args.execution_id)
+            if conversation is None:
+                raise ValueError(f"No stored conversation with execution ID {args.execution_id}")
+            flow_manager.test_flow(conversation.flow_id, conversation.alias_id, args.reply,
+                                   execution_id=args.execution_id)
+            print_colored("\n✨ Operation completed successfully!", 'success')
+            return
+
+        if args.command == 'batch':
+            if args.cache:
+                flow_manager.enable_invocation_cache(ttl=args.cache_ttl,
+                                                    max_disk_bytes=int(args.cache_max_mb * 1024 * 1024))
+            if args.coalesce:
+                flow_manager.enable_coalescing()
+            stats = flow_manager.invoke_batch(
+                args.flow_id,
+                args.alias_id,
+                args.input,
+                args.output,
+                is_iterator=args.iterator,
+                concurrency=args.concurrency,
+                keep_order=args.keep_order,
+                checkpoint_path=args.checkpoint,
+                resume=args.resume
+            )
+            if stats['failed']:
+                sys.exit(1)
+            print_colored("\n✨ Operation completed successfully!", 'success')
+            return
+
+        if args.command == 'bench':
+            flow_id, alias_id = args.flow_id, args.alias_id
+            if args.fake:
+                from flow_bench import FakeFlowRuntime
+                from flow_throttle import ThrottleRegistry
+
+                flow_id, alias_id = flow_id or 'fake', alias_id or 'fake'
+                flow_manager.bedrock_runtime = FakeFlowRuntime(
+                    latency=args.fake_latency,
+                    outputs=args.fake_outputs,
+                    error_rate=args.fake_error_rate,
+                    throttle_rate=args.fake_throttle_rate
+                )
+                # Start the limiter at the requested load so slow-start does not skew short runs
+                load = args.rate or args.concurrency
+                flow_manager.throttle = ThrottleRegistry(
+                    {'invoke_flow': (args.rate or 1000.0, max(1000.0, load * 2), load, max(256, load * 2))}
+                )
+            report = flow_manager.bench(
+                flow_id,
+                alias_id,
+                args.input,
+                is_iterator=args.iterator,
+                duration=args.duration,
+                concurrency=args.concurrency,
+                rate=args.rate,
+                warmup=args.warmup,
+                report_path=args.report,
+                baseline_path=args.baseline,
+                threshold=args.threshold
+            )
+            if report.get('regressions'):
+                sys.exit(1)
+            print_colored("\n✨ Operation completed successfully!", 'success')
+            return
+
+        if args.command == 'converse':
+            report = flow_manager.run_scripts(
+                args.flow_id,
+                args.alias_id,
+                args.script,
+                is_iterator=args.iterator,
+                concurrency=args.concurrency,
+                repeat=args.repeat,
+                output_path=args.output
+            )
+            if report['failed']:
+                sys.exit(1)
+            print_colored("\n✨ Operation completed successfully!", 'success')
+            return
+
+        if args.command == 'gc':
+            result = flow_manager.collect_garbage(
+                name_pattern=args.name_pattern,
+                tags=args.tag,
+                older_than=args.older_than,
+                dry_run=args.dry_run,
+                concurrency=args.concurrency,
+                assume_yes=args.yes,
+                summary_path=args.summary
+            )
+            if result.get('failed') or result['plan']['failed']:
+                sys.exit(1)
+            print_colored("\n✨ Operation completed successfully!", 'success')
+            return
+
+        if args.command == 'export':
+            result = flow_manager.export_flows(
+                args.archive,
+                name_pattern=args.name_pattern,
+                concurrency=args.concurrency,
+                verify=args.verify,
+                summary_path=args.summary
+            )
+            if result['failed']:
+                sys.exit(1)
+            print_colored("\n✨ Operation completed successfully!", 'success')
+            return
+
+        if args.command == 'local':
+            from flow_local import LocalFlowExecutor
+            from flow_templates import compile_template
+
+            if not args.test_input and not args.script:
+                raise ValueError("--test-input or --script is required for local runs")
+            template_path = resolve_template_path(args.template, args.templates_dir)
+            is_iterator = 'iterator' in template_path.stem.lower()
+            with LocalFlowExecutor(compile_template(template_path).definition) as executor:
+                flow_manager.bedrock_runtime = executor
+                if args.script:
+                    report = flow_manager.run_scripts('local', 'local', args.script, is_iterator)
+                    if report['failed']:
+                        sys.exit(1)
+                else:
+                    flow_manager.test_flow('local', 'local', args.test_input, is_iterator)
+            print_colored("\n✨ Operation completed successfully!", 'success')
+            return
+
+        if args.command == 'fleet':
+            template_path = resolve_template_path(args.template, args.templates_dir)
+            summary = flow_manager.deploy_fleet(
+                template_path,
+                args.bindings,
+                concurrency=args.concurrency,
+                summary_path=args.summary,
+                incremental=not args.always_create
+            )
+            if summary['failed']:
+                sys.exit(1)
+            print_colored("\n✨ Operation completed successfully!", 'success')
+            return
 
         # List and select template
         templates = BedrockFlowManager.list_templates(args.templates_dir)
@@ -1028,17 +2447,17 @@ def main():
 
         # Use context manager for flow lifecycle
         with flow_manager.flow_lifecycle() as resources:
-            # Create flow
-            flow_id = flow_manager.create_flow(
-                flow_definition=flow_definition,
-                template_metadata=template_metadata,
-                flow_name=args.flow_name
+            # Create, update or reuse the flow depending on what is already deployed
+            deployment = flow_manager.deploy_flow(
+                flow_definition,
+                template_metadata,
+                flow_name=args.flow_name,
+                incremental=not args.always_create
             )
-            resources['flow_id'] = flow_id
-            # Prepare flow
-            version, alias_id = flow_manager.prepare_flow(flow_id)
-            resources['version'] = version
-            resources['alias_id'] = alias_id
+            flow_id, version, alias_id = deployment['flow_id'], deployment['version'], deployment['alias_id']
+            # Only flows created by this run are removed if a later step fails
+            if deployment['action'] == 'created':
+                resources.update(flow_id=flow_id, version=version, alias_id=alias_id)
 
             # Only prepare flow and test if test input is provided
             if args.test_input:
@@ -1050,17 +2469,20 @@ def main():
                     is_iterator
                 )
 
-            # If cleanup flag is set, cleanup resources
+            # If cleanup flag is set, cleanup resources; a flow that was only updated or reused is kept
             if args.cleanup:
-                flow_manager.cleanup_flow(
-                    flow_id, 
-                    resources.get('alias_id'), 
-                    resources.get('version')
-                )
+                if deployment['action'] == 'created':
+                    flow_manager.cleanup_flow(flow_id, alias_id, version)
+                else:
+                    print_colored(f"\n⚠️  Not cleaning up {flow_id}: it existed before this run and was "
+                                  f"{deployment['action']}. Use --always-create for a disposable copy.", 'warning')
 
     except Exception as e:
         print_colored(f"\n❌ Error: {str(e)}", 'error')
         sys.exit(1)
+    finally:
+        if conversations is not None:
+            conversations.close()
 
     print_colored("\n✨ Operation completed successfully!", 'success')
 
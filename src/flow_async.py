@@ -0,0 +1,234 @@
+import asyncio
+import inspect
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from flow_runtime import (
+    FlowConversation,
+    FlowEvent,
+    apply_stream_event,
+    new_stream_result,
+    parse_stream_event,
+    payload_hash,
+    prepare_input_payload,
+    record_event,
+)
+from flow_singleflight import AsyncSingleFlight
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def _iter_events(stream) -> AsyncIterator[dict]:
+    """Iterate an async event stream, falling back to plain iterables"""
+    if stream is None:
+        return
+    if hasattr(stream, '__aiter__'):
+        async for event in stream:
+            yield event
+    else:
+        for event in stream:
+            yield event
+
+
+def echo_responder(flow_id: str, alias_id: str, inputs: List[dict], execution_id: str) -> List[dict]:
+    """Default LocalFlowRuntime responder that returns the input document"""
+    return [
+        {'flowOutputEvent': {
+            'nodeName': 'FlowOutputNode',
+            'nodeType': 'OutputNode',
+            'content': {'document': inputs[0]['content']['document']}
+        }},
+        {'flowCompletionEvent': {'completionReason': 'SUCCESS'}}
+    ]
+
+
+class LocalFlowRuntime:
+    """In-process asynchronous stand-in for the bedrock-agent-runtime invoke_flow API
+
+    The responder receives (flow_id, alias_id, inputs, execution_id) and returns
+    the list of responseStream events (flowOutputEvent, flowCompletionEvent,
+    flowMultiTurnInputRequestEvent) for that turn. It may be a coroutine.
+    """
+
+    def __init__(self, responder: Callable = echo_responder, event_delay: float = 0.0):
+        self.responder = responder
+        self.event_delay = event_delay
+        self.invocations = 0
+
+    async def invoke_flow(self, flowIdentifier: str, flowAliasIdentifier: str, inputs: List[dict],
+                          executionId: Optional[str] = None, **kwargs) -> dict:
+        self.invocations += 1
+        execution_id = executionId or str(uuid.uuid4())
+        events = await _maybe_await(self.responder(flowIdentifier, flowAliasIdentifier, inputs, execution_id))
+        return {'executionId': execution_id, 'responseStream': self._stream(events)}
+
+    async def _stream(self, events: Iterable[dict]) -> AsyncIterator[dict]:
+        for event in events:
+            # Yield control between events like a network stream would
+            await asyncio.sleep(self.event_delay)
+            yield event
+
+
+class AsyncFlowInvoker:
+    """Coroutine-based counterpart to BedrockFlowManager.test_flow
+
+    Works with any runtime exposing ``async invoke_flow(**kwargs)`` whose
+    ``responseStream`` is an async iterable, such as an aiobotocore
+    ``bedrock-agent-runtime`` client or :class:`LocalFlowRuntime`. In-flight
+    executions only hold a coroutine, so one event loop can keep thousands of
+    flow executions and multi-turn conversations open at once.
+    """
+
+    def __init__(self, runtime, concurrency: int = 1000, coalesce: bool = False):
+        self.runtime = runtime
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Identical single-turn requests in flight together share one invocation
+        self.single_flight = AsyncSingleFlight() if coalesce else None
+
+    @classmethod
+    @asynccontextmanager
+    async def connect(cls, region: str, profile_name: Optional[str] = None,
+                      concurrency: int = 1000) -> AsyncIterator['AsyncFlowInvoker']:
+        """Open an aiobotocore bedrock-agent-runtime client sized for the given concurrency"""
+        try:
+            from aiobotocore.config import AioConfig
+            from aiobotocore.session import get_session
+        except ImportError as e:
+            raise ImportError("AsyncFlowInvoker.connect requires aiobotocore: pip install aiobotocore") from e
+
+        session = get_session()
+        if profile_name:
+            session.set_config_variable('profile', profile_name)
+        config = AioConfig(max_pool_connections=concurrency)
+        async with session.create_client('bedrock-agent-runtime', region_name=region, config=config) as client:
+            yield cls(client, concurrency=concurrency)
+
+    async def iter_events(self, response: dict, conversation: FlowConversation,
+                          started: Optional[float] = None) -> AsyncIterator[FlowEvent]:
+        """Yield typed events from a response as they arrive"""
+        started = time.perf_counter() if started is None else started
+
+        # Update execution ID
+        conversation.execution_id = response.get('executionId', conversation.execution_id)
+
+        async for raw_event in _iter_events(response.get('responseStream')):
+            event = parse_stream_event(raw_event, started)
+            if event is None:
+                continue
+            record_event(conversation, event)
+            yield event
+
+    async def process_response_stream(self, response: dict, conversation: FlowConversation,
+                                      started: Optional[float] = None) -> dict:
+        """Asynchronously process the response stream from a flow invocation"""
+        result = new_stream_result()
+        async for event in self.iter_events(response, conversation, started):
+            apply_stream_event(result, event)
+        return result
+
+    async def stream(self, flow_id: str, alias_id: str, input_data: str | list | dict,
+                     is_iterator: bool = False,
+                     conversation: Optional[FlowConversation] = None) -> AsyncIterator[FlowEvent]:
+        """Invoke the flow and yield typed events as soon as each one arrives"""
+        conversation = conversation or FlowConversation(flow_id, alias_id)
+        input_payload = prepare_input_payload(input_data, is_iterator)
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            response = await self.runtime.invoke_flow(
+                flowIdentifier=flow_id,
+                flowAliasIdentifier=alias_id,
+                **({"executionId": conversation.execution_id} if conversation.execution_id else {}),
+                inputs=[input_payload]
+            )
+            async for event in self.iter_events(response, conversation, started):
+                yield event
+
+    async def invoke(self, flow_id: str, alias_id: str, input_data: str | list | dict,
+                     is_iterator: bool = False, conversation: Optional[FlowConversation] = None) -> dict:
+        """
+        Invoke the flow for a single turn
+
+        With coalescing enabled, a new conversation whose input is already in
+        flight awaits that invocation instead and gets its result with
+        ``coalesced`` set. Cancelling one caller leaves the shared call running
+        for the others.
+        """
+        input_payload = prepare_input_payload(input_data, is_iterator)
+        if self.single_flight is not None and conversation is None:
+            key = (flow_id, alias_id, payload_hash(input_payload))
+            result, shared = await self.single_flight.do(
+                key, lambda: self._invoke(flow_id, alias_id, input_payload, FlowConversation(flow_id, alias_id)))
+            return {**result, 'outputs': list(result['outputs']), 'coalesced': True} if shared else result
+        return await self._invoke(flow_id, alias_id, input_payload, conversation or FlowConversation(flow_id, alias_id))
+
+    async def _invoke(self, flow_id: str, alias_id: str, input_payload: dict,
+                      conversation: FlowConversation) -> dict:
+        async with self._semaphore:
+            started = time.perf_counter()
+            response = await self.runtime.invoke_flow(
+                flowIdentifier=flow_id,
+                flowAliasIdentifier=alias_id,
+                **({"executionId": conversation.execution_id} if conversation.execution_id else {}),
+                inputs=[input_payload]
+            )
+            result = await self.process_response_stream(response, conversation, started)
+
+        result['execution_id'] = conversation.execution_id
+        return result
+
+    async def converse(self, flow_id: str, alias_id: str, input_text: str | list,
+                       reply: Callable, is_iterator: bool = False, max_turns: int = 20,
+                       conversation: Optional[FlowConversation] = None) -> dict:
+        """
+        Run a multi-turn conversation until the flow completes
+
+        Args:
+            reply (Callable): Called with (prompt, node_name) whenever the flow
+                returns INPUT_REQUIRED; returns the next user message. May be a coroutine.
+            max_turns (int): Upper bound on the number of invoke_flow calls
+
+        Returns:
+            dict: The final turn result, with 'turns' and 'conversation' added
+        """
+        conversation = conversation or FlowConversation(flow_id, alias_id)
+        input_data = input_text
+
+        for turn in range(1, max_turns + 1):
+            result = await self.invoke(flow_id, alias_id, input_data, is_iterator, conversation)
+
+            if result['status'] != 'INPUT_REQUIRED':
+                result['turns'] = turn
+                result['conversation'] = conversation
+                return result
+
+            user_text = await _maybe_await(reply(result['prompt'], result['node_name']))
+            conversation.add_to_history('user', user_text)
+            input_data = {
+                'text': user_text,
+                'node_name': result['node_name'],
+                'is_initial': False
+            }
+
+        raise RuntimeError(f"Conversation did not complete within {max_turns} turns")
+
+    async def invoke_many(self, flow_id: str, alias_id: str, inputs: Iterable,
+                          is_iterator: bool = False) -> List[Dict]:
+        """Invoke the flow once per input concurrently, returning results in input order
+
+        Failed invocations are returned as ``{'status': 'ERROR', 'error': ...}``.
+        """
+        async def run(item):
+            try:
+                return await self.invoke(flow_id, alias_id, item, is_iterator)
+            except Exception as e:
+                return {'status': 'ERROR', 'error': str(e)}
+
+        return await asyncio.gather(*(run(item) for item in inputs))
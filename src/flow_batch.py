@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def iter_jsonl_inputs(input_path: str, start_offset: int = 0) -> Iterator[Tuple[int, object]]:
+    """Yield (offset, input) pairs from a JSONL file
+
+    Each line is either a JSON object with an ``input`` key or any JSON value,
+    which is then used as the flow input as-is. Blank lines are skipped but
+    still count towards the offset so offsets stay stable across resumes.
+    """
+    with open(input_path, 'r') as f:
+        for offset, line in enumerate(f):
+            if offset < start_offset:
+                continue
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict) and 'input' in record:
+                record = record['input']
+            yield offset, record
+
+
+class BatchCheckpoint:
+    """Tracks the low watermark of completed offsets and persists it atomically"""
+
+    def __init__(self, path: Optional[str], input_path: str, flush_every: int = 50):
+        self.path = path
+        self.input_path = input_path
+        self.flush_every = flush_every
+        self.next_offset = 0
+        self._pending = set()
+        self._since_flush = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> int:
+        """Load the saved watermark, returning the first offset still to process"""
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+            if state.get('input') != os.path.abspath(self.input_path):
+                raise ValueError(f"Checkpoint {self.path} belongs to a different input file: {state.get('input')}")
+            self.next_offset = state.get('next_offset', 0)
+        return self.next_offset
+
+    def mark_done(self, offset: int):
+        """Record a completed offset and advance the watermark over contiguous offsets"""
+        with self._lock:
+            self._pending.add(offset)
+            while self.next_offset in self._pending:
+                self._pending.remove(self.next_offset)
+                self.next_offset += 1
+            self._since_flush += 1
+            if self._since_flush >= self.flush_every:
+                self._save()
+
+    def flush(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        self._since_flush = 0
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'input': os.path.abspath(self.input_path),
+                'next_offset': self.next_offset,
+                'updated_at': time.time()
+            }, f)
+        os.replace(tmp_path, self.path)
+
+
+def _recover_output(output_path: str, start_offset: int) -> set:
+    """Trim a torn trailing line and return offsets at or past start_offset already written"""
+    written = set()
+    path = Path(output_path)
+    if not path.exists():
+        return written
+
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end != len(data):
+            logger.warning("Truncating partial record at the end of %s", output_path)
+            f.truncate(end)
+
+    for line in data[:end].splitlines():
+        try:
+            offset = json.loads(line).get('offset')
+        except (json.JSONDecodeError, AttributeError):
+            continue
+        if isinstance(offset, int) and offset >= start_offset:
+            written.add(offset)
+    return written
+
+
+# Results held for in-order writing, per worker, before reading further input waits for the oldest
+REORDER_WINDOW = 8
+
+
+def run_batch(invoke: Callable[[object], dict], input_path: str, output_path: str,
+              concurrency: int = 8, keep_order: bool = False,
+              checkpoint_path: Optional[str] = None, resume: bool = False) -> Dict:
+    """Run every input in a JSONL file through ``invoke`` on a bounded thread pool
+
+    Results are appended to ``output_path`` as JSONL as soon as they finish, or
+    in input order when ``keep_order`` is set; then no new inputs are submitted
+    while ``REORDER_WINDOW * concurrency`` finished results wait behind a slow
+    earlier one, so memory stays bounded. The checkpoint records the
+    offset below which every input is complete, so a killed job resumes from
+    there without duplicating records already present in the output file.
+    Only records whose status is SUCCESS count as succeeded; ``statuses``
+    counts every status seen, e.g. FAILURE or INPUT_REQUIRED completions.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    checkpoint = BatchCheckpoint(checkpoint_path, input_path)
+    start_offset = checkpoint.load() if resume else 0
+    already_written = _recover_output(output_path, start_offset) if resume else set()
+    if resume and start_offset:
+        logger.info("Resuming batch from offset %d", start_offset)
+    checkpoint.next_offset = start_offset
+
+    stats = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'skipped': len(already_written), 'statuses': {}}
+    write_lock = threading.Lock()
+    reorder_buffer = {}
+    next_to_write = [start_offset]
+
+    def invoke_timed(item):
+        started = time.time()
+        try:
+            result = invoke(item)
+            record = {'status': result.get('status'), 'output': result.get('output')}
+            if len(result.get('outputs') or []) > 1:
+                record['outputs'] = result['outputs']
+            if result.get('time_to_first_output') is not None:
+                record['time_to_first_output'] = round(result['time_to_first_output'], 4)
+            if result.get('prompt') is not None:
+                record['prompt'] = result['prompt']
+            if result.get('execution_id'):
+                record['execution_id'] = result['execution_id']
+            if result.get('cached'):
+                record['cached'] = True
+            if result.get('coalesced'):
+                record['coalesced'] = True
+        except Exception as e:
+            record = {'status': 'ERROR', 'error': str(e)}
+        record['latency'] = round(time.time() - started, 4)
+        return record
+
+    def write_record(out, offset: int, record: Optional[dict]):
+        # record is None for offsets that produce no output (blank or already written)
+        if record is not None:
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+        checkpoint.mark_done(offset)
+
+    def emit(out, offset: int, record: Optional[dict]):
+        with write_lock:
+            if not keep_order:
+                write_record(out, offset, record)
+                return
+            reorder_buffer[offset] = record
+            while next_to_write[0] in reorder_buffer:
+                write_record(out, next_to_write[0], reorder_buffer.pop(next_to_write[0]))
+                next_to_write[0] += 1
+
+    started = time.time()
+    mode = 'a' if resume else 'w'
+    with open(output_path, mode) as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = {}
+        expected = start_offset
+
+        def drain(block_until_below: int):
+            while len(in_flight) >= block_until_below and in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    offset, item = in_flight.pop(future)
+                    record = future.result()
+                    record = {'offset': offset, 'input': item, **record}
+                    status = str(record.get('status'))
+                    stats['succeeded' if status == 'SUCCESS' else 'failed'] += 1
+                    stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+                    emit(out, offset, record)
+
+        for offset, item in iter_jsonl_inputs(input_path, start_offset):
+            # Offsets of blank lines and previously written records still advance the watermark
+            for gap in range(expected, offset):
+                emit(out, gap, None)
+            expected = offset + 1
+            if offset in already_written:
+                emit(out, offset, None)
+                continue
+
+            # Keep the submission window bounded so huge inputs don't queue up in memory
+            drain(concurrency * 2)
+            while keep_order and len(reorder_buffer) >= REORDER_WINDOW * concurrency and in_flight:
+                # Wait for at least one more result, eventually the one holding up the buffer
+                drain(len(in_flight))
+            in_flight[pool.submit(invoke_timed, item)] = (offset, item)
+            stats['submitted'] += 1
+
+        drain(1)
+
+    checkpoint.flush()
+    stats['elapsed'] = round(time.time() - started, 3)
+    stats['next_offset'] = checkpoint.next_offset
+    stats['throughput'] = round(stats['submitted'] / stats['elapsed'], 2) if stats['elapsed'] else 0.0
+    return stats
@@ -0,0 +1,322 @@
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from flow_throttle import classify_error, error_code
+
+BENCH_REPORT_VERSION = 1
+
+# Metrics compared between reports; higher is worse for all but throughput
+COMPARED_METRICS = [
+    ('latency', 'p50'), ('latency', 'p95'), ('latency', 'p99'),
+    ('first_event', 'p50'), ('first_event', 'p95'),
+    ('throughput', None), ('error_rate', None),
+]
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in the style of HdrHistogram
+
+    Values are stored in microseconds in buckets whose width grows with the
+    value, so every recorded value is kept to within ``1 / 2**(precision_bits - 1)``
+    (under 1% by default) using a few kilobytes however many values are
+    recorded. Histograms from separate threads can be merged.
+    """
+
+    def __init__(self, precision_bits: int = 8):
+        self.precision_bits = precision_bits
+        self._half = 1 << (precision_bits - 1)
+        self.counts: List[int] = []
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < (self._half << 1):
+            return value
+        shift = value.bit_length() - self.precision_bits
+        return (shift + 1) * self._half + ((value >> shift) - self._half)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < (self._half << 1):
+            return index
+        shift = index // self._half - 1
+        mantissa = index % self._half + self._half
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1_000_000))
+        index = self._index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def merge(self, other: 'LatencyHistogram'):
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Seconds below which ``percent`` of recorded values fall"""
+        if not self.count:
+            return None
+        target = max(1, int(round(percent / 100 * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max) / 1_000_000
+        return self.max / 1_000_000
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        if not self.count:
+            return {'count': 0, 'min': None, 'mean': None, 'p50': None, 'p90': None,
+                    'p95': None, 'p99': None, 'p999': None, 'max': None}
+        return {
+            'count': self.count,
+            'min': round(self.min / 1_000_000, 6),
+            'mean': round(self.total / self.count / 1_000_000, 6),
+            **{name: round(self.percentile(percent), 6)
+               for name, percent in (('p50', 50), ('p90', 90), ('p95', 95), ('p99', 99), ('p999', 99.9))},
+            'max': round(self.max / 1_000_000, 6)
+        }
+
+
+def summarize_latencies(values: List[float]) -> Dict[str, Optional[float]]:
+    """Histogram summary of durations in seconds, so every report ranks percentiles the same way"""
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    return histogram.summary()
+
+
+class FakeServiceError(Exception):
+    """Stand-in for a botocore ClientError carrying an AWS error code"""
+
+    def __init__(self, code: str, message: str = ''):
+        super().__init__(f"An error occurred ({code}): {message or code}")
+        self.response = {'Error': {'Code': code, 'Message': message or code}}
+
+
+class FakeFlowRuntime:
+    """
+    Local stand-in for the bedrock-agent-runtime client's invoke_flow
+
+    Each execution streams ``outputs`` flowOutputEvents of about
+    ``output_bytes`` each and a completion event. The first event arrives
+    after ``first_event_latency`` seconds and the last after ``latency``
+    seconds, each varied by ±``jitter``. A fraction of calls fail with a
+    throttling or server error, raised by invoke_flow as boto3 does.
+    """
+
+    def __init__(self, latency: float = 0.05, first_event_latency: Optional[float] = None, jitter: float = 0.2,
+                 outputs: int = 1, output_bytes: int = 256, error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.first_event_latency = latency * 0.6 if first_event_latency is None else first_event_latency
+        self.jitter = jitter
+        self.outputs = max(1, outputs)
+        self.document = 'x' * output_bytes
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self) -> tuple:
+        with self._lock:
+            return self._random.random(), self._random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def invoke_flow(self, flowIdentifier: str, flowAliasIdentifier: str, inputs: List[dict],
+                    executionId: Optional[str] = None, **kwargs) -> dict:
+        roll, scale = self._draw()
+        if roll < self.throttle_rate:
+            raise FakeServiceError('ThrottlingException', 'Rate exceeded')
+        if roll < self.throttle_rate + self.error_rate:
+            raise FakeServiceError('InternalServerException', 'Injected failure')
+        return {
+            'executionId': executionId or str(uuid.uuid4()),
+            'responseStream': self._stream(inputs[0].get('nodeName'), scale)
+        }
+
+    def _stream(self, node_name: str, scale: float):
+        started = time.perf_counter()
+        first = self.first_event_latency * scale
+        step = max(0.0, self.latency * scale - first) / self.outputs
+        for index in range(self.outputs):
+            delay = started + first + step * index - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield {'flowOutputEvent': {'nodeName': 'FlowOutputNode', 'nodeType': 'Output',
+                                       'content': {'document': self.document}}}
+        delay = started + self.latency * scale - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield {'flowCompletionEvent': {'completionReason': 'SUCCESS'}}
+
+
+class _WorkerStats:
+    """Per-thread counters and histograms, merged once the run ends so workers never contend"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.first_event = LatencyHistogram()
+        self.succeeded = 0
+        self.throttled = 0
+        self.errors: Dict[str, int] = {}
+
+    def record(self, invoke_once: Callable[[], Optional[float]], scheduled: float, measure: bool):
+        try:
+            first_event = invoke_once()
+        except Exception as e:
+            if measure:
+                if classify_error(e) == 'throttle':
+                    self.throttled += 1
+                key = error_code(e) or type(e).__name__
+                self.errors[key] = self.errors.get(key, 0) + 1
+            return
+        if measure:
+            self.latency.record(time.perf_counter() - scheduled)
+            if first_event is not None:
+                self.first_event.record(first_event)
+            self.succeeded += 1
+
+
+def run_benchmark(invoke_once: Callable[[], Optional[float]], duration: float = 10.0,
+                  concurrency: Optional[int] = None, rate: Optional[float] = None,
+                  warmup: float = 0.0, max_workers: int = 256) -> dict:
+    """
+    Drive ``invoke_once`` for ``duration`` seconds and report latency percentiles
+
+    ``invoke_once()`` runs one request and returns the seconds to its first
+    event (or None); exceptions count as errors. With ``concurrency`` a fixed
+    number of workers each send requests back to back (closed loop). With
+    ``rate`` requests are started on a fixed schedule (open loop) and latency
+    is measured from each request's scheduled start, so queueing behind slow
+    requests is included rather than hidden. Requests started during the
+    ``warmup`` seconds are not measured.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not concurrency and not rate:
+        raise ValueError("Give a concurrency or a target rate")
+
+    local = threading.local()
+    workers: List[_WorkerStats] = []
+    workers_lock = threading.Lock()
+
+    def stats() -> _WorkerStats:
+        worker = getattr(local, 'stats', None)
+        if worker is None:
+            worker = local.stats = _WorkerStats()
+            with workers_lock:
+                workers.append(worker)
+        return worker
+
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    if rate:
+        def scheduled_request(scheduled: float):
+            stats().record(invoke_once, scheduled, scheduled >= measure_from)
+
+        with ThreadPoolExecutor(max_workers=concurrency or max_workers, thread_name_prefix='bench') as pool:
+            interval = 1.0 / rate
+            scheduled = started
+            while scheduled < deadline:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(scheduled_request, scheduled)
+                scheduled += interval
+    else:
+        def closed_loop():
+            worker = stats()
+            while True:
+                request_started = time.perf_counter()
+                if request_started >= deadline:
+                    return
+                worker.record(invoke_once, request_started, request_started >= measure_from)
+
+        threads = [threading.Thread(target=closed_loop, name=f"bench-{index}", daemon=True)
+                   for index in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    elapsed = max(time.perf_counter() - measure_from, 1e-9)
+    total = _WorkerStats()
+    for worker in workers:
+        total.latency.merge(worker.latency)
+        total.first_event.merge(worker.first_event)
+        total.succeeded += worker.succeeded
+        total.throttled += worker.throttled
+        for key, count in worker.errors.items():
+            total.errors[key] = total.errors.get(key, 0) + count
+
+    failed = sum(total.errors.values())
+    requests = total.succeeded + failed
+    return {
+        'version': BENCH_REPORT_VERSION,
+        'mode': 'rate' if rate else 'concurrency',
+        'target_rate': rate,
+        'concurrency': concurrency,
+        'duration': duration,
+        'warmup': warmup,
+        'elapsed': round(elapsed, 3),
+        'requests': requests,
+        'succeeded': total.succeeded,
+        'failed': failed,
+        'throttled': total.throttled,
+        'throughput': round(total.succeeded / elapsed, 2),
+        'error_rate': round(failed / requests, 4) if requests else 0.0,
+        'throttle_rate': round(total.throttled / requests, 4) if requests else 0.0,
+        'errors': total.errors,
+        'latency': total.latency.summary(),
+        'first_event': total.first_event.summary()
+    }
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float = 0.1) -> List[dict]:
+    """
+    Changes between two reports for the headline metrics
+
+    A change is a regression when latency or error rate grows, or throughput
+    falls, by more than ``threshold`` (a fraction of the baseline).
+    """
+    changes = []
+    for section, key in COMPARED_METRICS:
+        before = baseline.get(section)
+        after = current.get(section)
+        if key is not None:
+            before = (before or {}).get(key)
+            after = (after or {}).get(key)
+        if before is None or after is None:
+            continue
+        name = f"{section}.{key}" if key else section
+        change = (after - before) / before if before else (0.0 if after == before else float('inf'))
+        worse = -change if section == 'throughput' else change
+        changes.append({'metric': name, 'baseline': before, 'current': after,
+                        'change': round(change, 4), 'regression': worse > threshold})
+    return changes
+
+
+def write_report(report: dict, report_path: str):
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
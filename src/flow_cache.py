@@ -0,0 +1,258 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from flow_runtime import payload_hash
+from flow_templates import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk entry format or the key hash changes
+INVOCATION_CACHE_FORMAT_VERSION = 2
+
+DEFAULT_INVOCATION_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'invocations')
+
+# Largest size of the disk tier before the oldest entries are evicted
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+
+# Fraction of max_disk_bytes the disk tier is brought down to when it overflows
+EVICT_TO = 0.9
+
+# Seconds between sweeps of expired entries from the disk tier
+SWEEP_INTERVAL = 600.0
+
+
+class InvocationCache:
+    """
+    Caches successful single-turn flow results by flow, alias version and input
+
+    Entries live in a bounded in-memory LRU and, with a ``cache_dir``, in one
+    JSON file per entry under ``<flow>/<version>/``. Both tiers expire entries
+    after ``ttl`` seconds. Aliases are resolved to versions through
+    ``resolve_version(flow_id, alias_id)``, re-checked every
+    ``alias_ttl`` seconds; when an alias moves to a new version, the entries
+    of the version it left are dropped from both tiers.
+
+    The disk tier is swept on the first write and then every
+    ``SWEEP_INTERVAL`` seconds, or as soon as writes take it past
+    ``max_disk_bytes``: expired entries (and leftovers of interrupted writes)
+    are deleted, then the oldest entries until it is back under 90% of it.
+
+    Caching applies to every flow unless ``flows`` lists the only flows to
+    cache; flows in ``exclude`` are never cached.
+    """
+
+    def __init__(self, resolve_version: Callable[[str, str], str],
+                 cache_dir: Optional[str] = DEFAULT_INVOCATION_CACHE_DIR, max_entries: int = 1024,
+                 ttl: float = 3600.0, alias_ttl: float = 30.0, flows: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None, max_disk_bytes: Optional[int] = DEFAULT_MAX_DISK_BYTES):
+        self.resolve_version = resolve_version
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.alias_ttl = alias_ttl
+        self.flows = set(flows) if flows is not None else None
+        self.exclude = set(exclude or ())
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: 'OrderedDict[Tuple[str, str, str], Tuple[float, dict]]' = OrderedDict()
+        self._aliases: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        # Approximate size of the disk tier: measured by each sweep, grown by each write
+        self._disk_bytes = 0
+        self._swept_at: Optional[float] = None
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0,
+                         'expired': 0, 'invalidations': 0, 'bypassed': 0, 'evicted': 0}
+
+    def enable(self, flow_id: str):
+        """Cache this flow's results, alongside any others already opted in"""
+        self.exclude.discard(flow_id)
+        if self.flows is not None:
+            self.flows.add(flow_id)
+
+    def disable(self, flow_id: str):
+        """Stop caching this flow's results"""
+        self.exclude.add(flow_id)
+        self.invalidate(flow_id)
+
+    def is_enabled(self, flow_id: str) -> bool:
+        return flow_id not in self.exclude and (self.flows is None or flow_id in self.flows)
+
+    def version(self, flow_id: str, alias_id: str) -> str:
+        """Version the alias currently routes to, dropping the old version's entries when it moves"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._aliases.get((flow_id, alias_id))
+        if cached and now - cached[0] < self.alias_ttl:
+            return cached[1]
+
+        version = self.resolve_version(flow_id, alias_id)
+        with self._lock:
+            self._aliases[(flow_id, alias_id)] = (now, version)
+        if cached and cached[1] != version:
+            logger.info("Alias %s of flow %s moved from version %s to %s", alias_id, flow_id, cached[1], version)
+            self.invalidate(flow_id, cached[1])
+        return version
+
+    def key(self, flow_id: str, alias_id: str, input_payload: dict) -> Tuple[str, str, str]:
+        return flow_id, self.version(flow_id, alias_id), payload_hash(input_payload)
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return entry[1]
+                del self._memory[key]
+                self.counters['expired'] += 1
+
+        entry = self._read(key, now)
+        with self._lock:
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self.counters['disk_hits'] += 1
+            self._remember(key, entry)
+        return entry[1]
+
+    def put(self, key: Tuple[str, str, str], result: dict):
+        entry = (time.time(), result)
+        with self._lock:
+            self._remember(key, entry)
+            self.counters['stores'] += 1
+        self._write(key, entry)
+
+    def record_bypass(self):
+        """Count a lookup skipped because caching is disabled for the flow"""
+        with self._lock:
+            self.counters['bypassed'] += 1
+
+    def sweep(self):
+        """Delete expired disk entries, then the oldest ones while the tier is over ``max_disk_bytes``"""
+        if not self.cache_dir or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            entries = []
+            expired = 0
+            for path in self.cache_dir.rglob('*'):
+                if path.suffix not in ('.json', '.tmp'):
+                    continue
+                try:
+                    stat = path.stat()
+                    # Entries are written in one go, so the file's mtime is when it was stored
+                    if now - stat.st_mtime >= self.ttl or (path.suffix == '.tmp' and now - stat.st_mtime >= 60):
+                        path.unlink()
+                        expired += path.suffix == '.json'
+                        continue
+                except OSError:
+                    continue
+                if path.suffix == '.json':
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            size = sum(entry[1] for entry in entries)
+            evicted = 0
+            if self.max_disk_bytes is not None and size > self.max_disk_bytes:
+                # Evict below the limit, so a full tier is not swept again on the very next write
+                target = int(self.max_disk_bytes * EVICT_TO)
+                entries.sort()
+                for _, entry_size, path in entries:
+                    if size <= target:
+                        break
+                    try:
+                        path.unlink()
+                    except OSError:
+                        continue
+                    size -= entry_size
+                    evicted += 1
+
+            with self._lock:
+                self.counters['expired'] += expired
+                self.counters['evicted'] += evicted
+                self._disk_bytes = size
+                self._swept_at = time.monotonic()
+        finally:
+            self._sweep_lock.release()
+
+    def invalidate(self, flow_id: str, version: Optional[str] = None):
+        """Drop a flow's entries, or only those of one version, from both tiers"""
+        with self._lock:
+            stale = [key for key in self._memory if key[0] == flow_id and (version is None or key[1] == version)]
+            for key in stale:
+                del self._memory[key]
+            self.counters['invalidations'] += 1
+        if self.cache_dir:
+            path = self.cache_dir / flow_id / version if version else self.cache_dir / flow_id
+            shutil.rmtree(path, ignore_errors=True)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            counters['entries'] = len(self._memory)
+        lookups = counters['memory_hits'] + counters['disk_hits'] + counters['misses']
+        counters['hit_rate'] = round((counters['memory_hits'] + counters['disk_hits']) / lookups, 4) if lookups else 0.0
+        return counters
+
+    def _remember(self, key: Tuple[str, str, str], entry: Tuple[float, dict]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: Tuple[str, str, str]) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        flow_id, version, digest = key
+        return self.cache_dir / flow_id / version / f"{digest}.json"
+
+    def _read(self, key: Tuple[str, str, str], now: float) -> Optional[Tuple[float, dict]]:
+        path = self._path(key)
+        if not path or not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') != INVOCATION_CACHE_FORMAT_VERSION:
+                return None
+            if now - data['stored_at'] >= self.ttl:
+                path.unlink(missing_ok=True)
+                with self._lock:
+                    self.counters['expired'] += 1
+                return None
+            return data['stored_at'], data['result']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable invocation cache entry %s: %s", path, e)
+            return None
+
+    def _write(self, key: Tuple[str, str, str], entry: Tuple[float, dict]):
+        path = self._path(key)
+        if not path:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': INVOCATION_CACHE_FORMAT_VERSION, 'stored_at': entry[0], 'result': entry[1]},
+                          f, default=str)
+                written = f.tell()
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write invocation cache entry %s: %s", path, e)
+            return
+
+        with self._lock:
+            self._disk_bytes += written
+            due = (self._swept_at is None or time.monotonic() - self._swept_at >= SWEEP_INTERVAL
+                   or (self.max_disk_bytes is not None and self._disk_bytes > self.max_disk_bytes))
+        if due:
+            self.sweep()
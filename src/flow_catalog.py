@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from flow_templates import DEFAULT_CACHE_DIR, REQUIRED_FIELDS, VARIABLE_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Bump when the entry format changes so stale indexes are rebuilt
+CATALOG_FORMAT_VERSION = 2
+
+
+def _extract_header(template_path: Path) -> dict:
+    """
+    Header fields for the catalog: name, description, tags, node types and variables
+
+    The file is read and parsed once and nothing else is done with it; in
+    particular it is not compiled, so indexing leaves no copies in the
+    template cache. Variables are found in the raw text, keys included.
+    """
+    text = Path(template_path).read_text()
+    template = json.loads(text)
+    missing_fields = [field for field in REQUIRED_FIELDS if field not in template]
+    if missing_fields:
+        raise ValueError(f"Template missing required fields: {', '.join(missing_fields)}")
+
+    nodes = template['definition'].get('nodes', [])
+    return {
+        'name': template.get('name', ''),
+        'description': template.get('description') or 'No description available',
+        'tags': template.get('tags') or {},
+        'node_types': sorted({node.get('type') for node in nodes if node.get('type')}),
+        'variables': sorted(set(VARIABLE_PATTERN.findall(text)), key=lambda x: (x.lower(), x))
+    }
+
+
+class TemplateCatalog:
+    """Persistent index of template headers for a directory, updated incrementally
+
+    Entries are keyed by file name and invalidated by (mtime, size), so a
+    refresh only opens templates that were added or changed since the last
+    run. Searches run against the index without opening any template.
+    """
+
+    def __init__(self, templates_dir: str, index_path: Optional[str] = None):
+        self.templates_dir = Path(templates_dir)
+        if index_path is None:
+            dir_key = hashlib.sha1(str(self.templates_dir.resolve()).encode()).hexdigest()[:16]
+            index_path = os.path.join(DEFAULT_CACHE_DIR, f"catalog-{dir_key}.json")
+        self.index_path = Path(index_path)
+        self.entries: Dict[str, dict] = {}
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == CATALOG_FORMAT_VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _save_index(self):
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': CATALOG_FORMAT_VERSION, 'entries': self.entries}, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning("Could not write template catalog %s: %s", self.index_path, e)
+
+    def refresh(self) -> Dict[str, int]:
+        """Bring the index up to date with the directory, returning change counts"""
+        self._load_index()
+        changes = {'added': 0, 'updated': 0, 'removed': 0}
+        seen = set()
+
+        with os.scandir(self.templates_dir) as it:
+            for dir_entry in it:
+                if not dir_entry.name.endswith('.json') or not dir_entry.is_file():
+                    continue
+                seen.add(dir_entry.name)
+                stat = dir_entry.stat()
+                cached = self.entries.get(dir_entry.name)
+                if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                    continue
+
+                try:
+                    header = _extract_header(Path(dir_entry.path))
+                except Exception as e:
+                    header = {'error': str(e), 'description': 'Unable to read template description'}
+                self.entries[dir_entry.name] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, **header}
+                changes['updated' if cached else 'added'] += 1
+
+        for name in list(self.entries):
+            if name not in seen:
+                del self.entries[name]
+                changes['removed'] += 1
+
+        if any(changes.values()):
+            self._save_index()
+        return changes
+
+    def search(self, tag: Optional[str] = None, node_type: Optional[str] = None,
+               text: Optional[str] = None) -> List[Path]:
+        """
+        Filter indexed templates, returning their paths sorted by file name
+
+        Args:
+            tag (str, optional): Tag key, or key=value, the template must carry
+            node_type (str, optional): Node type (e.g. Iterator) the definition must contain
+            text (str, optional): Case-insensitive substring of the file name, name or description
+        """
+        tag_key, _, tag_value = (tag or '').partition('=')
+        needle = (text or '').lower()
+        matches = []
+
+        for file_name in sorted(self.entries):
+            entry = self.entries[file_name]
+            if tag:
+                tags = entry.get('tags', {})
+                if tag_key not in tags or (tag_value and str(tags[tag_key]) != tag_value):
+                    continue
+            if node_type and node_type.lower() not in (t.lower() for t in entry.get('node_types', [])):
+                continue
+            if needle and not any(needle in str(value).lower()
+                                  for value in (file_name, entry.get('name', ''), entry.get('description', ''))):
+                continue
+            matches.append(self.templates_dir / file_name)
+        return matches
+
+    def entry(self, template_path: Path) -> dict:
+        return self.entries.get(Path(template_path).name, {})
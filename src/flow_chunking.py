@@ -0,0 +1,125 @@
+import json
+import time
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+from flow_throttle import RetryPolicy
+
+
+class ChunkLimits(NamedTuple):
+    """How iterator inputs are split: at most ``max_items`` items and ``max_bytes`` of JSON per chunk"""
+    max_items: Optional[int] = 100
+    max_bytes: Optional[int] = None
+    concurrency: int = 8
+    max_attempts: int = 3
+
+    def exceeded_by(self, items: Sequence) -> bool:
+        if self.max_items and len(items) > self.max_items:
+            return True
+        return bool(self.max_bytes) and _json_size(items) > self.max_bytes
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, default=str).encode('utf-8'))
+
+
+def chunk_items(items: Sequence, max_items: Optional[int] = None, max_bytes: Optional[int] = None) -> List[list]:
+    """
+    Split items into consecutive chunks within an item count and a JSON byte budget
+
+    An item larger than the byte budget on its own gets a chunk to itself
+    rather than failing the split; the flow decides whether it is too large.
+    """
+    if max_items is not None and max_items < 1:
+        raise ValueError("max_items must be at least 1")
+
+    chunks = []
+    current: list = []
+    # Bytes of the JSON array so far: brackets plus a comma between items
+    size = 2
+    for item in items:
+        item_size = _json_size(item) if max_bytes else 0
+        full = max_items is not None and len(current) >= max_items
+        over = max_bytes is not None and current and size + item_size + 1 > max_bytes
+        if full or over:
+            chunks.append(current)
+            current, size = [], 2
+        current.append(item)
+        size += item_size + (1 if len(current) > 1 else 0)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _merge_outputs(outputs: List[Any]) -> list:
+    merged = []
+    for output in outputs:
+        if isinstance(output, list):
+            merged.extend(output)
+        elif output is not None:
+            merged.append(output)
+    return merged
+
+
+def invoke_chunked(invoke_chunk: Callable[[list], dict], items: Sequence, limits: ChunkLimits,
+                   retry_policy: Optional[RetryPolicy] = None) -> dict:
+    """
+    Run an iterator input as parallel chunks and reassemble one result
+
+    ``invoke_chunk(items)`` runs one chunk and returns an ``invoke_flow_once``
+    result. Chunks that raise or do not end in SUCCESS are retried with
+    backoff up to ``limits.max_attempts`` times. The collector outputs of all
+    chunks are concatenated in input order into ``output``, and their Output
+    node documents into ``outputs``, as for a single invocation; each chunk's
+    own output is kept in ``chunk_outputs``. If any chunk still fails, the
+    result has status ERROR and lists the failed chunks.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    policy = retry_policy or RetryPolicy()
+    chunks = chunk_items(items, limits.max_items, limits.max_bytes)
+
+    def run(index: int, chunk: list) -> dict:
+        started = time.perf_counter()
+        delay = policy.base
+        error = None
+        for attempt in range(1, limits.max_attempts + 1):
+            try:
+                result = invoke_chunk(chunk)
+                if result.get('status') == 'SUCCESS':
+                    return {'index': index, 'items': len(chunk), 'attempts': attempt, 'result': result,
+                            'elapsed': time.perf_counter() - started}
+                error = f"Chunk ended with status {result.get('status')}"
+            except Exception as e:
+                error = str(e)
+            if attempt < limits.max_attempts:
+                delay = policy.next_delay(delay)
+                time.sleep(delay)
+        return {'index': index, 'items': len(chunk), 'attempts': limits.max_attempts, 'error': error,
+                'elapsed': time.perf_counter() - started}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(limits.concurrency, len(chunks))),
+                            thread_name_prefix='chunk') as pool:
+        reports = list(pool.map(run, range(len(chunks)), chunks))
+    elapsed = time.perf_counter() - started
+
+    failed = [{key: report[key] for key in ('index', 'items', 'attempts', 'error')}
+              for report in reports if 'error' in report]
+    succeeded = [report['result'] for report in reports if 'result' in report]
+    first_outputs = [result['time_to_first_output'] for result in succeeded
+                     if result.get('time_to_first_output') is not None]
+    return {
+        'status': 'ERROR' if failed else 'SUCCESS',
+        'output': None if failed else _merge_outputs([result.get('output') for result in succeeded]),
+        'outputs': [output for result in succeeded for output in result.get('outputs') or []],
+        # One entry per chunk in input order; None for chunks that failed
+        'chunk_outputs': [report['result'].get('output') if 'result' in report else None for report in reports],
+        'prompt': None,
+        'node_name': None,
+        'time_to_first_output': min(first_outputs) if first_outputs else None,
+        'elapsed': elapsed,
+        'execution_id': None,
+        'chunks': len(chunks),
+        'attempts': sum(report['attempts'] for report in reports),
+        'failed_chunks': failed
+    }
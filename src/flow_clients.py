@@ -0,0 +1,102 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+from flow_throttle import DEFAULT_API_LIMITS
+
+# boto3/botocore are imported on first use so that importing this module (and
+# the CLI) stays cheap for commands that never talk to AWS.
+
+# The connection pool is sized for as many concurrent calls on one client as
+# the adaptive limiters in flow_throttle ever allow (256 for invoke_flow), so
+# threads never queue on the pool; connections are only opened as needed.
+# Retries are left to the limiters, and the read timeout allows for long
+# invoke_flow response streams.
+DEFAULT_CLIENT_CONFIG = {
+    'max_pool_connections': max(limits[3] for limits in DEFAULT_API_LIMITS.values()),
+    'tcp_keepalive': True,
+    'connect_timeout': 5,
+    'read_timeout': 300,
+    'retries': {'mode': 'standard', 'max_attempts': 1}
+}
+
+
+class ClientPool:
+    """Process-wide cache of boto3 clients keyed by (profile, region, service)
+
+    boto3 clients are thread-safe and each holds its own urllib3 connection
+    pool, so sharing them lets every manager reuse warm TLS connections.
+    Sessions are not thread-safe, so client creation is serialized. ``config``
+    overrides botocore Config options, e.g. ``{'max_pool_connections': 512}``
+    alongside raised API limits.
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        self.config_options = {**DEFAULT_CLIENT_CONFIG, **(config or {})}
+        self._config = None
+        self._sessions: Dict[Optional[str], object] = {}
+        self._clients: Dict[Tuple[Optional[str], Optional[str], str], object] = {}
+        self._lock = threading.Lock()
+
+    def session(self, profile_name: Optional[str]):
+        with self._lock:
+            return self._session(profile_name)
+
+    def _session(self, profile_name: Optional[str]):
+        if profile_name not in self._sessions:
+            import boto3
+            self._sessions[profile_name] = boto3.Session(profile_name=profile_name)
+        return self._sessions[profile_name]
+
+    def client(self, service: str, region: Optional[str] = None, profile_name: Optional[str] = None):
+        """Return the shared client for the key, creating it on first use"""
+        key = (profile_name, region, service)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            if key not in self._clients:
+                if self._config is None:
+                    from botocore.config import Config
+                    self._config = Config(**self.config_options)
+                self._clients[key] = self._session(profile_name).client(
+                    service,
+                    region_name=region,
+                    config=self._config
+                )
+            return self._clients[key]
+
+    def clear(self):
+        """Drop cached sessions and clients, e.g. after credentials change"""
+        with self._lock:
+            self._sessions.clear()
+            self._clients.clear()
+
+
+class PooledClient:
+    """Descriptor resolving a client from the owner's ``client_pool`` on first access
+
+    The owner needs ``client_pool``, ``region`` and ``profile_name`` attributes.
+    The client is cached on the instance, and assigning the attribute replaces it.
+    """
+
+    def __init__(self, service: str, regional: bool = True):
+        self.service = service
+        self.regional = regional
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        client = instance.client_pool.client(
+            self.service,
+            instance.region if self.regional else None,
+            instance.profile_name
+        )
+        instance.__dict__[self.name] = client
+        return client
+
+
+default_pool = ClientPool()
@@ -0,0 +1,239 @@
+import ast
+import json
+import operator
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+# NumPy is optional; without it batches are evaluated row by row
+
+DEFAULT_CONDITION = 'default'
+
+_COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+_LITERAL_NAMES = {'true': True, 'false': False, 'null': None}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def parse_expression(expression: str, names: Optional[Iterable[str]] = None) -> ast.AST:
+    """Parse a Condition expression, rejecting anything but comparisons joined by and/or/not"""
+    try:
+        parsed = ast.parse(expression, mode='eval').body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid condition expression {expression!r}: {e.msg}") from e
+
+    names = set(names) if names is not None else None
+    for node in ast.walk(parsed):
+        if isinstance(node, ast.Compare):
+            if not all(type(op) in _COMPARISONS for op in node.ops):
+                raise ValueError(f"Unsupported comparison in condition {expression!r}")
+        elif isinstance(node, ast.Name):
+            if names is not None and node.id not in names and node.id not in _LITERAL_NAMES:
+                raise ValueError(f"Condition {expression!r} references unknown input '{node.id}'")
+        elif not isinstance(node, (ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.Constant,
+                                   ast.Load, *_COMPARISONS)):
+            raise ValueError(f"Unsupported syntax in condition {expression!r}")
+    return parsed
+
+
+def _is_literal(node: ast.Name, names: Optional[set]) -> bool:
+    return node.id in _LITERAL_NAMES and (names is None or node.id not in names)
+
+
+def _compile_row(node: ast.AST, names: Optional[set]) -> Callable[[Mapping[str, Any]], Any]:
+    """Compile an expression tree into nested closures over a single row of values"""
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_row(value, names) for value in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda row: all(part(row) for part in parts)
+        return lambda row: any(part(row) for part in parts)
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_row(node.operand, names)
+        return lambda row: not operand(row)
+
+    if isinstance(node, ast.Compare):
+        operands = [_compile_row(node.left, names)] + [_compile_row(c, names) for c in node.comparators]
+        ops = [_COMPARISONS[type(op)] for op in node.ops]
+        if len(ops) == 1:
+            op, left, right = ops[0], operands[0], operands[1]
+            return lambda row: op(left(row), right(row))
+
+        def compare_chain(row):
+            left = operands[0](row)
+            for op, operand in zip(ops, operands[1:]):
+                right = operand(row)
+                if not op(left, right):
+                    return False
+                left = right
+            return True
+        return compare_chain
+
+    if isinstance(node, ast.Name):
+        if _is_literal(node, names):
+            value = _LITERAL_NAMES[node.id]
+            return lambda row: value
+        return operator.itemgetter(node.id)
+
+    value = node.value
+    return lambda row: value
+
+
+def _compile_vector(node: ast.AST, names: Optional[set], np) -> Callable[[Mapping[str, Any]], Any]:
+    """Compile an expression tree into a function of columns returning a boolean mask"""
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_vector(value, names, np) for value in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        return lambda columns: combine.reduce([part(columns) for part in parts])
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_vector(node.operand, names, np)
+        return lambda columns: np.logical_not(operand(columns))
+
+    if isinstance(node, ast.Compare):
+        operands = [_compile_vector(node.left, names, np)] + [_compile_vector(c, names, np) for c in node.comparators]
+        ops = [_COMPARISONS[type(op)] for op in node.ops]
+
+        def compare(columns):
+            values = [operand(columns) for operand in operands]
+            masks = [op(left, right) for op, left, right in zip(ops, values, values[1:])]
+            return masks[0] if len(masks) == 1 else np.logical_and.reduce(masks)
+        return compare
+
+    if isinstance(node, ast.Name):
+        if _is_literal(node, names):
+            value = _LITERAL_NAMES[node.id]
+            return lambda columns: value
+        return operator.itemgetter(node.id)
+
+    value = node.value
+    return lambda columns: value
+
+
+class ConditionEvaluator:
+    """Routing logic of one Condition node, compiled once and evaluated per row or per batch
+
+    Conditions are checked in definition order and the first that holds picks
+    the branch; otherwise the ``default`` branch is taken, as in the service.
+    A row whose values cannot be compared, such as a null or a string
+    compared with a number, also takes the default branch and is counted in
+    ``errors`` instead of failing the whole batch.
+    """
+
+    def __init__(self, node: dict):
+        self.name = node.get('name')
+        self.inputs = [port['name'] for port in node.get('inputs', [])]
+        names = set(self.inputs)
+
+        conditions = node.get('configuration', {}).get('condition', {}).get('conditions', [])
+        self.expressions = [(c['name'], parse_expression(c['expression'], names))
+                            for c in conditions if c.get('expression')]
+        self.branches = [name for name, _ in self.expressions] + [DEFAULT_CONDITION]
+        self._row = [(name, _compile_row(expression, names)) for name, expression in self.expressions]
+        self._names = names
+        self._vector = None
+        self.errors = 0
+
+    def select(self, values: Mapping[str, Any]) -> str:
+        """Branch taken for one set of input values"""
+        try:
+            for name, predicate in self._row:
+                if predicate(values):
+                    return name
+        except TypeError:
+            self.errors += 1
+        return DEFAULT_CONDITION
+
+    def select_indexes(self, columns: Mapping[str, Sequence]):
+        """Index into ``branches`` of the branch taken for each row of columnar inputs"""
+        np = _numpy()
+        if np is None:
+            return self._select_rows(columns)
+
+        if self._vector is None:
+            self._vector = [_compile_vector(expression, self._names, np) for _, expression in self.expressions]
+        arrays = {name: np.asarray(columns[name]) for name in self.inputs if name in columns}
+        # Nulls and mixed types leave columns of Python objects, which can only be compared row by row
+        if any(array.dtype == object for array in arrays.values()):
+            return np.asarray(self._select_rows(columns), dtype=np.int32)
+        size = len(next(iter(arrays.values()))) if arrays else 0
+
+        # Assign in reverse so the first matching condition wins
+        indexes = np.full(size, len(self.expressions), dtype=np.int32)
+        try:
+            for index in range(len(self._vector) - 1, -1, -1):
+                mask = np.broadcast_to(np.asarray(self._vector[index](arrays), dtype=bool), (size,))
+                indexes[mask] = index
+        except TypeError:
+            # e.g. a column of strings ordered against a number
+            return np.asarray(self._select_rows(columns), dtype=np.int32)
+        return indexes
+
+    def select_batch(self, columns: Mapping[str, Sequence]):
+        """Branch name taken for each row; a NumPy array when NumPy is installed, else a list"""
+        indexes = self.select_indexes(columns)
+        np = _numpy()
+        if np is None:
+            return [self.branches[index] for index in indexes]
+        return np.asarray(self.branches, dtype=object)[indexes]
+
+    def distribution(self, columns: Mapping[str, Sequence]) -> Dict[str, int]:
+        """Number of rows routed to each branch, including branches no row took"""
+        indexes = self.select_indexes(columns)
+        np = _numpy()
+        if np is None:
+            counts = [0] * len(self.branches)
+            for index in indexes:
+                counts[index] += 1
+        else:
+            counts = np.bincount(indexes, minlength=len(self.branches)).tolist()
+        return dict(zip(self.branches, counts))
+
+    def _select_rows(self, columns: Mapping[str, Sequence]) -> List[int]:
+        return [self.branches.index(self.select(row)) for row in self._rows(columns)]
+
+    def _rows(self, columns: Mapping[str, Sequence]) -> List[Dict[str, Any]]:
+        present = [name for name in self.inputs if name in columns]
+        return [dict(zip(present, values)) for values in zip(*(columns[name] for name in present))]
+
+
+def compile_conditions(definition: dict) -> Dict[str, ConditionEvaluator]:
+    """Evaluators for every Condition node in a flow definition, keyed by node name"""
+    return {node['name']: ConditionEvaluator(node)
+            for node in definition.get('nodes', []) if node.get('type') == 'Condition'}
+
+
+def load_columns(input_path: str, inputs: List[str]) -> Dict[str, list]:
+    """
+    Read JSONL rows into columns for the given input names
+
+    Each line is either an object keyed by input name or, for single-input
+    nodes, the raw value itself.
+    """
+    columns = {name: [] for name in inputs}
+    with open(input_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            if isinstance(row, dict):
+                for name in inputs:
+                    columns[name].append(row.get(name))
+            elif len(inputs) == 1:
+                columns[inputs[0]].append(row)
+            else:
+                raise ValueError(f"Rows must be JSON objects keyed by {', '.join(inputs)}")
+    return columns
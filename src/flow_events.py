@@ -0,0 +1,256 @@
+import atexit
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, TextIO
+
+# Color scheme for better visibility in both dark and light modes
+# Using high contrast colors that are also colorblind-friendly
+COLORS = {
+    'header': {'color': 'white', 'attrs': ['bold']},
+    'step': {'color': 'cyan', 'attrs': ['bold']},
+    'info': {'color': 'blue', 'attrs': ['bold']},
+    'success': {'color': 'green', 'attrs': ['bold']},
+    'warning': {'color': 'yellow', 'attrs': ['bold']},
+    'error': {'color': 'red', 'attrs': ['bold']},
+    'input': {'color': 'magenta', 'attrs': ['bold']},
+}
+
+# Progress chatter that quiet sinks drop; results, warnings and errors always get through
+PROGRESS_STYLES = frozenset(('header', 'step', 'info', 'input'))
+
+LEVELS = {'error': 'error', 'warning': 'warning'}
+
+
+class Event(NamedTuple):
+    """One reported message: its style, text and any structured fields"""
+    time: float
+    style: str
+    message: str
+    fields: Dict[str, Any]
+
+    @property
+    def level(self) -> str:
+        return LEVELS.get(self.style, 'info')
+
+
+class TTYSink:
+    """Writes events as colored lines, one write and flush per batch"""
+
+    def __init__(self, stream: Optional[TextIO] = None, quiet: bool = False):
+        self.stream = stream
+        self.quiet = quiet
+
+    def write(self, events: List[Event]):
+        from termcolor import colored
+
+        # Resolved per batch so redirected or captured stdout is honoured
+        stream = self.stream or sys.stdout
+        # termcolor decides per call whether to color at all, so ask it once per style and batch
+        wrappers = {}
+        lines = []
+        for event in events:
+            wrapper = wrappers.get(event.style)
+            if wrapper is None:
+                color = COLORS.get(event.style, COLORS['info'])
+                wrapper = wrappers[event.style] = colored('\0', color['color'], attrs=color.get('attrs', [])).split('\0')
+            lines.append(f"{wrapper[0]}{event.message}{wrapper[1]}\n")
+        stream.write(''.join(lines))
+        stream.flush()
+
+    def close(self):
+        pass
+
+
+class NDJSONSink:
+    """Appends events to a file (or stream) as one JSON object per line"""
+
+    def __init__(self, path: Optional[str] = None, stream: Optional[TextIO] = None, quiet: bool = False):
+        if not path and stream is None:
+            raise ValueError("Give a path or a stream to write events to")
+        self.path = path
+        self.stream = stream
+        self.quiet = quiet
+
+    def write(self, events: List[Event]):
+        if self.stream is None:
+            self.stream = open(self.path, 'a')
+        lines = []
+        for event in events:
+            message = event.message.strip()
+            # Separator rules only decorate the console
+            if not message.strip('-='):
+                continue
+            lines.append(json.dumps({'time': round(event.time, 6), 'level': event.level, 'style': event.style,
+                                     'message': message, **event.fields}, default=str) + '\n')
+        self.stream.write(''.join(lines))
+        self.stream.flush()
+
+    def close(self):
+        if self.path and self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+
+class MemorySink:
+    """Keeps events in a list, e.g. for tests and notebooks"""
+
+    def __init__(self, quiet: bool = False):
+        self.events: List[Event] = []
+        self.quiet = quiet
+
+    def write(self, events: List[Event]):
+        self.events.extend(events)
+
+    def messages(self, style: Optional[str] = None) -> List[str]:
+        return [event.message for event in self.events if style is None or event.style == style]
+
+    def close(self):
+        pass
+
+
+class EventLog:
+    """
+    Fans reported events out to sinks
+
+    By default events are written as they are emitted. With ``background``
+    they are queued and a writer thread hands them to the sinks in batches
+    of up to ``batch_size``, at least every ``flush_interval`` seconds, so
+    threads emitting events never wait on console or file I/O; emitters
+    only write themselves when ``max_pending`` events are queued. Call
+    ``flush()`` before anything else writes to the same stream, such as an
+    interactive prompt. Progress styles are dropped before an event is even
+    built when every sink is quiet.
+    """
+
+    def __init__(self, sinks: Optional[Iterable] = None, background: bool = False, batch_size: int = 256,
+                 flush_interval: float = 0.1, max_pending: int = 65536):
+        self.sinks = list(sinks) if sinks is not None else [TTYSink()]
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.quiet = all(sink.quiet for sink in self.sinks)
+        self.counters = {'emitted': 0, 'dropped': 0, 'batches': 0, 'errors': 0}
+
+        self._pending: deque = deque()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name='event-log', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def emit(self, style: str, message: str, **fields):
+        if self.quiet and style in PROGRESS_STYLES:
+            self.counters['dropped'] += 1
+            return
+        event = Event(time.time(), style, message, fields)
+        self.counters['emitted'] += 1
+        if self._thread is None or self._closed:
+            with self._write_lock:
+                self._write([event])
+            return
+        pending = self._pending
+        pending.append(event)
+        if self._closed or len(pending) >= self.max_pending:
+            self._drain()
+        elif len(pending) == self.batch_size:
+            # Wake the writer once per full batch; it also wakes on its own every flush_interval
+            with self._wake:
+                self._wake.notify()
+
+    def flush(self):
+        """Write every event emitted so far"""
+        self._drain()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            with self._wake:
+                self._wake.notify()
+            self._thread.join()
+        self._drain()
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        while not self._closed:
+            with self._wake:
+                if len(self._pending) < self.batch_size and not self._closed:
+                    self._wake.wait(self.flush_interval)
+            self._drain()
+
+    def _drain(self):
+        with self._write_lock:
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popleft())
+                self._write(batch)
+
+    def _write(self, batch: List[Event]):
+        self.counters['batches'] += 1
+        for sink in self.sinks:
+            events = [event for event in batch if event.style not in PROGRESS_STYLES] if sink.quiet else batch
+            if not events:
+                continue
+            try:
+                sink.write(events)
+            except (OSError, ValueError):
+                # A closed pipe or file must not take the reporting thread (or the caller) down with it
+                self.counters['errors'] += 1
+
+
+class EventLogHandler(logging.Handler):
+    """Routes logging records into an event log, so library warnings reach the same sinks"""
+
+    def __init__(self, log: 'EventLog', level: int = logging.NOTSET):
+        super().__init__(level)
+        self.log = log
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            if record.levelno >= logging.ERROR:
+                style = 'error'
+            elif record.levelno >= logging.WARNING:
+                style = 'warning'
+            else:
+                style = 'info'
+            self.log.emit(style, self.format(record), logger=record.name)
+        except Exception:
+            self.handleError(record)
+
+
+_event_log: Optional[EventLog] = None
+_event_log_lock = threading.Lock()
+
+
+def event_log() -> EventLog:
+    """The process-wide event log, printing to stdout until configured otherwise"""
+    global _event_log
+    if _event_log is None:
+        with _event_log_lock:
+            if _event_log is None:
+                _event_log = EventLog()
+    return _event_log
+
+
+def set_event_log(log: EventLog) -> Optional[EventLog]:
+    """Replace the process-wide event log, returning the previous one (not closed)"""
+    global _event_log
+    with _event_log_lock:
+        previous, _event_log = _event_log, log
+    return previous
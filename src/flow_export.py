@@ -0,0 +1,206 @@
+import fnmatch
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from flow_pipeline import DeployPipeline, Stage
+from flow_throttle import ThrottleRegistry
+
+logger = logging.getLogger(__name__)
+
+# Bump when the manifest or object format changes
+EXPORT_FORMAT_VERSION = 1
+
+DEFAULT_ARCHIVE_DIR = './flow-archive'
+
+
+def flow_export_data(flow_details: dict) -> dict:
+    """The parts of a get_flow response kept in an export"""
+    return {
+        "name": flow_details['name'],
+        "description": flow_details.get('description', ''),
+        "definition": flow_details['definition'],
+        "tags": flow_details.get('tags', {}),
+        "executionRoleArn": flow_details.get('executionRoleArn')
+    }
+
+
+def _timestamp(value) -> Optional[str]:
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class FlowExporter:
+    """Snapshots every flow in an account into a compressed, content-addressed archive
+
+    Each distinct export is stored once as ``objects/<hash[:2]>/<hash>.json.gz``,
+    named by the SHA-256 of its canonical JSON, and ``manifest.json`` maps flow
+    IDs to names, ``updatedAt`` and hashes. On later runs, flows whose
+    ``updatedAt`` matches the previous manifest (and whose object is present)
+    are skipped without a ``get_flow`` call, fetched flows whose content hash
+    is unchanged write nothing, and only new objects are added, so syncing the
+    archive elsewhere copies just what changed. Each manifest that differs
+    from the last is also kept under ``snapshots/``.
+    """
+
+    def __init__(self, client, throttle: ThrottleRegistry, archive_dir: str = DEFAULT_ARCHIVE_DIR,
+                 concurrency: int = 8):
+        self.client = client
+        self.throttle = throttle
+        self.archive_dir = Path(archive_dir)
+        self.concurrency = concurrency
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.archive_dir / 'manifest.json'
+
+    def object_path(self, digest: str) -> Path:
+        return self.archive_dir / 'objects' / digest[:2] / f"{digest}.json.gz"
+
+    def load_manifest(self) -> Dict:
+        """The previous manifest, or an empty one when there is none or it cannot be read"""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == EXPORT_FORMAT_VERSION:
+                return manifest
+            logger.warning("Ignoring manifest %s with format version %s", self.manifest_path, manifest.get('version'))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable manifest %s: %s", self.manifest_path, e)
+        return {'version': EXPORT_FORMAT_VERSION, 'flows': {}}
+
+    def read(self, digest: str) -> dict:
+        """An archived export by its hash"""
+        with gzip.open(self.object_path(digest), 'rt') as f:
+            return json.load(f)
+
+    def _fetch_stage(self) -> Stage:
+        def fetch(job: dict) -> dict:
+            details = self.throttle.call('get_flow', self.client.get_flow, flowIdentifier=job['flow_id'])
+            data = json.dumps(flow_export_data(details), sort_keys=True, separators=(',', ':'),
+                              default=str).encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()
+            updates = {'hash': digest, 'bytes': len(data)}
+            if digest == job['_previous_hash'] and self.object_path(digest).exists():
+                updates['_complete'] = 'UNCHANGED'
+            else:
+                updates['_data'] = data
+            return updates
+        return Stage('fetch', fetch)
+
+    def _store_stage(self) -> Stage:
+        def store(job: dict) -> dict:
+            path = self.object_path(job['hash'])
+            # Another flow with identical content may already have stored it
+            if path.exists():
+                return {'compressed_bytes': 0}
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # A fixed mtime keeps objects byte-identical for identical content
+            compressed = gzip.compress(job['_data'], mtime=0)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+            return {'compressed_bytes': len(compressed)}
+        return Stage('store', store)
+
+    def export(self, name_pattern: Optional[str] = None, verify: bool = False,
+               on_result: Optional[Callable[[dict], None]] = None) -> Dict:
+        """
+        Bring the archive up to date with the account's flows
+
+        Only flows whose name matches the glob ``name_pattern`` are considered;
+        archived flows outside it are left as they are. With ``verify`` every
+        flow is fetched and hashed, whatever its ``updatedAt``. A flow that
+        fails to export keeps its previous manifest entry.
+        """
+        started = time.perf_counter()
+        previous = self.load_manifest()['flows']
+
+        jobs = []
+        skipped = []
+        listed = set()
+        for summary in self.throttle.paginate('list_flows', self.client.list_flows, 'flowSummaries', maxResults=100):
+            if name_pattern and not fnmatch.fnmatchcase(summary['name'], name_pattern):
+                continue
+            listed.add(summary['id'])
+            updated_at = _timestamp(summary.get('updatedAt'))
+            entry = previous.get(summary['id'])
+            if (not verify and entry and entry['updated_at'] == updated_at
+                    and self.object_path(entry['hash']).exists()):
+                record = {'flow_id': summary['id'], 'name': summary['name'], 'status': 'SKIPPED', 'hash': entry['hash']}
+                skipped.append(record)
+                if on_result:
+                    on_result(record)
+                continue
+            jobs.append({
+                'index': len(jobs),
+                'flow_id': summary['id'],
+                'name': summary['name'],
+                'updated_at': updated_at,
+                '_previous_hash': entry['hash'] if entry else None
+            })
+
+        pipeline = DeployPipeline([self._fetch_stage(), self._store_stage()], self.concurrency,
+                                  success_status='EXPORTED')
+        summary = pipeline.run(jobs, on_result=on_result)
+
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        flows = {flow_id: entry for flow_id, entry in previous.items()
+                 if flow_id in listed or (name_pattern and not fnmatch.fnmatchcase(entry['name'], name_pattern))}
+        removed = sorted(flow_id for flow_id in previous if flow_id not in flows)
+        for record in skipped:
+            flows[record['flow_id']] = {**previous[record['flow_id']], 'name': record['name']}
+        for flow in summary['flows']:
+            if flow['status'] in ('EXPORTED', 'UNCHANGED'):
+                entry = previous.get(flow['flow_id'], {})
+                flows[flow['flow_id']] = {
+                    'name': flow['name'],
+                    'updated_at': flow['updated_at'],
+                    'hash': flow['hash'],
+                    'bytes': flow['bytes'],
+                    'exported_at': entry.get('exported_at', now) if flow['status'] == 'UNCHANGED' else now
+                }
+
+        changed = flows != previous or not self.manifest_path.exists()
+        snapshot_path = None
+        if changed:
+            snapshot_path = self._write_manifest({'version': EXPORT_FORMAT_VERSION, 'created_at': now,
+                                                  'flows': dict(sorted(flows.items()))})
+
+        results = skipped + summary['flows']
+        return {
+            'listed': len(listed),
+            'exported': summary['statuses'].get('EXPORTED', 0),
+            'unchanged': summary['statuses'].get('UNCHANGED', 0),
+            'skipped': len(skipped),
+            'removed': removed,
+            'failed': summary['failed'],
+            'objects_written': sum(1 for flow in summary['flows'] if flow.get('compressed_bytes')),
+            'bytes_written': sum(flow.get('compressed_bytes', 0) for flow in summary['flows']),
+            'manifest': str(self.manifest_path),
+            'snapshot': str(snapshot_path) if snapshot_path else None,
+            'stages': summary['stages'],
+            'elapsed': round(time.perf_counter() - started, 3),
+            'flows': results
+        }
+
+    def _write_manifest(self, manifest: Dict) -> Path:
+        """Write the manifest and a copy under snapshots/, both atomically; returns the snapshot path"""
+        snapshot_path = self.archive_dir / 'snapshots' / f"{manifest['created_at'].replace(':', '')}.json"
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        text = json.dumps(manifest, indent=2)
+        for path in (snapshot_path, self.manifest_path):
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        return snapshot_path
@@ -0,0 +1,76 @@
+import csv
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from flow_pipeline import DeployPipeline, Stage
+from flow_templates import CompiledTemplate
+
+logger = logging.getLogger(__name__)
+
+# Binding columns that configure the deployment rather than a template variable
+FLOW_NAME_FIELD = 'flow_name'
+
+
+def load_bindings(bindings_path: str) -> List[Dict[str, str]]:
+    """Read variable bindings from a CSV (header row) or JSONL file, one flow per row"""
+    path = Path(bindings_path)
+    if path.suffix.lower() == '.csv':
+        with open(path, 'r', newline='') as f:
+            return [dict(row) for row in csv.DictReader(f)]
+
+    rows = []
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f"{bindings_path}:{line_number}: expected a JSON object of variable bindings")
+            rows.append(row)
+    return rows
+
+
+def normalize_bindings(row: Dict[str, str], compiled: CompiledTemplate) -> Dict[str, str]:
+    """Map a row's columns to $$VARIABLE names; columns may be written with or without the $$ prefix"""
+    bindings = {}
+    for key, value in row.items():
+        if key == FLOW_NAME_FIELD:
+            continue
+        name = key if key.startswith('$$') else f"$${key}"
+        bindings[name] = str(value)
+
+    missing = [var for var in compiled.variables if not bindings.get(var)]
+    if missing:
+        raise ValueError(f"Missing values for template variables: {', '.join(missing)}")
+    return bindings
+
+
+def deploy_fleet(compiled: CompiledTemplate, rows: List[Dict[str, str]], stages: List[Stage],
+                 concurrency: int = 8, cleanup: Optional[Callable[[dict], None]] = None,
+                 on_result: Optional[Callable[[dict], None]] = None) -> Dict:
+    """
+    Render one flow per binding row and move them through the deployment stages concurrently
+
+    A ``render`` stage is run first and leaves the rendered definition and
+    metadata in the job as ``_definition`` and ``_metadata``; each of ``stages``
+    then reads and extends the job (``flow_name``, ``flow_id``, ...). Rows that
+    fail to render are reported without being deployed, and ``cleanup`` is
+    called for jobs that fail in a later stage. ``on_result`` is called with
+    each flow's summary as it finishes.
+    """
+    base_name = compiled.metadata['name']
+
+    def render(job: dict) -> dict:
+        definition, metadata = compiled.render(normalize_bindings(job['_row'], compiled))
+        return {'_definition': definition, '_metadata': metadata}
+
+    jobs = [
+        {'index': index, 'flow_name': row.get(FLOW_NAME_FIELD) or f"{base_name}-{index}", '_row': row}
+        for index, row in enumerate(rows)
+    ]
+    pipeline = DeployPipeline([Stage('render', render)] + stages, concurrency=concurrency, cleanup=cleanup)
+    summary = pipeline.run(jobs, on_result=on_result)
+    return {'template': base_name, **summary}
@@ -0,0 +1,166 @@
+import fnmatch
+import re
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from flow_pipeline import DeployPipeline, Stage
+from flow_throttle import ThrottleRegistry, error_code
+
+AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_age(text: str) -> float:
+    """Parse an age such as 90m, 12h or 7d into seconds"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*', text)
+    if not match:
+        raise ValueError(f"Invalid age {text!r}; use a number with an s, m, h, d or w suffix")
+    return float(match.group(1)) * AGE_UNITS[match.group(2) or 's']
+
+
+def parse_tag_filters(values: Optional[List[str]]) -> Dict[str, Optional[str]]:
+    """Turn key or key=value arguments into a filter; a None value only requires the key"""
+    filters = {}
+    for value in values or []:
+        key, separator, expected = value.partition('=')
+        filters[key] = expected if separator else None
+    return filters
+
+
+def _age_seconds(updated_at, now: datetime) -> Optional[float]:
+    if updated_at is None:
+        return None
+    if isinstance(updated_at, str):
+        updated_at = datetime.fromisoformat(updated_at.replace('Z', '+00:00'))
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return (now - updated_at).total_seconds()
+
+
+class FlowReaper:
+    """Finds flows by name pattern, tags and age and deletes them with their aliases and versions
+
+    Every list and delete call goes through the shared rate limiter. Flows move
+    through a pipeline (inspect, aliases, versions, flow), so each flow's
+    resources are deleted in dependency order while many flows are processed
+    concurrently. Resources that are already gone count as deleted.
+    """
+
+    def __init__(self, client, throttle: ThrottleRegistry, concurrency: int = 16):
+        self.client = client
+        self.throttle = throttle
+        self.concurrency = concurrency
+
+    def candidates(self, name_pattern: Optional[str] = None, older_than: Optional[float] = None) -> List[dict]:
+        """Flows whose name matches the glob pattern and that were last updated over ``older_than`` seconds ago"""
+        now = datetime.now(timezone.utc)
+        jobs = []
+        for summary in self.throttle.paginate('list_flows', self.client.list_flows, 'flowSummaries', maxResults=100):
+            if name_pattern and not fnmatch.fnmatchcase(summary['name'], name_pattern):
+                continue
+            age = _age_seconds(summary.get('updatedAt'), now)
+            if older_than is not None and (age is None or age < older_than):
+                continue
+            updated_at = summary.get('updatedAt')
+            jobs.append({
+                'index': len(jobs),
+                'flow_id': summary['id'],
+                'name': summary['name'],
+                'updated_at': updated_at.isoformat() if hasattr(updated_at, 'isoformat') else updated_at,
+                '_arn': summary.get('arn')
+            })
+        return jobs
+
+    def _delete(self, api: str, **kwargs) -> bool:
+        """Delete one resource, returning False if it no longer existed"""
+        try:
+            self.throttle.call(api, getattr(self.client, api), **kwargs)
+        except Exception as e:
+            if error_code(e) == 'ResourceNotFoundException':
+                return False
+            raise
+        return True
+
+    def _inspect_stage(self, tags: Dict[str, Optional[str]]) -> Stage:
+        def inspect(job: dict) -> dict:
+            if tags:
+                flow_tags = self.throttle.call(
+                    'list_tags_for_resource',
+                    self.client.list_tags_for_resource,
+                    resourceArn=job['_arn']
+                ).get('tags', {})
+                for key, expected in tags.items():
+                    if key not in flow_tags or (expected is not None and flow_tags[key] != expected):
+                        return {'_complete': 'SKIPPED'}
+
+            aliases = self.throttle.paginate('list_flow_aliases', self.client.list_flow_aliases,
+                                             'flowAliasSummaries', flowIdentifier=job['flow_id'])
+            versions = self.throttle.paginate('list_flow_versions', self.client.list_flow_versions,
+                                              'flowVersionSummaries', flowIdentifier=job['flow_id'])
+            return {
+                'aliases': [alias['id'] for alias in aliases],
+                # The working draft goes with the flow itself
+                'versions': [v['version'] for v in versions if v['version'] != 'DRAFT']
+            }
+        return Stage('inspect', inspect)
+
+    def _delete_stages(self) -> List[Stage]:
+        def aliases(job: dict) -> dict:
+            deleted = sum(self._delete('delete_flow_alias', flowIdentifier=job['flow_id'], aliasIdentifier=alias_id)
+                          for alias_id in job['aliases'])
+            return {'deleted_aliases': deleted}
+
+        def versions(job: dict) -> dict:
+            deleted = sum(self._delete('delete_flow_version', flowIdentifier=job['flow_id'], flowVersion=version)
+                          for version in job['versions'])
+            return {'deleted_versions': deleted}
+
+        def flow(job: dict):
+            self._delete('delete_flow', flowIdentifier=job['flow_id'])
+
+        return [Stage('aliases', aliases), Stage('versions', versions), Stage('flow', flow)]
+
+    def plan(self, name_pattern: Optional[str] = None, tags: Optional[Dict[str, Optional[str]]] = None,
+             older_than: Optional[float] = None) -> Dict:
+        """Select flows and list their aliases and versions without deleting anything"""
+        if not (name_pattern or tags or older_than is not None):
+            raise ValueError("Refusing to select every flow; give a name pattern, tag or age")
+
+        started = time.perf_counter()
+        jobs = self.candidates(name_pattern, older_than)
+        pipeline = DeployPipeline([self._inspect_stage(tags or {})], self.concurrency, success_status='PLANNED')
+        summary = pipeline.run(jobs)
+        flows = [flow for flow in summary['flows'] if flow['status'] == 'PLANNED']
+        for index, flow in enumerate(flows):
+            flow['index'] = index
+        return {
+            'flows': flows,
+            'skipped': summary['statuses'].get('SKIPPED', 0),
+            'failed': [flow for flow in summary['flows'] if flow['status'] == 'FAILED'],
+            'aliases': sum(len(flow['aliases']) for flow in flows),
+            'versions': sum(len(flow['versions']) for flow in flows),
+            'elapsed': round(time.perf_counter() - started, 3)
+        }
+
+    def execute(self, plan: Dict, on_result=None) -> Dict:
+        """Delete every planned flow's aliases, then versions, then the flow"""
+        jobs = [{key: value for key, value in flow.items() if key not in ('status', 'elapsed')}
+                for flow in plan['flows']]
+        pipeline = DeployPipeline(self._delete_stages(), self.concurrency, success_status='DELETED')
+        summary = pipeline.run(jobs, on_result=on_result)
+
+        flows = summary['flows']
+        deleted_aliases = sum(flow.get('deleted_aliases', 0) for flow in flows)
+        deleted_versions = sum(flow.get('deleted_versions', 0) for flow in flows)
+        deleted_flows = summary['statuses'].get('DELETED', 0)
+        deletes = deleted_aliases + deleted_versions + deleted_flows
+        return {
+            'flows': flows,
+            'deleted_flows': deleted_flows,
+            'deleted_aliases': deleted_aliases,
+            'deleted_versions': deleted_versions,
+            'failed': summary['failed'],
+            'stages': summary['stages'],
+            'elapsed': summary['elapsed'],
+            'deletes_per_second': round(deletes / summary['elapsed'], 2) if summary['elapsed'] else 0.0
+        }
@@ -0,0 +1,268 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+# Upper bounds, in seconds, of the stage duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_current_span: ContextVar[Optional['Span']] = ContextVar('flow_current_span', default=None)
+
+
+class Span:
+    """One timed stage with attributes, linked to its parent by trace and span IDs"""
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'error',
+                 '_recorder')
+
+    def __init__(self, recorder: 'SpanRecorder', name: str, parent: Optional['Span'], attributes: Dict[str, Any]):
+        self._recorder = recorder
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.end_ns: Optional[int] = None
+        self.start_ns = time.time_ns()
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self._recorder._finish(self)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def end(self, error: Optional[BaseException] = None):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Instrumentation:
+    """
+    Stage instrumentation that records nothing
+
+    This is the default, so instrumented code only pays for a method call
+    returning a shared span object. Check ``enabled`` before computing
+    attributes that are costly to build, such as payload sizes.
+    """
+    enabled = False
+
+    def span(self, name: str, **attributes):
+        """Context manager timing a stage; spans opened inside it become its children"""
+        return _NOOP_SPAN
+
+    def start_span(self, name: str, **attributes):
+        """Start a span that is ended explicitly, e.g. one covering a generator"""
+        return _NOOP_SPAN
+
+
+NOOP = Instrumentation()
+
+
+class SpanRecorder(Instrumentation):
+    """
+    Records stage spans and per-stage metrics
+
+    Finished spans are kept up to ``max_spans`` and can be exported as
+    OTLP/JSON, the OpenTelemetry file and HTTP format. Every span also updates
+    a count, error count and duration histogram per stage, exported in the
+    Prometheus text format.
+    """
+    enabled = True
+
+    def __init__(self, service_name: str = 'bedrock-flow-manager', max_spans: int = 100_000):
+        self.service_name = service_name
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        # stage -> [count, errors, duration sum, bucket counts...]
+        self._metrics: Dict[str, list] = {}
+
+    @contextmanager
+    def _activate(self, span: Span):
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def span(self, name: str, **attributes):
+        return self._activate(Span(self, name, _current_span.get(), attributes))
+
+    def start_span(self, name: str, **attributes) -> Span:
+        return Span(self, name, _current_span.get(), attributes)
+
+    def _finish(self, span: Span):
+        duration = span.duration
+        with self._lock:
+            self.spans.append(span)
+            metrics = self._metrics.get(span.name)
+            if metrics is None:
+                metrics = self._metrics[span.name] = [0, 0, 0.0] + [0] * len(DURATION_BUCKETS)
+            metrics[0] += 1
+            metrics[1] += span.error is not None
+            metrics[2] += duration
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    metrics[3 + index] += 1
+                    break
+
+    def otlp(self) -> dict:
+        """Finished spans as an OTLP/JSON ExportTraceServiceRequest"""
+        with self._lock:
+            spans = list(self.spans)
+        return {'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': self.service_name})},
+            'scopeSpans': [{
+                'scope': {'name': 'flow_instrumentation'},
+                'spans': [{
+                    'traceId': span.trace_id,
+                    'spanId': span.span_id,
+                    **({'parentSpanId': span.parent_id} if span.parent_id else {}),
+                    'name': span.name,
+                    'kind': 1,
+                    'startTimeUnixNano': str(span.start_ns),
+                    'endTimeUnixNano': str(span.end_ns),
+                    'attributes': _otlp_attributes(span.attributes),
+                    # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+                    'status': {'code': 2, 'message': span.error} if span.error else {'code': 1}
+                } for span in spans]
+            }]
+        }]}
+
+    def prometheus(self) -> str:
+        """Per-stage counters and duration histograms in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = {name: list(values) for name, values in self._metrics.items()}
+
+        lines = [
+            '# HELP flow_stage_total Completed stage spans.',
+            '# TYPE flow_stage_total counter',
+        ]
+        lines += [f'flow_stage_total{{stage="{name}"}} {values[0]}' for name, values in sorted(metrics.items())]
+        lines += [
+            '# HELP flow_stage_errors_total Stage spans that ended with an error.',
+            '# TYPE flow_stage_errors_total counter',
+        ]
+        lines += [f'flow_stage_errors_total{{stage="{name}"}} {values[1]}' for name, values in sorted(metrics.items())]
+        lines += [
+            '# HELP flow_stage_duration_seconds Stage duration.',
+            '# TYPE flow_stage_duration_seconds histogram',
+        ]
+        for name, values in sorted(metrics.items()):
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, values[3:]):
+                cumulative += count
+                lines.append(f'flow_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'flow_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {values[0]}')
+            lines.append(f'flow_stage_duration_seconds_sum{{stage="{name}"}} {values[2]:.6f}')
+            lines.append(f'flow_stage_duration_seconds_count{{stage="{name}"}} {values[0]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_otlp(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.otlp(), f)
+
+    def write_prometheus(self, path: str):
+        with open(path, 'w') as f:
+            f.write(self.prometheus())
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[dict]:
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        encoded.append({'key': key, 'value': typed})
+    return encoded
+
+
+def instrumented(name: str, describe: Optional[Callable[..., Dict[str, Any]]] = None):
+    """
+    Run a manager method inside a span named ``name``
+
+    ``describe`` receives the method's arguments and returns span attributes;
+    it is only called when instrumentation is enabled.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = self.instrumentation
+            if not instrumentation.enabled:
+                return method(self, *args, **kwargs)
+            attributes = describe(*args, **kwargs) if describe else {}
+            with instrumentation.span(name, **attributes):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def capture_profile(profile_path: Optional[str] = None, memory_path: Optional[str] = None, top: int = 50):
+    """
+    Optionally profile the enclosed code
+
+    With ``profile_path`` a cProfile capture is saved there (load it with
+    pstats or snakeviz). With ``memory_path`` tracemalloc tracks allocations
+    and the ``top`` allocation sites by size are written there as text.
+    """
+    profiler = None
+    if profile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+    if memory_path:
+        import tracemalloc
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        if memory_path:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(memory_path, 'w') as f:
+                f.write(f"Current: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB\n")
+                for stat in snapshot.statistics('lineno')[:top]:
+                    f.write(f"{stat}\n")
@@ -0,0 +1,318 @@
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from flow_conditions import ConditionEvaluator
+from flow_validation import FlowGraph, FlowValidationError, validate_definition
+
+# Node types the executor interprets itself; everything else needs a handler
+NATIVE_NODE_TYPES = {'Input', 'Output', 'Condition', 'Iterator', 'Collector'}
+
+
+class InputRequest(NamedTuple):
+    """Returned by a node handler to ask the caller for another turn of input"""
+    document: Any
+
+
+def echo_handler(node: dict, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Default stub: pass the node's first input through to each of its outputs"""
+    value = next(iter(inputs.values()), None)
+    return {port['name']: value for port in node.get('outputs', [])}
+
+
+DEFAULT_HANDLERS: Dict[str, Callable] = {
+    'Prompt': echo_handler,
+    'KnowledgeBase': echo_handler,
+    'Agent': echo_handler,
+}
+
+
+class _Execution:
+    """State of one flow execution, kept between turns of a multi-turn conversation"""
+
+    def __init__(self, execution_id: str):
+        self.execution_id = execution_id
+        # (node, context) -> {input name: value}; a context is the tuple of
+        # iteration indexes of the enclosing Iterator loops, () at top level
+        self.values: Dict[Tuple[str, Tuple], Dict[str, Any]] = {}
+        self.activated = set()
+        self.fired = set()
+        self.collected: Dict[Tuple[str, Tuple], Dict[str, Any]] = {}
+        self.contexts = {()}
+        self.waiting: List[Tuple[str, Tuple, Any]] = []
+        self.resume_at: Optional[Tuple[str, Tuple]] = None
+
+
+class LocalFlowExecutor:
+    """In-process interpreter for flow definitions, a stand-in for invoke_flow
+
+    Input, Condition, Iterator, Collector and Output nodes are interpreted
+    natively. Other node types call a handler ``handler(node, inputs) -> outputs``
+    looked up by node name in ``node_handlers`` and then by node type in
+    ``handlers``; Prompt, KnowledgeBase and Agent default to ``echo_handler``.
+    Handlers run on a thread pool as soon as their inputs are available, so
+    independent branches execute concurrently. A handler may return an
+    :class:`InputRequest` to end the turn with ``INPUT_REQUIRED``; the next
+    ``invoke_flow`` with the same ``executionId`` calls it again with the reply.
+
+    ``invoke_flow`` accepts the bedrock-agent-runtime arguments and streams the
+    same responseStream events, so the executor can replace a manager's
+    ``bedrock_runtime`` client, and ``responder`` plugs into LocalFlowRuntime.
+    """
+
+    def __init__(self, definition: dict, handlers: Optional[Dict[str, Callable]] = None,
+                 node_handlers: Optional[Dict[str, Callable]] = None, max_workers: int = 16,
+                 validate: bool = True):
+        if validate:
+            issues = validate_definition(definition)
+            if issues:
+                raise FlowValidationError(issues)
+
+        self.graph = FlowGraph(definition)
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+        self._suspended: Dict[str, _Execution] = {}
+
+        handlers = {**DEFAULT_HANDLERS, **(handlers or {})}
+        node_handlers = node_handlers or {}
+        self._handlers: Dict[str, Callable] = {}
+        for name, node in self.graph.nodes.items():
+            node_type = node.get('type')
+            if node_type in NATIVE_NODE_TYPES:
+                continue
+            handler = node_handlers.get(name) or handlers.get(node_type)
+            if handler is None:
+                raise ValueError(f"No handler for node '{name}' of type {node_type}")
+            self._handlers[name] = handler
+
+        self._routes: Dict[str, List[Tuple[str, str, str]]] = {name: [] for name in self.graph.nodes}
+        self._branches: Dict[str, Dict[str, List[str]]] = {}
+        self._gated = set()
+        self._required: Dict[str, List[str]] = {name: [] for name in self.graph.nodes}
+        for connection in self.graph.connections:
+            source, target = connection['source'], connection['target']
+            configuration = connection.get('configuration', {})
+            if connection.get('type') == 'Conditional':
+                condition = configuration['conditional']['condition']
+                self._branches.setdefault(source, {}).setdefault(condition, []).append(target)
+                self._gated.add(target)
+            else:
+                data = configuration['data']
+                self._routes[source].append((data['sourceOutput'], target, data['targetInput']))
+                if data['targetInput'] not in self._required[target]:
+                    self._required[target].append(data['targetInput'])
+
+        self._conditions = {name: ConditionEvaluator(self.graph.nodes[name])
+                            for name in self.graph.nodes_of_type('Condition')}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self) -> 'LocalFlowExecutor':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _executor_pool(self):
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='local-flow')
+            return self._pool
+
+    def invoke_flow(self, flowIdentifier: str = None, flowAliasIdentifier: str = None,
+                    inputs: List[dict] = (), executionId: Optional[str] = None, **kwargs) -> dict:
+        """Start or continue an execution; the stream runs as it is consumed"""
+        payload = inputs[0]
+        execution = self._suspended.pop(executionId, None) if executionId else None
+
+        if execution is not None:
+            name, context = execution.resume_at
+            node_inputs = self._inputs_for(execution, name, context)
+            node_inputs[payload.get('nodeInputName', 'agentInputText')] = payload['content']['document']
+            ready = deque([(name, context, node_inputs)])
+        else:
+            if 'nodeInputName' in payload:
+                raise ValueError(f"No suspended execution {executionId} to continue")
+            if not executionId:
+                import uuid
+                executionId = str(uuid.uuid4())
+            execution = _Execution(executionId)
+            ready = deque()
+            outputs = {payload.get('nodeOutputName', 'document'): payload['content']['document']}
+            ready.extend(self._emit(execution, payload['nodeName'], (), outputs))
+
+        return {'executionId': execution.execution_id, 'responseStream': self._run(execution, ready)}
+
+    async def responder(self, flow_id: str, alias_id: str, inputs: List[dict], execution_id: str) -> List[dict]:
+        """LocalFlowRuntime responder running the executor off the event loop"""
+        import asyncio
+        response = self.invoke_flow(flow_id, alias_id, inputs, executionId=execution_id)
+        return await asyncio.to_thread(list, response['responseStream'])
+
+    def _resolve(self, execution: _Execution, name: str, port: str, context: Tuple):
+        """Return (value, depth) of an input from the innermost enclosing context, or None"""
+        for depth in range(len(context), -1, -1):
+            values = execution.values.get((name, context[:depth]))
+            if values is not None and port in values:
+                return values[port], depth
+        return None
+
+    def _inputs_for(self, execution: _Execution, name: str, context: Tuple) -> Dict[str, Any]:
+        return {port: self._resolve(execution, name, port, context)[0] for port in self._required[name]}
+
+    def _check(self, execution: _Execution, name: str, context: Tuple) -> List[Tuple]:
+        """Nodes ready to run after an input of ``name`` arrived in ``context``"""
+        candidates = [context]
+        if len(execution.contexts) > 1:
+            # A value from an enclosing scope can complete nodes inside loop iterations
+            candidates.extend(c for c in execution.contexts if len(c) > len(context) and c[:len(context)] == context)
+
+        ready = []
+        for candidate in candidates:
+            if (name, candidate) in execution.fired:
+                continue
+            depth = 0
+            for port in self._required[name]:
+                resolved = self._resolve(execution, name, port, candidate)
+                if resolved is None:
+                    break
+                depth = max(depth, resolved[1])
+            else:
+                if name in self._gated:
+                    gates = [d for d in range(len(candidate), -1, -1) if (name, candidate[:d]) in execution.activated]
+                    if not gates:
+                        continue
+                    depth = max(depth, gates[0])
+                # Only fire in the innermost context that actually supplied an input
+                if depth == len(candidate):
+                    execution.fired.add((name, candidate))
+                    ready.append((name, candidate, None))
+        return ready
+
+    def _deliver(self, execution: _Execution, target: str, port: str, context: Tuple, value) -> List[Tuple]:
+        if self.graph.nodes[target].get('type') != 'Collector':
+            execution.values.setdefault((target, context), {})[port] = value
+            return self._check(execution, target, context)
+
+        if port == 'arraySize':
+            state = execution.collected.setdefault((target, context), {})
+            state['arraySize'] = value
+            return self._check_collector(execution, target, context)
+
+        if not context:
+            raise ValueError(f"Collector '{target}' received '{port}' outside an Iterator loop")
+        parent = context[:-1]
+        state = execution.collected.setdefault((target, parent), {})
+        state.setdefault(port, {})[context[-1]] = value
+        return self._check_collector(execution, target, parent)
+
+    def _check_collector(self, execution: _Execution, name: str, context: Tuple) -> List[Tuple]:
+        state = execution.collected[(name, context)]
+        size = state.get('arraySize')
+        item_ports = [port for port in self._required[name] if port != 'arraySize']
+        if size is None or (name, context) in execution.fired:
+            return []
+        if any(len(state.get(port, {})) < size for port in item_ports):
+            return []
+
+        execution.fired.add((name, context))
+        items = state.get(item_ports[0], {}) if item_ports else {}
+        outputs = {port['name']: [items[index] for index in range(size)]
+                   for port in self.graph.nodes[name].get('outputs', [])}
+        return self._emit(execution, name, context, outputs)
+
+    def _emit(self, execution: _Execution, source: str, context: Tuple, outputs: Dict[str, Any]) -> List[Tuple]:
+        ready = []
+        for output, target, port in self._routes.get(source, []):
+            if output in outputs:
+                ready.extend(self._deliver(execution, target, port, context, outputs[output]))
+        return ready
+
+    def _run_native(self, execution: _Execution, name: str, context: Tuple,
+                    inputs: Dict[str, Any]) -> List[Tuple]:
+        node_type = self.graph.nodes[name].get('type')
+
+        if node_type == 'Condition':
+            selected = self._conditions[name].select(inputs)
+            ready = []
+            for target in self._branches.get(name, {}).get(selected, []):
+                execution.activated.add((target, context))
+                ready.extend(self._check(execution, target, context))
+            return ready
+
+        if node_type == 'Iterator':
+            array = next(iter(inputs.values()), None)
+            if not isinstance(array, list):
+                raise ValueError(f"Iterator '{name}' expects an array, got {type(array).__name__}")
+            ready = []
+            for output, target, port in self._routes[name]:
+                if output == 'arrayItem':
+                    for index, item in enumerate(array):
+                        item_context = context + (index,)
+                        execution.contexts.add(item_context)
+                        ready.extend(self._deliver(execution, target, port, item_context, item))
+                else:
+                    ready.extend(self._deliver(execution, target, port, context, len(array)))
+            return ready
+
+        return self._emit(execution, name, context, inputs)
+
+    def _run(self, execution: _Execution, ready: deque) -> Iterator[dict]:
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        in_flight = {}
+        try:
+            while ready or in_flight:
+                while ready:
+                    name, context, inputs = ready.popleft()
+                    node = self.graph.nodes[name]
+                    inputs = inputs if inputs is not None else self._inputs_for(execution, name, context)
+
+                    if node.get('type') == 'Output':
+                        yield {'flowOutputEvent': {
+                            'nodeName': name,
+                            'nodeType': 'FlowOutputNode',
+                            'content': {'document': next(iter(inputs.values()), None)}
+                        }}
+                    elif name in self._handlers:
+                        future = self._executor_pool().submit(self._handlers[name], node, inputs)
+                        in_flight[future] = (name, context, inputs)
+                    else:
+                        ready.extend(self._run_native(execution, name, context, inputs))
+
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, context, inputs = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        raise RuntimeError(f"Node '{name}' failed: {e}") from e
+                    if isinstance(result, InputRequest):
+                        execution.waiting.append((name, context, result.document))
+                    else:
+                        ready.extend(self._emit(execution, name, context, result or {}))
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+        if execution.waiting:
+            # Like the service, ask for one input at a time
+            name, context, document = execution.waiting.pop(0)
+            execution.resume_at = (name, context)
+            self._suspended[execution.execution_id] = execution
+            yield {'flowMultiTurnInputRequestEvent': {
+                'nodeName': name,
+                'nodeType': f"{self.graph.nodes[name].get('type')}Node",
+                'content': {'document': document}
+            }}
+            yield {'flowCompletionEvent': {'completionReason': 'INPUT_REQUIRED'}}
+            return
+
+        yield {'flowCompletionEvent': {'completionReason': 'SUCCESS'}}
@@ -0,0 +1,193 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+
+class StatusPoller:
+    """Waits for a resource to leave a transitional status, adapting the polling cadence
+
+    The first poll waits for a fraction of the typical completion time seen so
+    far (an exponentially weighted average across waits). Later polls back off
+    geometrically, capped relative to that typical time, with jitter so many
+    concurrent waits do not poll in lockstep.
+    """
+
+    def __init__(self, min_interval: float = 0.25, max_interval: float = 10.0, factor: float = 1.6,
+                 timeout: float = 600.0, smoothing: float = 0.3):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.timeout = timeout
+        self.smoothing = smoothing
+        self.expected: Optional[float] = None
+        self.polls = 0
+        self._lock = threading.Lock()
+
+    def _first_delay(self) -> float:
+        if self.expected is None:
+            return self.min_interval
+        return min(self.max_interval, max(self.min_interval, self.expected * 0.6))
+
+    def _max_delay(self) -> float:
+        # Once typical durations are known, keep overshoot past completion small
+        if self.expected is None:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.expected * 0.25))
+
+    def _observe(self, elapsed: float):
+        with self._lock:
+            if self.expected is None:
+                self.expected = elapsed
+            else:
+                self.expected += self.smoothing * (elapsed - self.expected)
+
+    def wait(self, poll: Callable[[], dict], pending: Sequence[str], timeout: Optional[float] = None) -> dict:
+        """
+        Call ``poll`` until the ``status`` of its response is no longer pending
+
+        Returns the final response, whatever its status; raises TimeoutError if
+        the status is still pending after ``timeout`` seconds.
+        """
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout)
+        # Skip most of the time a wait usually takes, then poll densely and back off
+        sleep_for = self._first_delay()
+        delay = self.min_interval
+
+        while True:
+            time.sleep(min(sleep_for * random.uniform(0.8, 1.2), max(0.0, deadline - time.monotonic())))
+            response = poll()
+            with self._lock:
+                self.polls += 1
+            if response.get('status') not in pending:
+                self._observe(time.monotonic() - started)
+                return response
+
+            elapsed = time.monotonic() - started
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Still {response.get('status')} after {elapsed:.0f}s")
+            sleep_for = delay
+            delay = min(self._max_delay(), delay * self.factor)
+
+
+class Stage(NamedTuple):
+    """One pipeline step; ``run(job)`` returns fields to merge into the job, or None"""
+    name: str
+    run: Callable[[dict], Optional[dict]]
+    concurrency: Optional[int] = None
+
+
+class DeployPipeline:
+    """Moves jobs through a sequence of stages, each with its own worker pool
+
+    A job enters the next stage as soon as it leaves the previous one, so slow
+    stages such as waiting for preparation overlap with other jobs' API calls
+    and a batch takes roughly as long as its slowest job. A failing job stops
+    at that stage, is passed to ``cleanup`` and reported with the stage name.
+    A stage can end a job early by returning ``_complete`` with the job's
+    final status, e.g. when there is nothing to deploy. Job keys starting
+    with an underscore are working data and are left out of the results.
+    """
+
+    def __init__(self, stages: List[Stage], concurrency: int = 8,
+                 cleanup: Optional[Callable[[dict], None]] = None, success_status: str = 'DEPLOYED'):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.stages = stages
+        self.concurrency = concurrency
+        self.cleanup = cleanup
+        self.success_status = success_status
+
+    def run(self, jobs: List[dict], on_result: Optional[Callable[[dict], None]] = None) -> Dict:
+        from concurrent.futures import ThreadPoolExecutor
+
+        started = time.perf_counter()
+        results = []
+        remaining = [len(jobs)]
+        lock = threading.Lock()
+        finished = threading.Event()
+        if not jobs:
+            finished.set()
+
+        pools = [
+            ThreadPoolExecutor(max_workers=stage.concurrency or self.concurrency,
+                               thread_name_prefix=f"pipeline-{stage.name}")
+            for stage in self.stages
+        ]
+
+        def finish(job: dict, status: str):
+            job['status'] = status
+            job['elapsed'] = round(time.perf_counter() - job.pop('_started'), 3)
+            result = {key: value for key, value in job.items() if not key.startswith('_')}
+            with lock:
+                results.append(result)
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    finished.set()
+            if on_result:
+                on_result(result)
+
+        def run_stage(job: dict, index: int):
+            stage = self.stages[index]
+            stage_started = time.perf_counter()
+            try:
+                updates = stage.run(job)
+                if updates:
+                    job.update(updates)
+            except Exception as e:
+                job['timings'][stage.name] = round(time.perf_counter() - stage_started, 3)
+                job['failed_stage'] = stage.name
+                job['error'] = str(e)
+                if self.cleanup:
+                    try:
+                        self.cleanup(job)
+                    except Exception as cleanup_error:
+                        job['cleanup_error'] = str(cleanup_error)
+                finish(job, 'FAILED')
+                return
+
+            job['timings'][stage.name] = round(time.perf_counter() - stage_started, 3)
+            if '_complete' in job:
+                finish(job, job.pop('_complete'))
+            elif index + 1 < len(self.stages):
+                pools[index + 1].submit(run_stage, job, index + 1)
+            else:
+                finish(job, self.success_status)
+
+        try:
+            for job in jobs:
+                job.setdefault('timings', {})
+                job['_started'] = time.perf_counter()
+                pools[0].submit(run_stage, job, 0)
+            finished.wait()
+        finally:
+            for pool in pools:
+                pool.shutdown(wait=True)
+
+        results.sort(key=lambda result: result.get('index', 0))
+        statuses = [result['status'] for result in results]
+        return {
+            'total': len(results),
+            'deployed': statuses.count('DEPLOYED'),
+            'unchanged': statuses.count('UNCHANGED'),
+            'failed': statuses.count('FAILED'),
+            'statuses': {status: statuses.count(status) for status in sorted(set(statuses))},
+            'elapsed': round(time.perf_counter() - started, 3),
+            'stages': self.stage_stats(results),
+            'flows': results
+        }
+
+    def stage_stats(self, results: List[dict]) -> Dict[str, dict]:
+        """Per-stage completions, failures and timings across all jobs"""
+        stats = {}
+        for stage in self.stages:
+            timings = [result['timings'][stage.name] for result in results if stage.name in result['timings']]
+            failed = sum(1 for result in results if result.get('failed_stage') == stage.name)
+            stats[stage.name] = {
+                'completed': len(timings) - failed,
+                'failed': failed,
+                'mean': round(sum(timings) / len(timings), 3) if timings else None,
+                'max': max(timings) if timings else None
+            }
+        return stats
@@ -0,0 +1,203 @@
+import json
+import re
+import sys
+from typing import Any, Callable, Iterable, Optional, TextIO, Tuple
+
+RENDER_MODES = ('rich', 'raw', 'ndjson')
+
+# Largest document shown per item unless a different budget is given
+DEFAULT_MAX_BYTES = 64 * 1024
+
+# Items rendered between flushes of the output
+FLUSH_EVERY = 64
+
+MARKDOWN_MARKERS = ('#', '```', '**', '_', '>')
+_CODE_FENCE = re.compile(r'```(?:json)?')
+_JSON_STARTS = frozenset('{["-0123456789tfn')
+_END = object()
+
+_console = None
+
+
+def shared_console():
+    """The process-wide rich console, created on first use"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+def truncate(text: str, max_bytes: Optional[int]) -> Tuple[str, int]:
+    """Cut text to at most ``max_bytes`` of UTF-8; returns the text and the number of bytes dropped"""
+    # A character is at most four bytes, so short text needs no encoding to be measured
+    if not max_bytes or len(text) * 4 <= max_bytes:
+        return text, 0
+    encoded = text.encode('utf-8')
+    if len(encoded) <= max_bytes:
+        return text, 0
+    return encoded[:max_bytes].decode('utf-8', 'ignore'), len(encoded) - max_bytes
+
+
+def classify(item: Any, max_bytes: Optional[int] = None) -> Tuple[str, Any, int]:
+    """
+    Kind ('json', 'markdown' or 'text') and value of one response item, and the bytes truncated
+
+    Strings lose any markdown code fences and are parsed as JSON only when
+    they could start a JSON value and fit the byte budget, so large or plain
+    text documents are never run through the JSON parser.
+    """
+    if not isinstance(item, str):
+        return 'json', item, 0
+    if '```' in item:
+        item = _CODE_FENCE.sub('', item)
+    text, dropped = truncate(item.strip(), max_bytes)
+    if not dropped and text[:1] in _JSON_STARTS:
+        try:
+            return 'json', json.loads(text), 0
+        except ValueError:
+            pass
+    if any(marker in text for marker in MARKDOWN_MARKERS):
+        return 'markdown', text, dropped
+    return 'text', text, dropped
+
+
+def _dump(value: Any, indent: Optional[int] = None) -> str:
+    return json.dumps(value, indent=indent, ensure_ascii=False, default=str)
+
+
+def _ask_for_more(shown: int) -> bool:
+    if not sys.stdin.isatty():
+        return True
+    return input(f"-- {shown} items shown; Enter for more, q to stop -- ").strip().lower() != 'q'
+
+
+class ResponseRenderer:
+    """
+    Renders flow responses item by item
+
+    Items of a list, or of any iterable such as a generator of outputs, are
+    classified and formatted only as they are reached, so rendering can start
+    before the last item exists and stops costing anything once the reader
+    stops. In ``rich`` mode each item is a panel on the console; with
+    ``page_size`` the reader is asked (``more(shown)``) whether to continue
+    after every page. ``raw`` writes each item as plain text and ``ndjson``
+    as one JSON object per line; neither imports rich. Documents larger than
+    ``max_bytes`` of UTF-8 are truncated in every mode.
+    """
+
+    def __init__(self, mode: str = 'rich', max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                 page_size: Optional[int] = None, out: Optional[TextIO] = None, console=None,
+                 more: Callable[[int], bool] = _ask_for_more):
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode '{mode}', expected one of {', '.join(RENDER_MODES)}")
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.page_size = page_size
+        self.out = out
+        self._console = console
+        self.more = more
+
+    @property
+    def headless(self) -> bool:
+        return self.mode != 'rich'
+
+    @property
+    def console(self):
+        return self._console or shared_console()
+
+    def render(self, response: Any) -> int:
+        """Render a response, or each item of a list or other iterable; returns the items rendered"""
+        if response is None:
+            return 0
+        many = isinstance(response, (list, tuple)) or (
+            not isinstance(response, (str, bytes, dict)) and hasattr(response, '__iter__'))
+        if not many:
+            response = (response,)
+
+        if self.headless:
+            return self._write_lines(response, many)
+        return self._print_panels(response, many)
+
+    def _write_lines(self, items: Iterable, many: bool) -> int:
+        out = self.out or sys.stdout
+        format_item = self._ndjson_line if self.mode == 'ndjson' else self._raw_line
+        buffer = []
+        index = 0
+        for index, item in enumerate(items, 1):
+            buffer.append(format_item(index if many else None, item))
+            if len(buffer) >= FLUSH_EVERY:
+                out.write(''.join(buffer))
+                out.flush()
+                buffer.clear()
+        if buffer:
+            out.write(''.join(buffer))
+            out.flush()
+        return index
+
+    def _raw_line(self, index: Optional[int], item: Any) -> str:
+        if not isinstance(item, str):
+            item, _ = truncate(_dump(item), self.max_bytes)
+        else:
+            item, _ = truncate(item, self.max_bytes)
+        return item + '\n'
+
+    def _ndjson_line(self, index: Optional[int], item: Any) -> str:
+        kind, value, dropped = classify(item, self.max_bytes)
+        content = _dump(value)
+        if kind == 'json' and self.max_bytes and len(content) > self.max_bytes:
+            text, dropped = truncate(content, self.max_bytes)
+            if dropped:
+                kind, content = 'text', _dump(text)
+        return (f'{{"index": {"null" if index is None else index}, "type": "{kind}", '
+                f'"truncated": {dropped}, "content": {content}}}\n')
+
+    def _print_panels(self, items: Iterable, many: bool) -> int:
+        console = self.console
+        iterator = iter(items)
+        item = next(iterator, _END)
+        index = 0
+        while item is not _END:
+            # Rich buffers everything printed inside the console context and writes it in one go
+            with console:
+                while item is not _END:
+                    index += 1
+                    console.print(self._panel(index if many else None, item))
+                    item = next(iterator, _END)
+                    if index % FLUSH_EVERY == 0 or (self.page_size and index % self.page_size == 0):
+                        break
+            if item is not _END and self.page_size and index % self.page_size == 0 and not self.more(index):
+                console.print(f"[dim]Stopped after {index} items[/dim]")
+                break
+        return index
+
+    def _panel(self, index: Optional[int], item: Any):
+        from rich.markdown import Markdown
+        from rich.panel import Panel
+
+        kind, value, dropped = classify(item, self.max_bytes)
+        if kind == 'json':
+            text, dropped = truncate(_dump(value, indent=2), self.max_bytes)
+            if dropped:
+                kind, body = 'text', text
+            else:
+                from rich.highlighter import JSONHighlighter
+                # Highlight the serialized text directly; rich's JSON renderable would parse it again
+                body = JSONHighlighter()(text)
+                body.no_wrap = True
+        elif kind == 'markdown':
+            body = Markdown(value)
+        else:
+            body = value
+
+        if kind == 'json':
+            title = "JSON Response"
+        elif kind == 'text' and index is None and '\n' in body:
+            title = "Multi-line Response"
+        else:
+            title = f"{kind.capitalize()} Response"
+        if index is not None:
+            title += f" {index}"
+        if dropped:
+            title += f" (truncated, {dropped:,} more bytes)"
+        return Panel(body, title=title, border_style="cyan")
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import time
+from collections import deque
+from typing import Any, Iterator, List, NamedTuple, Optional, Union
+
+
+class FlowMessage:
+    """One conversation turn; the timestamp is only formatted when history is displayed"""
+    __slots__ = ('role', 'content', 'timestamp', 'node_name')
+
+    def __init__(self, role: str, content: Any, timestamp: float, node_name: Optional[str] = None):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+        self.node_name = node_name
+
+    def to_dict(self) -> dict:
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.timestamp))
+        }
+
+
+class FlowConversation:
+    """Handles multi-turn conversations with Bedrock Flow
+
+    History keeps the last ``max_history`` messages (all of them when None).
+    When a ``store`` is attached, every message is also appended to it once
+    the execution ID is known, so the conversation can be resumed later.
+    """
+    __slots__ = ('flow_id', 'alias_id', '_execution_id', 'messages', 'pending_node', 'store')
+
+    def __init__(self, flow_id: str, alias_id: str, execution_id: str = None,
+                 max_history: Optional[int] = None, store=None):
+        self.flow_id = flow_id
+        self.alias_id = alias_id
+        self._execution_id = execution_id
+        self.messages = deque(maxlen=max_history)
+        # Node waiting for the next reply after an INPUT_REQUIRED turn
+        self.pending_node: Optional[str] = None
+        self.store = store
+
+    @property
+    def execution_id(self) -> Optional[str]:
+        return self._execution_id
+
+    @execution_id.setter
+    def execution_id(self, execution_id: Optional[str]):
+        is_new = execution_id is not None and execution_id != self._execution_id
+        self._execution_id = execution_id
+        if is_new and self.store is not None:
+            self.store.track(self)
+
+    @property
+    def conversation_history(self) -> List[dict]:
+        return [message.to_dict() for message in self.messages]
+
+    def add_to_history(self, role: str, content: Any, node_name: Optional[str] = None):
+        """Add message to conversation history"""
+        message = FlowMessage(role, content, time.time(), node_name)
+        self.messages.append(message)
+        if self.store is not None and self._execution_id is not None:
+            self.store.append(self, message)
+
+    def get_formatted_history(self) -> str:
+        """Get formatted conversation history"""
+        lines = [f"[{msg['timestamp']}] {msg['role']}: {msg['content']}\n" for msg in self.conversation_history]
+        return "\nConversation History:\n" + "-" * 30 + "\n" + "".join(lines)
+
+
+def prepare_input_payload(input_data: str | list | dict, is_iterator: bool) -> dict:
+    """Build the invoke_flow input for an initial turn or a multi-turn reply"""
+
+    # Handle dictionary input for multi-turn
+    if isinstance(input_data, dict):
+        node_name = input_data['node_name']
+        is_initial = input_data['is_initial']
+        content = input_data['text']
+    else:
+        node_name = "FlowInputNode"
+        is_initial = True
+        content = input_data
+
+    # Prepare content based on iterator status
+    if is_iterator:
+        if isinstance(content, str):
+            content = [content]
+        elif not isinstance(content, list):
+            raise ValueError(f"Unsupported input type: {type(content)}")
+
+    payload = {
+        "content": {"document": content},
+        "nodeName": node_name
+    }
+
+    # Add appropriate node name based on turn
+    if is_initial:
+        payload["nodeOutputName"] = "document"
+    else:
+        payload["nodeInputName"] = "agentInputText"
+
+    return payload
+
+
+def payload_hash(input_payload: dict) -> str:
+    """Hash of an invoke_flow input, independent of key order
+
+    String values are hashed exactly as given, whitespace included, so only
+    inputs the flow would see as identical share a hash.
+    """
+    canonical = json.dumps(input_payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class FlowOutputEvent(NamedTuple):
+    """A document emitted by an Output node"""
+    node_name: str
+    document: Any
+    elapsed: float
+
+
+class FlowInputRequestEvent(NamedTuple):
+    """A multi-turn request for more input from the given node"""
+    node_name: str
+    document: Any
+    elapsed: float
+
+
+class FlowCompletionEvent(NamedTuple):
+    """Final event of a flow execution"""
+    reason: str
+    elapsed: float
+
+
+class FlowTraceEvent(NamedTuple):
+    """Trace event, only emitted when tracing is enabled on invoke_flow"""
+    trace: dict
+    elapsed: float
+
+
+FlowEvent = Union[FlowOutputEvent, FlowInputRequestEvent, FlowCompletionEvent, FlowTraceEvent]
+
+
+def parse_stream_event(event: dict, started: float) -> Optional[FlowEvent]:
+    """Convert a raw responseStream event into a typed event, or None if unrecognised"""
+    elapsed = time.perf_counter() - started
+
+    if 'flowOutputEvent' in event:
+        body = event['flowOutputEvent']
+        return FlowOutputEvent(body.get('nodeName'), body['content']['document'], elapsed)
+
+    if 'flowMultiTurnInputRequestEvent' in event:
+        body = event['flowMultiTurnInputRequestEvent']
+        return FlowInputRequestEvent(body['nodeName'], body['content']['document'], elapsed)
+
+    if 'flowCompletionEvent' in event:
+        return FlowCompletionEvent(event['flowCompletionEvent']['completionReason'], elapsed)
+
+    if 'flowTraceEvent' in event:
+        return FlowTraceEvent(event['flowTraceEvent'].get('trace', {}), elapsed)
+
+    return None
+
+
+def record_event(conversation: FlowConversation, event: FlowEvent):
+    """Add assistant turns from the event to the conversation history"""
+    if isinstance(event, FlowInputRequestEvent):
+        conversation.pending_node = event.node_name
+        conversation.add_to_history('assistant', event.document, event.node_name)
+    elif isinstance(event, FlowOutputEvent):
+        # Output means the flow moved past any earlier request for input
+        conversation.pending_node = None
+        conversation.add_to_history('assistant', event.document, event.node_name)
+
+
+def iter_flow_events(response: dict, conversation: FlowConversation,
+                     started: Optional[float] = None) -> Iterator[FlowEvent]:
+    """Yield typed events from an invoke_flow response as they arrive
+
+    ``started`` is a time.perf_counter() timestamp taken before invoke_flow was
+    called; event ``elapsed`` values are measured from it.
+    """
+    started = time.perf_counter() if started is None else started
+
+    # Update execution ID
+    conversation.execution_id = response.get('executionId', conversation.execution_id)
+
+    for raw_event in response.get("responseStream", []):
+        event = parse_stream_event(raw_event, started)
+        if event is None:
+            continue
+        record_event(conversation, event)
+        yield event
+
+
+def new_stream_result() -> dict:
+    """Empty result dict filled in by apply_stream_event"""
+    return {
+        'status': None,
+        'output': None,
+        'outputs': [],
+        'prompt': None,
+        'node_name': None,
+        'time_to_first_output': None,
+        'elapsed': None
+    }
+
+
+def apply_stream_event(result: dict, event: FlowEvent):
+    """Fold one typed event into the result dict
+
+    ``output`` holds the last document for backwards compatibility, while
+    ``outputs`` keeps every Output node's document in arrival order.
+    """
+    if isinstance(event, FlowCompletionEvent):
+        result['status'] = event.reason
+        result['elapsed'] = event.elapsed
+
+    elif isinstance(event, FlowInputRequestEvent):
+        result['prompt'] = event.document
+        result['node_name'] = event.node_name
+
+    elif isinstance(event, FlowOutputEvent):
+        result['output'] = event.document
+        result['outputs'].append({'node_name': event.node_name, 'document': event.document})
+        if result['time_to_first_output'] is None:
+            result['time_to_first_output'] = event.elapsed
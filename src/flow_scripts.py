@@ -0,0 +1,180 @@
+import fnmatch
+import json
+import re
+import threading
+import time
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+from flow_bench import summarize_latencies
+from flow_runtime import FlowConversation
+
+
+class ScriptExhausted(RuntimeError):
+    """Raised when a flow asks for more input than a script can answer"""
+
+
+class ReplyRule(NamedTuple):
+    """Reply sent when the requesting node matches ``node`` (a glob) and the prompt matches ``prompt`` (a regex)"""
+    reply: Any
+    node: Optional[str] = None
+    prompt: Optional[str] = None
+
+    def matches(self, prompt: Any, node_name: Optional[str]) -> bool:
+        if self.node is not None and not fnmatch.fnmatchcase(node_name or '', self.node):
+            return False
+        if self.prompt is not None:
+            text = prompt if isinstance(prompt, str) else json.dumps(prompt, default=str)
+            if not re.search(self.prompt, text, re.IGNORECASE):
+                return False
+        return True
+
+
+class ConversationScript(NamedTuple):
+    """
+    A scripted multi-turn conversation
+
+    ``input`` starts the conversation. Whenever the flow returns INPUT_REQUIRED
+    the first matching rule supplies the reply; otherwise the next of the
+    ordered ``replies`` is sent.
+    """
+    name: str
+    input: Any
+    replies: Sequence[Any] = ()
+    rules: Sequence[ReplyRule] = ()
+    max_turns: int = 20
+
+    def responder(self) -> Callable[[Any, Optional[str]], Any]:
+        """A fresh ``reply(prompt, node_name)`` callable for one run of the script"""
+        remaining = iter(self.replies)
+
+        def reply(prompt, node_name):
+            for rule in self.rules:
+                if rule.matches(prompt, node_name):
+                    return rule.reply
+            try:
+                return next(remaining)
+            except StopIteration:
+                raise ScriptExhausted(f"Script '{self.name}' has no reply for {node_name}: {prompt}") from None
+        return reply
+
+
+def load_scripts(script_path: str) -> List[ConversationScript]:
+    """
+    Read conversation scripts from a JSON list or a JSONL file
+
+    Each script is an object with ``input`` and optionally ``name``,
+    ``replies`` (a list), ``rules`` (objects with ``reply`` and ``node`` and/or
+    ``prompt``) and ``max_turns``.
+    """
+    with open(script_path, 'r') as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith('['):
+        records = json.loads(stripped)
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    scripts = []
+    for index, record in enumerate(records):
+        if 'input' not in record:
+            raise ValueError(f"Script {index} in {script_path} has no 'input'")
+        scripts.append(ConversationScript(
+            name=record.get('name', f"script-{index}"),
+            input=record['input'],
+            replies=list(record.get('replies', [])),
+            rules=[ReplyRule(rule['reply'], rule.get('node'), rule.get('prompt')) for rule in record.get('rules', [])],
+            max_turns=record.get('max_turns', 20)
+        ))
+    return scripts
+
+
+class ConversationDriver:
+    """
+    Replays scripted conversations against a flow, many at a time
+
+    ``invoke(input_data, conversation)`` runs one turn and returns the result
+    dict of ``invoke_flow_once``; the conversation carries the execution ID
+    from one turn to the next. ``new_conversation()`` creates the conversation
+    for each run.
+    """
+
+    def __init__(self, invoke: Callable[[Any, FlowConversation], dict],
+                 new_conversation: Callable[[], FlowConversation], concurrency: int = 8):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.invoke = invoke
+        self.new_conversation = new_conversation
+        self.concurrency = concurrency
+
+    def converse(self, script: ConversationScript) -> dict:
+        """Run one script to completion, recording each turn's status and latency"""
+        conversation = self.new_conversation()
+        reply = script.responder()
+        input_data = script.input
+        turns = []
+        record = {'name': script.name, 'status': None, 'turns': turns, 'output': None}
+
+        started = time.perf_counter()
+        try:
+            for turn in range(1, script.max_turns + 1):
+                turn_started = time.perf_counter()
+                result = self.invoke(input_data, conversation)
+                turns.append({
+                    'turn': turn,
+                    'status': result['status'],
+                    'node_name': result.get('node_name'),
+                    'latency': round(time.perf_counter() - turn_started, 4),
+                    'time_to_first_output': result.get('time_to_first_output')
+                })
+                if result['status'] != 'INPUT_REQUIRED':
+                    record.update(status=result['status'], output=result.get('output'))
+                    break
+
+                user_text = reply(result.get('prompt'), result.get('node_name'))
+                conversation.add_to_history('user', user_text)
+                input_data = {'text': user_text, 'node_name': result.get('node_name'), 'is_initial': False}
+            else:
+                record.update(status='ERROR', error=f"Still waiting for input after {script.max_turns} turns")
+        except Exception as e:
+            record.update(status='ERROR', error=str(e))
+
+        record['execution_id'] = conversation.execution_id
+        record['latency'] = round(time.perf_counter() - started, 4)
+        return record
+
+    def run(self, scripts: List[ConversationScript], repeat: int = 1,
+            on_result: Optional[Callable[[dict], None]] = None) -> dict:
+        """Run every script ``repeat`` times on a bounded thread pool and summarise latencies"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        lock = threading.Lock()
+        records = []
+
+        def run_one(index: int, script: ConversationScript):
+            record = {'index': index, **self.converse(script)}
+            with lock:
+                records.append(record)
+            if on_result:
+                on_result(record)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='converse') as pool:
+            runs = [script for _ in range(repeat) for script in scripts]
+            for future in [pool.submit(run_one, index, script) for index, script in enumerate(runs)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        records.sort(key=lambda record: record['index'])
+        # Conversations that ended in FAILURE, or without any completion, failed too
+        failed = sum(1 for record in records if record['status'] != 'SUCCESS')
+        return {
+            'conversations': len(records),
+            'succeeded': len(records) - failed,
+            'failed': failed,
+            'turns': sum(len(record['turns']) for record in records),
+            'elapsed': round(elapsed, 3),
+            'conversations_per_second': round(len(records) / elapsed, 2) if elapsed else 0.0,
+            'turn_latency': summarize_latencies([turn['latency'] for record in records for turn in record['turns']]),
+            'conversation_latency': summarize_latencies([record['latency'] for record in records]),
+            'results': records
+        }
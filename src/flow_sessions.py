@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from flow_runtime import FlowConversation, FlowMessage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    execution_id TEXT PRIMARY KEY,
+    flow_id TEXT NOT NULL,
+    alias_id TEXT NOT NULL,
+    pending_node TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    execution_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    node_name TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_execution ON messages (execution_id);
+"""
+
+
+class ConversationStore:
+    """
+    Bounded set of resumable multi-turn conversations, keyed by execution ID
+
+    The most recently used ``max_sessions`` conversations stay in memory, each
+    keeping only its last ``max_history`` messages. With a ``path``, every
+    message is also appended to a SQLite log indexed by execution ID, so
+    evicted conversations (or those from an earlier process) can be resumed.
+    Writes are buffered and flushed in batches of ``flush_every`` rows, so
+    recording a message costs the same however many conversations are held.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_sessions: int = 100_000, max_history: int = 50,
+                 flush_every: int = 256):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.path = path
+        self.max_sessions = max_sessions
+        self.max_history = max_history
+        self.flush_every = flush_every
+        self.evicted = 0
+        self.written = 0
+
+        self._sessions: "OrderedDict[str, FlowConversation]" = OrderedDict()
+        self._pending_messages: List[tuple] = []
+        self._pending_sessions: Dict[str, tuple] = {}
+        self._lock = threading.RLock()
+        self._db = None
+        if path:
+            import sqlite3
+
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            # Appends only need to survive a process crash, not a power loss
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, flow_id: str, alias_id: str) -> FlowConversation:
+        """A new conversation that registers itself here once the flow assigns an execution ID"""
+        return FlowConversation(flow_id, alias_id, max_history=self.max_history, store=self)
+
+    def track(self, conversation: FlowConversation):
+        """Hold a conversation under its execution ID, logging the messages recorded before it had one"""
+        with self._lock:
+            self._sessions[conversation.execution_id] = conversation
+            self._sessions.move_to_end(conversation.execution_id)
+            for message in conversation.messages:
+                self._queue(conversation, message)
+            self._evict()
+
+    def append(self, conversation: FlowConversation, message: FlowMessage):
+        """Log one message of a tracked conversation"""
+        with self._lock:
+            if conversation.execution_id in self._sessions:
+                self._sessions.move_to_end(conversation.execution_id)
+            self._queue(conversation, message)
+
+    def get(self, execution_id: str) -> Optional[FlowConversation]:
+        """The conversation for an execution ID, reloaded from the log if it was evicted"""
+        with self._lock:
+            conversation = self._sessions.get(execution_id)
+            if conversation is not None:
+                self._sessions.move_to_end(execution_id)
+                return conversation
+            if self._db is None:
+                return None
+
+            self.flush()
+            row = self._db.execute(
+                "SELECT flow_id, alias_id, pending_node FROM sessions WHERE execution_id = ?",
+                (execution_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            conversation = FlowConversation(row[0], row[1], execution_id, max_history=self.max_history, store=self)
+            conversation.pending_node = row[2]
+            limit = -1 if self.max_history is None else self.max_history
+            messages = self._db.execute(
+                "SELECT role, content, timestamp, node_name FROM messages WHERE execution_id = ? "
+                "ORDER BY rowid DESC LIMIT ?",
+                (execution_id, limit)
+            ).fetchall()
+            for role, content, timestamp, node_name in reversed(messages):
+                conversation.messages.append(FlowMessage(role, json.loads(content), timestamp, node_name))
+
+            self._sessions[execution_id] = conversation
+            self._evict()
+            return conversation
+
+    def sessions(self, limit: int = 50) -> List[dict]:
+        """Most recently updated conversations in the log, or in memory without one"""
+        with self._lock:
+            if self._db is None:
+                recent = list(self._sessions.values())[-limit:][::-1]
+                return [{'execution_id': c.execution_id, 'flow_id': c.flow_id, 'alias_id': c.alias_id,
+                         'pending_node': c.pending_node, 'messages': len(c.messages)} for c in recent]
+
+            self.flush()
+            rows = self._db.execute(
+                "SELECT s.execution_id, s.flow_id, s.alias_id, s.pending_node, s.updated_at, "
+                "(SELECT COUNT(*) FROM messages m WHERE m.execution_id = s.execution_id) "
+                "FROM sessions s ORDER BY s.updated_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+            return [{'execution_id': row[0], 'flow_id': row[1], 'alias_id': row[2], 'pending_node': row[3],
+                     'updated_at': row[4], 'messages': row[5]} for row in rows]
+
+    def flush(self):
+        """Write buffered messages and session updates to the log in one transaction"""
+        with self._lock:
+            if self._db is None or not (self._pending_messages or self._pending_sessions):
+                return
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO messages (execution_id, role, content, timestamp, node_name) VALUES (?, ?, ?, ?, ?)",
+                    self._pending_messages
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO sessions (execution_id, flow_id, alias_id, pending_node, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    self._pending_sessions.values()
+                )
+            self.written += len(self._pending_messages)
+            self._pending_messages.clear()
+            self._pending_sessions.clear()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self.flush()
+                self._db.close()
+                self._db = None
+
+    def _queue(self, conversation: FlowConversation, message: FlowMessage):
+        if self._db is None:
+            return
+        execution_id = conversation.execution_id
+        self._pending_messages.append((
+            execution_id, message.role, json.dumps(message.content, default=str), message.timestamp, message.node_name
+        ))
+        self._pending_sessions[execution_id] = (
+            execution_id, conversation.flow_id, conversation.alias_id, conversation.pending_node, time.time()
+        )
+        if len(self._pending_messages) >= self.flush_every:
+            self.flush()
+
+    def _evict(self):
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
@@ -0,0 +1,219 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional
+
+
+class _Call:
+    """One in-flight call shared by every caller with the same key"""
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 1
+
+
+class _SharedStream:
+    """Events of one in-flight stream, pumped by a background thread and replayed to every subscriber
+
+    The pump starts when a subscriber first asks for an event, so the source
+    is not read before anyone iterates, just as with an unshared stream.
+    """
+
+    def __init__(self, source: Iterator, on_finish: Callable[[], None]):
+        self.source = source
+        self.on_finish = on_finish
+        self.events: List[Any] = []
+        self.error: Optional[BaseException] = None
+        self.started = False
+        self.finished = False
+        self.closing = False
+        self.subscribers = 0
+        self.cond = threading.Condition()
+
+    def start(self):
+        with self.cond:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self.pump, name='single-flight-stream', daemon=True).start()
+
+    def pump(self):
+        try:
+            for event in self.source:
+                with self.cond:
+                    self.events.append(event)
+                    self.cond.notify_all()
+                    if self.subscribers == 0:
+                        self.closing = True
+                        break
+        except BaseException as e:
+            with self.cond:
+                self.error = e
+        finally:
+            # Only reached early when every subscriber has gone; closes the underlying response
+            close = getattr(self.source, 'close', None)
+            if close:
+                close()
+            self.on_finish()
+            with self.cond:
+                self.finished = True
+                self.cond.notify_all()
+
+    def subscribe(self) -> Iterator:
+        index = 0
+        try:
+            self.start()
+            while True:
+                with self.cond:
+                    while index >= len(self.events) and not self.finished:
+                        self.cond.wait()
+                    if index < len(self.events):
+                        event = self.events[index]
+                    elif self.error is not None:
+                        raise self.error
+                    else:
+                        return
+                index += 1
+                yield event
+        finally:
+            with self.cond:
+                self.subscribers -= 1
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one
+
+    The first caller for a key runs the call; callers arriving with the same
+    key while it is in flight wait for it and receive the same result or the
+    same exception. A waiter that gives up (``timeout``) leaves without
+    affecting the others. Streams are shared the same way: every subscriber
+    sees all events from the start, and the underlying stream is closed early
+    only when every subscriber has stopped reading. A shared stream is opened
+    by its first caller but only read once some subscriber first advances.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _SharedStream] = {}
+        self._lock = threading.Lock()
+        self.counters = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0, 'abandoned': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> tuple:
+        """Run ``fn`` once per key among concurrent callers; returns (result, shared)"""
+        with self._lock:
+            self.counters['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.counters['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.counters['executions'] += 1
+                leader = True
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    self.counters['errors'] += 1
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(timeout):
+            with self._lock:
+                call.waiters -= 1
+                self.counters['abandoned'] += 1
+            raise TimeoutError(f"Gave up waiting for the shared call after {timeout}s")
+
+        if call.error is not None:
+            raise call.error
+        return call.result, not leader
+
+    def stream(self, key: Hashable, open_stream: Callable[[], Iterator]) -> Iterator:
+        """Iterate a stream shared with concurrent callers of the same key"""
+        with self._lock:
+            self.counters['calls'] += 1
+            shared = self._streams.get(key)
+            if shared is not None:
+                with shared.cond:
+                    joinable = not (shared.finished or shared.closing)
+                    if joinable:
+                        shared.subscribers += 1
+                if joinable:
+                    self.counters['coalesced'] += 1
+                    return shared.subscribe()
+
+            def finish():
+                with self._lock:
+                    if self._streams.get(key) is shared:
+                        del self._streams[key]
+                    if shared.error is not None:
+                        self.counters['errors'] += 1
+
+            shared = self._streams[key] = _SharedStream(open_stream(), finish)
+            shared.subscribers = 1
+            self.counters['executions'] += 1
+
+        return shared.subscribe()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            counters['in_flight'] = len(self._calls) + len(self._streams)
+        return counters
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines
+
+    The shared call runs as its own task, so cancelling one waiter does not
+    cancel the call for the others; the call itself is cancelled only when
+    every waiter has been cancelled.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.counters = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0, 'cancelled': 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]) -> tuple:
+        """Await ``fn()`` once per key among concurrent callers; returns (result, shared)"""
+        self.counters['calls'] += 1
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self.counters['coalesced'] += 1
+            self._waiters[key] += 1
+        else:
+            self.counters['executions'] += 1
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            self._waiters[key] = 1
+            task.add_done_callback(lambda _: self._finish(key, task))
+
+        try:
+            return await asyncio.shield(task), shared
+        except asyncio.CancelledError:
+            self.counters['cancelled'] += 1
+            if self._tasks.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0:
+                    task.cancel()
+            raise
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            del self._waiters[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.counters['errors'] += 1
+
+    def metrics(self) -> dict:
+        return {**self.counters, 'in_flight': len(self._tasks)}
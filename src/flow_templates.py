@@ -0,0 +1,269 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A single pattern for $$VARIABLE, $$Variable_1, $$variableName, ... The match is
+# greedy, so $$MODEL_ID is never mistaken for $$MODEL followed by "_ID".
+VARIABLE_PATTERN = re.compile(r'\$\$[A-Za-z][A-Za-z0-9_]*')
+
+REQUIRED_FIELDS = ['definition', 'description', 'name']
+
+# Bump when the on-disk compiled format changes
+CACHE_FORMAT_VERSION = 2
+
+# Flow tags recording what was last deployed, so unchanged flows are skipped
+# with a single list_tags_for_resource call
+CONTENT_HASH_TAG = 'bedrock-flows:content-hash'
+DEPLOYED_VERSION_TAG = 'bedrock-flows:version'
+DEPLOYED_ALIAS_TAG = 'bedrock-flows:alias-id'
+DEPLOYMENT_TAGS = (CONTENT_HASH_TAG, DEPLOYED_VERSION_TAG, DEPLOYED_ALIAS_TAG)
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'BEDROCK_FLOWS_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'bedrock_flows')
+)
+
+
+# Trie entry holding the key slots of a dict; never equal to a document key or index
+_KEY_SLOTS = object()
+
+
+def _segments(text: str) -> Optional[List[str]]:
+    """Split text into alternating literal / variable segments (odd indexes are variables), or None"""
+    if '$$' not in text:
+        return None
+    segments = []
+    last = 0
+    for match in VARIABLE_PATTERN.finditer(text):
+        segments.append(text[last:match.start()])
+        segments.append(match.group(0))
+        last = match.end()
+    if not segments:
+        return None
+    segments.append(text[last:])
+    return segments
+
+
+def _substitute(segments: List[str], bindings: Dict[str, str]) -> str:
+    return ''.join(segment if i % 2 == 0 else bindings[segment] for i, segment in enumerate(segments))
+
+
+def _find_slots(node, path: Tuple, slots: List, key_slots: List):
+    """Collect (path, segments) for every string value, and (path, key, segments) for every key, with a variable"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            segments = _segments(key)
+            if segments:
+                key_slots.append((path, key, segments))
+            _find_slots(value, path + (key,), slots, key_slots)
+    elif isinstance(node, list):
+        for index, value in enumerate(node):
+            _find_slots(value, path + (index,), slots, key_slots)
+    elif isinstance(node, str):
+        segments = _segments(node)
+        if segments:
+            slots.append((path, segments))
+
+
+def _build_trie(slots: List, key_slots: List) -> dict:
+    """Index slot paths as a nested dict so rendering copies each container once"""
+    trie = {}
+    for path, segments in slots:
+        node = trie
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = segments
+    for path, key, segments in key_slots:
+        node = trie
+        for step in path:
+            node = node.setdefault(step, {})
+        node.setdefault(_KEY_SLOTS, {})[key] = segments
+    return trie
+
+
+def _render(node, trie: dict, bindings: Dict[str, str]):
+    rendered = dict(node) if isinstance(node, dict) else list(node)
+    for key, child in trie.items():
+        if key is _KEY_SLOTS:
+            continue
+        if isinstance(child, list):
+            # Leaf slot: join literal segments with the bound values
+            rendered[key] = _substitute(child, bindings)
+        else:
+            rendered[key] = _render(node[key], child, bindings)
+    key_slots = trie.get(_KEY_SLOTS)
+    if key_slots:
+        # Rebuilt rather than renamed in place, so rendered keys keep their position
+        rendered = {(_substitute(key_slots[key], bindings) if key in key_slots else key): value
+                    for key, value in rendered.items()}
+    return rendered
+
+
+def content_hash(definition: dict, metadata: dict) -> str:
+    """Canonical sha256 of a rendered flow, independent of key order and whitespace
+
+    Covers the definition, description, role and user tags, but not the flow
+    name (the flow's identity) or the deployment tags themselves.
+    """
+    tags = {key: value for key, value in (metadata.get('tags') or {}).items() if key not in DEPLOYMENT_TAGS}
+    document = {
+        'definition': definition,
+        'description': metadata.get('description', ''),
+        'executionRoleArn': metadata.get('executionRoleArn'),
+        'tags': tags
+    }
+    canonical = json.dumps(document, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class CompiledTemplate:
+    """A template parsed once, with variable slots addressed by JSON path
+
+    Variables are substituted in string values and in object keys alike.
+    Rendering copies only the containers on the way to a slot and shares every
+    other subtree with the compiled template, so it is a single pass with no
+    JSON serialization or re-parsing. Rendered documents must be treated as
+    read-only; deep-copy them before mutating.
+    """
+
+    def __init__(self, template: dict, content_hash: str, slots: Optional[List] = None,
+                 key_slots: Optional[List] = None):
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in template]
+        if missing_fields:
+            raise ValueError(f"Template missing required fields: {', '.join(missing_fields)}")
+
+        self.content_hash = content_hash
+        self.document = {
+            'definition': template['definition'],
+            'metadata': {
+                'description': template.get('description', ''),
+                'name': template.get('name', ''),
+                'tags': template.get('tags', {}),
+                'executionRoleArn': template.get('executionRoleArn', None)
+            }
+        }
+
+        if slots is None or key_slots is None:
+            slots, key_slots = [], []
+            _find_slots(self.document, (), slots, key_slots)
+        self.slots = [(tuple(path), segments) for path, segments in slots]
+        self.key_slots = [(tuple(path), key, segments) for path, key, segments in key_slots]
+        self._trie = _build_trie(self.slots, self.key_slots)
+        self.variables = sorted(
+            {segment for *_, segments in self.slots + self.key_slots for segment in segments[1::2]},
+            key=lambda x: (x.lower(), x)
+        )
+
+    @property
+    def definition(self) -> dict:
+        return self.document['definition']
+
+    @property
+    def metadata(self) -> dict:
+        return self.document['metadata']
+
+    def render(self, bindings: Dict[str, str]) -> Tuple[dict, dict]:
+        """Substitute variables and return (definition, metadata)"""
+        missing = [var for var in self.variables if var not in bindings]
+        if missing:
+            raise ValueError(f"Missing values for template variables: {', '.join(missing)}")
+        if not self._trie:
+            return self.definition, self.metadata
+
+        rendered = _render(self.document, self._trie, bindings)
+        return rendered['definition'], rendered['metadata']
+
+    def to_cache(self) -> dict:
+        return {
+            'version': CACHE_FORMAT_VERSION,
+            'hash': self.content_hash,
+            'template': {'definition': self.definition, **self.metadata},
+            'slots': [[list(path), segments] for path, segments in self.slots],
+            'key_slots': [[list(path), key, segments] for path, key, segments in self.key_slots]
+        }
+
+    @classmethod
+    def from_cache(cls, data: dict) -> 'CompiledTemplate':
+        return cls(data['template'], data['hash'], data['slots'], data['key_slots'])
+
+
+class TemplateCompiler:
+    """Compiles template files, caching in memory by (path, mtime, size) and on disk by content hash"""
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._memory: Dict[Tuple[str, int, int], CompiledTemplate] = {}
+        self._lock = threading.Lock()
+
+    def load(self, template_path: Path) -> CompiledTemplate:
+        template_path = Path(template_path)
+        stat = template_path.stat()
+        memory_key = (str(template_path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+        compiled = self._memory.get(memory_key)
+        if compiled is not None:
+            return compiled
+
+        raw = template_path.read_bytes()
+        content_hash = hashlib.sha256(raw).hexdigest()
+        compiled = self._load_cached(content_hash)
+        if compiled is None:
+            compiled = CompiledTemplate(json.loads(raw), content_hash)
+            self._store_cached(compiled)
+
+        with self._lock:
+            self._memory[memory_key] = compiled
+        return compiled
+
+    def _cache_path(self, content_hash: str) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        return self.cache_dir / f"{content_hash}.json"
+
+    def _load_cached(self, content_hash: str) -> Optional[CompiledTemplate]:
+        path = self._cache_path(content_hash)
+        if not path or not path.exists():
+            return None
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') != CACHE_FORMAT_VERSION or data.get('hash') != content_hash:
+                return None
+            return CompiledTemplate.from_cache(data)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable template cache %s: %s", path, e)
+            return None
+
+    def _store_cached(self, compiled: CompiledTemplate):
+        path = self._cache_path(compiled.content_hash)
+        if not path:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(compiled.to_cache(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write template cache %s: %s", path, e)
+
+
+default_compiler = TemplateCompiler()
+
+
+def compile_template(template_path: Path) -> CompiledTemplate:
+    """
+    Load a compiled template through the process-wide compiler
+
+    The compiled template is cached and shared by every caller in the process,
+    and so are its ``definition`` and ``metadata`` and any unrendered parts of
+    what ``render`` returns. Treat them as read-only; deep-copy before mutating.
+    """
+    return default_compiler.load(template_path)
@@ -0,0 +1,303 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Errors meaning the request was rejected before doing any work, so they are safe to retry for any call
+THROTTLE_CODES = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'Throttling',
+    'RequestLimitExceeded',
+}
+
+# Exception events of a response stream that mean the service is shedding load
+STREAM_THROTTLE_EVENTS = {'throttlingException', 'serviceQuotaExceededException'}
+
+# Errors where the request may or may not have been applied; only retried for idempotent calls
+TRANSIENT_CODES = {
+    'InternalServerException',
+    'ServiceUnavailableException',
+    'ServiceUnavailable',
+    'RequestTimeout',
+    'RequestTimeoutException',
+}
+
+# (initial rate, max rate, initial concurrency, max concurrency) per API, in requests/second
+DEFAULT_API_LIMITS = {
+    'invoke_flow': (10.0, 200.0, 16, 256),
+    'default': (2.0, 20.0, 4, 32),
+}
+
+
+def error_code(error: Exception) -> Optional[str]:
+    """AWS error code of a botocore ClientError, or None for other exceptions"""
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+def classify_error(error: Exception) -> Optional[str]:
+    """Return 'throttle', 'transient' or None for a non-retryable error"""
+    code = error_code(error)
+    if code:
+        # Exception events raised from an event stream use camelCase codes, e.g. throttlingException
+        code = code[:1].upper() + code[1:]
+    if code in THROTTLE_CODES:
+        return 'throttle'
+    if code in TRANSIENT_CODES:
+        return 'transient'
+
+    try:
+        from botocore.exceptions import ConnectionError as BotoConnectionError
+        from botocore.exceptions import ReadTimeoutError
+    except ImportError:
+        return None
+    if isinstance(error, (BotoConnectionError, ReadTimeoutError)):
+        return 'transient'
+    return None
+
+
+class RetryPolicy:
+    """Decorrelated jitter backoff: sleep = min(cap, uniform(base, previous * 3))"""
+
+    def __init__(self, max_attempts: int = 8, base: float = 0.2, cap: float = 20.0):
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+
+    def next_delay(self, previous: float) -> float:
+        return min(self.cap, random.uniform(self.base, max(self.base, previous) * 3))
+
+
+class AdaptiveLimiter:
+    """Token bucket plus concurrency cap for a single API, tuned with AIMD
+
+    Limits start in slow-start, roughly doubling every second of successful
+    calls, until the first throttle. After that each second of successes raises
+    them additively by a small fraction of their maxima, and every throttle
+    halves them. Decreases are applied at most once per cooldown so a burst of
+    throttles from the same window only backs off once.
+    """
+
+    def __init__(self, name: str, rate: float, max_rate: float, concurrency: int, max_concurrency: int,
+                 min_rate: float = 0.2, decrease_factor: float = 0.5, increase_fraction: float = 0.05,
+                 cooldown: float = 1.0):
+        self.name = name
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.concurrency_limit = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.rate_step = max(1.0, max_rate * increase_fraction)
+        self.concurrency_step = max(1.0, max_concurrency * increase_fraction)
+        self.cooldown = cooldown
+        self.slow_start = True
+
+        self._tokens = min(rate, 1.0)
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+        self.counters = {'calls': 0, 'successes': 0, 'throttles': 0, 'retries': 0, 'failures': 0}
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        # Burst is capped at one second's worth of tokens
+        self._tokens = min(max(self.rate, 1.0), self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Block until a token and a concurrency slot are both available"""
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._in_flight < int(self.concurrency_limit) and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._in_flight += 1
+                    self.counters['calls'] += 1
+                    self.wait_seconds += now - started
+                    return
+                if self._tokens < 1.0:
+                    timeout = (1.0 - self._tokens) / self.rate
+                else:
+                    timeout = None  # wait for a slot to be released
+                self._cond.wait(timeout)
+
+    def release(self, outcome: str):
+        """Return the concurrency slot and adapt limits to the outcome: success, throttle, error or closed"""
+        with self._cond:
+            self._in_flight -= 1
+            if outcome == 'success':
+                self.counters['successes'] += 1
+                # Spread the per-second increase over the calls made in a second
+                per_call = 1.0 / max(self.rate, 1.0)
+                rate_step = self.rate if self.slow_start else self.rate_step
+                concurrency_step = self.concurrency_limit if self.slow_start else self.concurrency_step
+                self.rate = min(self.max_rate, self.rate + rate_step * per_call)
+                self.concurrency_limit = min(self.max_concurrency,
+                                             self.concurrency_limit + concurrency_step * per_call)
+            elif outcome == 'throttle':
+                self.counters['throttles'] += 1
+                self.slow_start = False
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                    self.concurrency_limit = max(1.0, self.concurrency_limit * self.decrease_factor)
+                    logger.info("%s throttled, backing off to %.2f req/s, concurrency %d",
+                                self.name, self.rate, int(self.concurrency_limit))
+            elif outcome == 'error':
+                self.counters['failures'] += 1
+            self._cond.notify_all()
+
+    def record_retry(self):
+        with self._cond:
+            self.counters['retries'] += 1
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                'rate': round(self.rate, 3),
+                'concurrency_limit': int(self.concurrency_limit),
+                'in_flight': self._in_flight,
+                'wait_seconds': round(self.wait_seconds, 3),
+                **self.counters
+            }
+
+
+class LimitedStream:
+    """
+    A response stream that holds its call's concurrency slot until it ends
+
+    The work of a streaming call such as invoke_flow goes on while the
+    response is read, so the slot is only released once the stream is
+    exhausted, fails, is closed or is dropped; the limiter then bounds open
+    streams, not just requests. An error raised while reading, or a
+    throttling exception event in the stream, feeds back into the limiter
+    like a failed or throttled call.
+    """
+
+    def __init__(self, stream: Iterable, limiter: 'AdaptiveLimiter'):
+        self._stream = stream
+        self._limiter = limiter
+        self._released = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator:
+        outcome = 'success'
+        try:
+            for event in self._stream:
+                if isinstance(event, dict) and not STREAM_THROTTLE_EVENTS.isdisjoint(event):
+                    outcome = 'throttle'
+                yield event
+        except Exception as e:
+            self._release('throttle' if classify_error(e) == 'throttle' else 'error')
+            raise
+        else:
+            self._release(outcome)
+        finally:
+            # Reached without an outcome when the reader stops early
+            self._release('closed')
+
+    def close(self):
+        """Stop reading and release the slot"""
+        close = getattr(self._stream, 'close', None)
+        if close:
+            close()
+        self._release('closed')
+
+    def __del__(self):
+        self._release('closed')
+
+    def _release(self, outcome: str):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._limiter.release(outcome)
+
+
+class ThrottleRegistry:
+    """Per-API adaptive limiters with retrying call wrapper"""
+
+    def __init__(self, limits: Optional[Dict[str, tuple]] = None, retry_policy: Optional[RetryPolicy] = None):
+        self.limits = {**DEFAULT_API_LIMITS, **(limits or {})}
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, api: str) -> AdaptiveLimiter:
+        with self._lock:
+            if api not in self._limiters:
+                rate, max_rate, concurrency, max_concurrency = self.limits.get(api, self.limits['default'])
+                self._limiters[api] = AdaptiveLimiter(api, rate, max_rate, concurrency, max_concurrency)
+            return self._limiters[api]
+
+    def call(self, api: str, fn: Callable, *args, idempotent: bool = True, stream_key: Optional[str] = None,
+             **kwargs):
+        """
+        Call fn under the API's limiter, retrying retryable errors with decorrelated jitter
+
+        Throttles are always retried because the request was rejected before it
+        ran. Transient server and connection errors are only retried when the
+        call is idempotent, e.g. deletes or creates carrying a clientToken.
+        With ``stream_key``, the response's stream under that key is wrapped in
+        a LimitedStream, which keeps the concurrency slot until it is read.
+        """
+        limiter = self.limiter(api)
+        policy = self.retry_policy
+        delay = policy.base
+
+        for attempt in range(1, policy.max_attempts + 1):
+            limiter.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                limiter.release('throttle' if kind == 'throttle' else 'error')
+                retryable = kind == 'throttle' or (kind == 'transient' and idempotent)
+                if not retryable or attempt == policy.max_attempts:
+                    raise
+                delay = policy.next_delay(delay)
+                limiter.record_retry()
+                logger.debug("%s attempt %d failed (%s), retrying in %.2fs", api, attempt, kind, delay)
+                time.sleep(delay)
+                continue
+            if stream_key is None:
+                limiter.release('success')
+                return result
+            result[stream_key] = LimitedStream(result.get(stream_key, ()), limiter)
+            return result
+
+    def paginate(self, api: str, fn: Callable, result_key: str, **kwargs) -> Iterator[dict]:
+        """Yield every item of a paginated list call, fetching each page through the API's limiter"""
+        while True:
+            response = self.call(api, fn, **kwargs)
+            yield from response.get(result_key, [])
+            if not response.get('nextToken'):
+                return
+            kwargs['nextToken'] = response['nextToken']
+
+    def metrics(self) -> Dict[str, dict]:
+        """Snapshot of every limiter's state and counters, keyed by API name"""
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {api: limiter.metrics() for api, limiter in limiters.items()}
+
+
+_shared_registries: Dict[str, ThrottleRegistry] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_registry(region: str) -> ThrottleRegistry:
+    """Process-wide registry per region, so every manager shares the same service quota view"""
+    with _shared_lock:
+        if region not in _shared_registries:
+            _shared_registries[region] = ThrottleRegistry()
+        return _shared_registries[region]
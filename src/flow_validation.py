@@ -0,0 +1,228 @@
+import logging
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from flow_templates import compile_template
+
+logger = logging.getLogger(__name__)
+
+# Node types whose loop bodies may legitimately feed back into the graph
+LOOP_NODE_TYPES = {'Iterator', 'Collector', 'LoopInput', 'LoopController'}
+
+DEFAULT_CONDITION = 'default'
+
+
+class ValidationIssue(NamedTuple):
+    code: str
+    message: str
+    node: Optional[str] = None
+    connection: Optional[str] = None
+
+    def __str__(self) -> str:
+        return f"[{self.code}] {self.message}"
+
+
+class FlowValidationError(ValueError):
+    """Raised when a flow definition fails static validation"""
+
+    def __init__(self, issues: List[ValidationIssue]):
+        self.issues = issues
+        details = '\n'.join(f"  • {issue}" for issue in issues)
+        super().__init__(f"Flow definition has {len(issues)} problem(s):\n{details}")
+
+
+class FlowGraph:
+    """Nodes, ports and connections of a flow definition indexed for single-pass checks"""
+
+    def __init__(self, definition: dict):
+        self.nodes: Dict[str, dict] = {}
+        self.duplicates: List[str] = []
+        for node in definition.get('nodes', []):
+            name = node.get('name')
+            if name in self.nodes:
+                self.duplicates.append(name)
+            self.nodes[name] = node
+
+        self.inputs = {name: {port['name']: port.get('type') for port in node.get('inputs', [])}
+                       for name, node in self.nodes.items()}
+        self.outputs = {name: {port['name']: port.get('type') for port in node.get('outputs', [])}
+                        for name, node in self.nodes.items()}
+        self.connections: List[dict] = definition.get('connections', [])
+        self.successors: Dict[str, List[str]] = {name: [] for name in self.nodes}
+        for connection in self.connections:
+            source, target = connection.get('source'), connection.get('target')
+            if source in self.nodes and target in self.nodes:
+                self.successors[source].append(target)
+
+    def nodes_of_type(self, node_type: str) -> List[str]:
+        return [name for name, node in self.nodes.items() if node.get('type') == node_type]
+
+    def reachable_from(self, roots: List[str]) -> set:
+        seen = set(roots)
+        stack = list(roots)
+        while stack:
+            for target in self.successors[stack.pop()]:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return seen
+
+    def strongly_connected_components(self) -> List[List[str]]:
+        """Tarjan's algorithm, iterative so deep graphs cannot overflow the stack"""
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack = set()
+        stack: List[str] = []
+        components = []
+
+        for root in self.nodes:
+            if root in index:
+                continue
+            work = [(root, 0)]
+            while work:
+                name, child = work.pop()
+                if child == 0:
+                    index[name] = lowlink[name] = len(index)
+                    stack.append(name)
+                    on_stack.add(name)
+                successors = self.successors[name]
+                if child < len(successors):
+                    work.append((name, child + 1))
+                    target = successors[child]
+                    if target not in index:
+                        work.append((target, 0))
+                    elif target in on_stack:
+                        lowlink[name] = min(lowlink[name], index[target])
+                    continue
+
+                if lowlink[name] == index[name]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == name:
+                            break
+                    components.append(component)
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[name])
+        return components
+
+
+def _check_connection(graph: FlowGraph, connection: dict, connected_inputs: set) -> List[ValidationIssue]:
+    issues = []
+    name = connection.get('name')
+    source, target = connection.get('source'), connection.get('target')
+
+    for role, node in (('source', source), ('target', target)):
+        if node not in graph.nodes:
+            issues.append(ValidationIssue(
+                'dangling-connection', f"Connection {name} has unknown {role} node '{node}'", connection=name))
+    if issues:
+        return issues
+
+    configuration = connection.get('configuration', {})
+    if connection.get('type') == 'Conditional':
+        condition = configuration.get('conditional', {}).get('condition')
+        source_node = graph.nodes[source]
+        if source_node.get('type') != 'Condition':
+            issues.append(ValidationIssue(
+                'invalid-connection', f"Conditional connection {name} starts at non-Condition node '{source}'",
+                node=source, connection=name))
+        else:
+            conditions = {c.get('name') for c in source_node.get('configuration', {})
+                          .get('condition', {}).get('conditions', [])}
+            if condition not in conditions:
+                issues.append(ValidationIssue(
+                    'dangling-connection', f"Connection {name} references unknown condition '{condition}' of '{source}'",
+                    node=source, connection=name))
+        return issues
+
+    data = configuration.get('data', {})
+    source_output, target_input = data.get('sourceOutput'), data.get('targetInput')
+    if source_output not in graph.outputs[source]:
+        issues.append(ValidationIssue(
+            'dangling-connection', f"Connection {name} reads unknown output '{source_output}' of '{source}'",
+            node=source, connection=name))
+    if target_input not in graph.inputs[target]:
+        issues.append(ValidationIssue(
+            'dangling-connection', f"Connection {name} writes unknown input '{target_input}' of '{target}'",
+            node=target, connection=name))
+    else:
+        connected_inputs.add((target, target_input))
+    if issues:
+        return issues
+
+    output_type = graph.outputs[source][source_output]
+    input_type = graph.inputs[target][target_input]
+    if output_type and input_type and output_type != input_type:
+        issues.append(ValidationIssue(
+            'type-mismatch',
+            f"Connection {name} sends {output_type} output '{source}.{source_output}' "
+            f"to {input_type} input '{target}.{target_input}'",
+            node=target, connection=name))
+    return issues
+
+
+def validate_definition(definition: dict) -> List[ValidationIssue]:
+    """
+    Check a flow definition's structure and data types without calling AWS
+
+    Every check is a single pass over nodes or connections, so validation is
+    linear in the size of the graph.
+    """
+    graph = FlowGraph(definition)
+    issues = [ValidationIssue('duplicate-node', f"Node name '{name}' is used more than once", node=name)
+              for name in graph.duplicates]
+
+    connected_inputs = set()
+    for connection in graph.connections:
+        issues.extend(_check_connection(graph, connection, connected_inputs))
+
+    for name, ports in graph.inputs.items():
+        for port in ports:
+            if (name, port) not in connected_inputs:
+                issues.append(ValidationIssue(
+                    'unconnected-input', f"Input '{port}' of node '{name}' has no incoming connection", node=name))
+
+    for name in graph.nodes_of_type('Condition'):
+        conditions = graph.nodes[name].get('configuration', {}).get('condition', {}).get('conditions', [])
+        if not any(condition.get('name') == DEFAULT_CONDITION for condition in conditions):
+            issues.append(ValidationIssue(
+                'missing-default', f"Condition node '{name}' has no '{DEFAULT_CONDITION}' branch", node=name))
+
+    input_nodes = graph.nodes_of_type('Input')
+    if not input_nodes:
+        issues.append(ValidationIssue('missing-input', "Flow has no Input node"))
+    reachable = graph.reachable_from(input_nodes)
+    for name in graph.nodes_of_type('Output'):
+        if name not in reachable:
+            issues.append(ValidationIssue(
+                'unreachable-output', f"Output node '{name}' is not reachable from the Input node", node=name))
+
+    for component in graph.strongly_connected_components():
+        is_cycle = len(component) > 1 or component[0] in graph.successors[component[0]]
+        if is_cycle and not any(graph.nodes[name].get('type') in LOOP_NODE_TYPES for name in component):
+            members = ', '.join(sorted(component))
+            issues.append(ValidationIssue(
+                'cycle', f"Nodes form a cycle outside an Iterator/Collector loop: {members}", node=component[0]))
+
+    return issues
+
+
+def validate_template(template_path: Path) -> List[ValidationIssue]:
+    """Validate a template file's definition; unreadable templates are reported as an issue"""
+    try:
+        compiled = compile_template(template_path)
+    except Exception as e:
+        return [ValidationIssue('invalid-template', f"Unable to load template: {e}")]
+    return validate_definition(compiled.definition)
+
+
+def validate_templates(paths: List[Path]) -> Dict[str, List[ValidationIssue]]:
+    """Validate template files and directories, returning issues per file (empty when valid)"""
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.glob('*.json')) if path.is_dir() else [path])
+    return {str(path): validate_template(path) for path in files}
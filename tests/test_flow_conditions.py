@@ -0,0 +1,101 @@
+import pytest
+
+import flow_conditions
+from flow_conditions import DEFAULT_CONDITION, ConditionEvaluator, compile_conditions, parse_expression
+
+
+def condition_node(*conditions, inputs=('score', 'tier')):
+    return {
+        'name': 'Router',
+        'type': 'Condition',
+        'inputs': [{'name': name, 'type': 'Number'} for name in inputs],
+        'configuration': {'condition': {'conditions': [
+            *({'name': name, 'expression': expression} for name, expression in conditions),
+            {'name': DEFAULT_CONDITION}
+        ]}}
+    }
+
+
+ROUTER = condition_node(('high', 'score >= 80'), ('mid', 'score >= 50 and tier != "free"'))
+
+COLUMNS = {
+    'score': [95, 60, 60, 10, 80],
+    'tier': ['pro', 'pro', 'free', 'pro', 'free'],
+}
+EXPECTED = ['high', 'mid', DEFAULT_CONDITION, DEFAULT_CONDITION, 'high']
+
+
+@pytest.fixture(params=['numpy', 'rows'])
+def vector_mode(request, monkeypatch):
+    """Run batch tests both vectorized and with NumPy unavailable"""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(flow_conditions, '_numpy', lambda: None)
+    return request.param
+
+
+def test_row_takes_first_matching_condition():
+    evaluator = ConditionEvaluator(ROUTER)
+    assert evaluator.select({'score': 90, 'tier': 'free'}) == 'high'
+    assert evaluator.select({'score': 70, 'tier': 'pro'}) == 'mid'
+
+
+def test_row_without_a_match_takes_default():
+    evaluator = ConditionEvaluator(ROUTER)
+    assert evaluator.select({'score': 70, 'tier': 'free'}) == DEFAULT_CONDITION
+    assert evaluator.errors == 0
+
+
+def test_row_that_cannot_be_compared_takes_default_and_counts_error():
+    evaluator = ConditionEvaluator(ROUTER)
+    assert evaluator.select({'score': None, 'tier': 'pro'}) == DEFAULT_CONDITION
+    assert evaluator.errors == 1
+
+
+def test_chained_comparison_and_literals():
+    evaluator = ConditionEvaluator(condition_node(('band', '10 < score <= 20'), ('flagged', 'tier == true')))
+    assert evaluator.select({'score': 15, 'tier': False}) == 'band'
+    assert evaluator.select({'score': 20.5, 'tier': True}) == 'flagged'
+    assert evaluator.select({'score': 10, 'tier': False}) == DEFAULT_CONDITION
+
+
+def test_batch_matches_row_by_row(vector_mode):
+    evaluator = ConditionEvaluator(ROUTER)
+    assert list(evaluator.select_batch(COLUMNS)) == EXPECTED
+    assert [evaluator.branches[i] for i in evaluator.select_indexes(COLUMNS)] == EXPECTED
+
+
+def test_batch_distribution_includes_untaken_branches(vector_mode):
+    evaluator = ConditionEvaluator(condition_node(('high', 'score >= 80'), ('never', 'score < 0')))
+    assert evaluator.distribution({'score': [90, 85, 10], 'tier': ['a', 'b', 'c']}) == \
+        {'high': 2, 'never': 0, DEFAULT_CONDITION: 1}
+
+
+def test_batch_with_nulls_falls_back_to_default_for_those_rows(vector_mode):
+    evaluator = ConditionEvaluator(ROUTER)
+    columns = {'score': [95, None, 60], 'tier': ['pro', 'pro', 'pro']}
+    assert list(evaluator.select_batch(columns)) == ['high', DEFAULT_CONDITION, 'mid']
+    assert evaluator.errors == 1
+
+
+def test_batch_with_mismatched_types_falls_back_to_default(vector_mode):
+    evaluator = ConditionEvaluator(condition_node(('high', 'score >= 80')))
+    columns = {'score': ['ninety', 'ten'], 'tier': ['pro', 'pro']}
+    assert list(evaluator.select_batch(columns)) == [DEFAULT_CONDITION, DEFAULT_CONDITION]
+
+
+def test_compile_conditions_picks_condition_nodes():
+    definition = {'nodes': [ROUTER, {'name': 'Input', 'type': 'Input'}]}
+    assert list(compile_conditions(definition)) == ['Router']
+
+
+@pytest.mark.parametrize('expression', ['score + 1 > 2', 'score in [1, 2]', 'open("x")', 'score >'])
+def test_unsupported_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        parse_expression(expression, ['score'])
+
+
+def test_unknown_input_is_rejected():
+    with pytest.raises(ValueError, match="unknown input 'price'"):
+        parse_expression('price > 1', ['score'])
@@ -0,0 +1,200 @@
+import asyncio
+import threading
+
+import pytest
+
+from flow_runtime import payload_hash
+from flow_singleflight import AsyncSingleFlight, SingleFlight
+
+
+def run_concurrently(group: SingleFlight, key, fn, callers: int):
+    """Call ``group.do`` from several threads, returning each one's result or exception"""
+    outcomes = [None] * callers
+
+    def caller(index):
+        try:
+            outcomes[index] = group.do(key, fn)
+        except Exception as e:
+            outcomes[index] = e
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def wait_for_callers(group: SingleFlight, calls: int):
+    while group.metrics()['calls'] < calls:
+        threading.Event().wait(0.001)
+
+
+def test_concurrent_callers_share_one_execution():
+    group = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def fn():
+        executions.append(1)
+        release.wait(5)
+        return 'result'
+
+    threads, outcomes = run_concurrently(group, 'key', fn, 4)
+    wait_for_callers(group, 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert sorted(outcomes) == [('result', False), ('result', True), ('result', True), ('result', True)]
+    metrics = group.metrics()
+    assert (metrics['executions'], metrics['coalesced'], metrics['in_flight']) == (1, 3, 0)
+
+
+def test_error_is_shared_with_every_waiter():
+    group = SingleFlight()
+    release = threading.Event()
+    error = RuntimeError('flow failed')
+
+    def fn():
+        release.wait(5)
+        raise error
+
+    threads, outcomes = run_concurrently(group, 'key', fn, 3)
+    wait_for_callers(group, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(outcome is error for outcome in outcomes)
+    assert group.metrics()['errors'] == 1
+
+
+def test_key_is_released_after_completion():
+    group = SingleFlight()
+    assert group.do('key', lambda: 1) == (1, False)
+    assert group.do('key', lambda: 2) == (2, False)
+
+    def fail():
+        raise RuntimeError('transient')
+    with pytest.raises(RuntimeError):
+        group.do('key', fail)
+    # Failures are not remembered either
+    assert group.do('key', lambda: 3) == (3, False)
+
+
+def test_waiter_timeout_leaves_the_call_running():
+    group = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=group.do, args=('key', lambda: release.wait(5)))
+    leader.start()
+    wait_for_callers(group, 1)
+
+    with pytest.raises(TimeoutError):
+        group.do('key', lambda: None, timeout=0.01)
+    assert group.metrics()['in_flight'] == 1
+
+    release.set()
+    leader.join()
+    assert group.metrics()['abandoned'] == 1
+
+
+def test_stream_subscribers_see_every_event():
+    group = SingleFlight()
+    opened = []
+
+    def open_stream():
+        opened.append(1)
+        return iter(['a', 'b', 'c'])
+
+    first = group.stream('key', open_stream)
+    second = group.stream('key', open_stream)
+    assert list(first) == ['a', 'b', 'c']
+    assert list(second) == ['a', 'b', 'c']
+    assert len(opened) == 1
+
+
+def test_stream_error_reaches_every_subscriber():
+    group = SingleFlight()
+
+    def events():
+        yield 'a'
+        raise RuntimeError('stream broke')
+
+    first = group.stream('key', events)
+    second = group.stream('key', events)
+    for subscriber in (first, second):
+        with pytest.raises(RuntimeError, match='stream broke'):
+            list(subscriber)
+
+
+def test_async_error_is_shared_with_every_waiter():
+    async def scenario():
+        group = AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise ValueError('bad input')
+
+        outcomes = await asyncio.gather(*(group.do('key', fn) for _ in range(3)), return_exceptions=True)
+        return group, outcomes
+
+    group, outcomes = asyncio.run(scenario())
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert outcomes[0] is outcomes[1] is outcomes[2]
+    assert group.metrics()['errors'] == 1
+
+
+def test_async_cancelling_one_waiter_keeps_the_call_for_others():
+    async def scenario():
+        group = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def fn():
+            await release.wait()
+            return 'result'
+
+        leader = asyncio.ensure_future(group.do('key', fn))
+        follower = asyncio.ensure_future(group.do('key', fn))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return group, leader, await follower
+
+    group, leader, result = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert result == ('result', True)
+    assert group.metrics()['cancelled'] == 1
+
+
+def test_async_cancelling_every_waiter_cancels_the_call():
+    async def scenario():
+        group = AsyncSingleFlight()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def fn():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        waiters = [asyncio.ensure_future(group.do('key', fn)) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return group, cancelled
+
+    group, cancelled = asyncio.run(scenario())
+    assert cancelled == [1]
+    assert group.metrics()['in_flight'] == 0
+
+
+def test_payload_hash_ignores_key_order_but_not_whitespace():
+    assert payload_hash({'a': 1, 'b': 'x'}) == payload_hash({'b': 'x', 'a': 1})
+    assert payload_hash({'text': 'hello world'}) != payload_hash({'text': 'hello  world'})
+    assert payload_hash({'text': 'hello'}) != payload_hash({'text': 'hello\n'})
@@ -0,0 +1,145 @@
+import pytest
+
+from flow_throttle import AdaptiveLimiter, RetryPolicy, ThrottleRegistry
+
+
+class ServiceError(Exception):
+    """Stand-in for botocore's ClientError, which carries the error code in ``response``"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+def failing(*errors, result='ok'):
+    """Callable that raises the given errors in turn, then returns result, counting calls"""
+    remaining = list(errors)
+
+    def fn():
+        fn.calls += 1
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    fn.calls = 0
+    return fn
+
+
+@pytest.fixture
+def registry():
+    # Rates high enough that acquiring never waits
+    fast = (1000.0, 1000.0, 8, 8)
+    return ThrottleRegistry(limits={'default': fast, 'invoke_flow': fast},
+                            retry_policy=RetryPolicy(max_attempts=3, base=0.0, cap=0.0))
+
+
+def limiter(**kwargs):
+    options = {'rate': 10.0, 'max_rate': 100.0, 'concurrency': 8, 'max_concurrency': 64, 'cooldown': 0.0}
+    return AdaptiveLimiter('test', **{**options, **kwargs})
+
+
+def complete(lim: AdaptiveLimiter, outcome: str):
+    """Run one call through the limiter without waiting for its bucket to refill"""
+    lim._tokens = 1.0
+    lim.acquire()
+    lim.release(outcome)
+
+
+def test_throttle_halves_rate_and_concurrency():
+    lim = limiter()
+    complete(lim, 'throttle')
+    assert lim.rate == 5.0
+    assert lim.concurrency_limit == 4.0
+    assert not lim.slow_start
+    assert lim.metrics()['throttles'] == 1
+
+
+def test_throttles_within_cooldown_back_off_once():
+    lim = limiter(cooldown=60.0)
+    for _ in range(3):
+        complete(lim, 'throttle')
+    assert lim.rate == 5.0
+    assert lim.metrics()['throttles'] == 3
+
+
+def test_decrease_stops_at_minimum():
+    lim = limiter(rate=0.3, concurrency=1)
+    complete(lim, 'throttle')
+    assert lim.rate == lim.min_rate
+    assert lim.concurrency_limit == 1.0
+
+
+def test_slow_start_doubles_per_second_of_successes():
+    lim = limiter()
+    for _ in range(10):
+        complete(lim, 'success')
+    # Each success adds rate / rate = 1 req/s; ten calls is one second at the initial rate
+    assert lim.rate == pytest.approx(20.0)
+    assert lim.concurrency_limit > 8.0
+
+
+def test_additive_increase_after_first_throttle():
+    lim = limiter()
+    complete(lim, 'throttle')
+    complete(lim, 'success')
+    # One success adds rate_step (5% of max_rate) spread over a second of calls at 5 req/s
+    assert lim.rate == pytest.approx(5.0 + lim.rate_step / 5.0)
+
+
+def test_increase_is_capped_at_maximum():
+    lim = limiter(rate=99.0, max_rate=100.0)
+    complete(lim, 'success')
+    assert lim.rate == 100.0
+
+
+def test_throttle_is_retried_for_non_idempotent_calls(registry):
+    fn = failing(ServiceError('ThrottlingException'))
+    assert registry.call('create_flow', fn, idempotent=False) == 'ok'
+    assert fn.calls == 2
+    assert registry.metrics()['create_flow']['retries'] == 1
+
+
+def test_transient_error_is_retried_for_idempotent_calls(registry):
+    fn = failing(ServiceError('InternalServerException'), ServiceError('ServiceUnavailableException'))
+    assert registry.call('get_flow', fn) == 'ok'
+    assert fn.calls == 3
+
+
+def test_transient_error_is_not_retried_for_non_idempotent_calls(registry):
+    fn = failing(ServiceError('InternalServerException'))
+    with pytest.raises(ServiceError):
+        registry.call('create_flow', fn, idempotent=False)
+    assert fn.calls == 1
+    assert registry.metrics()['create_flow']['failures'] == 1
+
+
+def test_non_retryable_error_is_raised_at_once(registry):
+    fn = failing(ServiceError('ValidationException'))
+    with pytest.raises(ServiceError):
+        registry.call('get_flow', fn)
+    assert fn.calls == 1
+
+
+def test_retries_stop_after_max_attempts(registry):
+    fn = failing(*[ServiceError('ThrottlingException')] * 5)
+    with pytest.raises(ServiceError):
+        registry.call('get_flow', fn)
+    assert fn.calls == 3
+
+
+def test_stream_holds_slot_until_exhausted(registry):
+    response = registry.call('invoke_flow', lambda: {'responseStream': iter([{'a': 1}, {'b': 2}])},
+                             stream_key='responseStream')
+    assert registry.metrics()['invoke_flow']['in_flight'] == 1
+    assert list(response['responseStream']) == [{'a': 1}, {'b': 2}]
+    metrics = registry.metrics()['invoke_flow']
+    assert metrics['in_flight'] == 0
+    assert metrics['successes'] == 1
+
+
+def test_throttle_event_in_stream_counts_as_throttle(registry):
+    events = [{'flowOutputEvent': {}}, {'throttlingException': {'message': 'slow down'}}]
+    response = registry.call('invoke_flow', lambda: {'responseStream': iter(events)}, stream_key='responseStream')
+    list(response['responseStream'])
+    metrics = registry.metrics()['invoke_flow']
+    assert metrics['throttles'] == 1
+    assert metrics['in_flight'] == 0
@@ -0,0 +1,125 @@
+import pytest
+
+from bedrock_flow_manager import BedrockFlowManager
+from flow_templates import CONTENT_HASH_TAG, DEPLOYED_ALIAS_TAG, DEPLOYED_VERSION_TAG, content_hash
+from flow_throttle import RetryPolicy, ThrottleRegistry
+
+DEFINITION = {'nodes': [{'name': 'FlowInput', 'type': 'Input'}], 'connections': []}
+METADATA = {'name': 'support-flow', 'description': 'Routes tickets', 'tags': {'Team': 'support'}}
+ARN = 'arn:aws:bedrock:us-east-1:123456789012:flow/FLOW1'
+
+
+class StubClient:
+    """bedrock-agent client serving a fixed account, recording every call"""
+
+    def __init__(self, flows=(), tags=None, aliases=()):
+        self.flows = list(flows)
+        self.tags = tags or {}
+        self.aliases = list(aliases)
+        self.calls = []
+
+    def list_flows(self, **kwargs):
+        self.calls.append(('list_flows', kwargs))
+        return {'flowSummaries': self.flows}
+
+    def list_tags_for_resource(self, resourceArn):
+        self.calls.append(('list_tags_for_resource', resourceArn))
+        return {'tags': dict(self.tags.get(resourceArn, {}))}
+
+    def list_flow_aliases(self, flowIdentifier, **kwargs):
+        self.calls.append(('list_flow_aliases', flowIdentifier))
+        return {'flowAliasSummaries': self.aliases}
+
+    def tag_resource(self, resourceArn, tags):
+        self.calls.append(('tag_resource', resourceArn, tags))
+
+    def untag_resource(self, resourceArn, tagKeys):
+        self.calls.append(('untag_resource', resourceArn, tagKeys))
+
+
+def manager(client: StubClient) -> BedrockFlowManager:
+    flow_manager = BedrockFlowManager('us-east-1', 'default', verbose=False)
+    flow_manager.bedrock_client = client
+    fast = (1000.0, 1000.0, 8, 8)
+    flow_manager.throttle = ThrottleRegistry(limits={'default': fast}, retry_policy=RetryPolicy(max_attempts=1))
+    return flow_manager
+
+
+def stage(client: StubClient, name: str):
+    return next(s for s in manager(client).deploy_stages() if s.name == name)
+
+
+def new_job(name='support-flow', metadata=METADATA) -> dict:
+    return {'flow_name': name, '_definition': DEFINITION, '_metadata': metadata}
+
+
+def deployed(tags=None) -> StubClient:
+    """Account holding support-flow as deployed by this tool from DEFINITION and METADATA"""
+    tags = {'Team': 'support', CONTENT_HASH_TAG: content_hash(DEFINITION, METADATA),
+            DEPLOYED_VERSION_TAG: '3', DEPLOYED_ALIAS_TAG: 'ALIAS1', **(tags or {})}
+    return StubClient(flows=[{'name': 'support-flow', 'id': 'FLOW1', 'arn': ARN}],
+                      tags={ARN: tags}, aliases=[{'name': 'latest', 'id': 'ALIAS1'}])
+
+
+def test_new_name_is_created():
+    client = StubClient(flows=[{'name': 'other-flow', 'id': 'FLOW2', 'arn': ARN}])
+    result = stage(client, 'lookup').run(new_job())
+    assert result['action'] == 'created'
+    assert result['_hash'] == content_hash(DEFINITION, METADATA)
+    assert 'flow_id' not in result
+    assert [call[0] for call in client.calls] == ['list_flows']
+
+
+def test_matching_hash_is_unchanged():
+    client = deployed()
+    result = stage(client, 'lookup').run(new_job())
+    assert result['action'] == 'unchanged'
+    assert result['_complete'] == 'UNCHANGED'
+    assert (result['flow_id'], result['version'], result['alias_id']) == ('FLOW1', '3', 'ALIAS1')
+    assert 'list_flow_aliases' not in [call[0] for call in client.calls]
+
+
+def test_changed_content_is_updated_in_place():
+    client = deployed()
+    metadata = {**METADATA, 'description': 'Routes and triages tickets'}
+    result = stage(client, 'lookup').run(new_job(metadata=metadata))
+    assert result['action'] == 'updated'
+    assert result['flow_id'] == 'FLOW1'
+    assert result['_alias_id'] == 'ALIAS1'
+    assert result['_hash'] == content_hash(DEFINITION, metadata)
+    assert '_complete' not in result
+
+
+def test_missing_alias_tag_is_redeployed():
+    # A previous run that failed before tagging the alias is finished off, not skipped
+    client = deployed({DEPLOYED_ALIAS_TAG: ''})
+    result = stage(client, 'lookup').run(new_job())
+    assert result['action'] == 'updated'
+
+
+def test_unmanaged_flow_with_the_same_name_is_left_alone():
+    client = StubClient(flows=[{'name': 'support-flow', 'id': 'FLOW1', 'arn': ARN}], tags={ARN: {'Team': 'x'}})
+    with pytest.raises(ValueError, match='not deployed by this tool'):
+        stage(client, 'lookup').run(new_job())
+    assert [call[0] for call in client.calls] == ['list_flows', 'list_tags_for_resource']
+
+
+def test_lookup_lists_flows_once_per_deployment():
+    client = deployed()
+    lookup = stage(client, 'lookup')
+    lookup.run(new_job())
+    lookup.run(new_job(name='another-flow'))
+    assert [call[0] for call in client.calls].count('list_flows') == 1
+
+
+def test_tag_stage_removes_user_tags_the_template_dropped():
+    client = deployed({'Owner': 'old-team'})
+    job = new_job(metadata={**METADATA, 'description': 'v2'})
+    job.update(stage(client, 'lookup').run(job), version='4', alias_id='ALIAS1')
+    stage(client, 'tag').run(job)
+
+    untag, tag = client.calls[-2:]
+    assert untag == ('untag_resource', ARN, ['Owner'])
+    assert tag[0] == 'tag_resource'
+    assert tag[2] == {'Team': 'support', CONTENT_HASH_TAG: job['_hash'],
+                      DEPLOYED_VERSION_TAG: '4', DEPLOYED_ALIAS_TAG: 'ALIAS1'}